@@ -0,0 +1,27 @@
+# analytics/admin.py
+from django.contrib import admin
+from .models import StorefrontEvent, EventDailyAggregate
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    """Données écrites par l'application uniquement"""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StorefrontEvent)
+class StorefrontEventAdmin(ReadOnlyAdmin):
+    list_display = ('event_type', 'path', 'book_id', 'session_id', 'received_at')
+    list_filter = ('event_type',)
+    ordering = ('-id',)
+    show_full_result_count = False
+
+
+@admin.register(EventDailyAggregate)
+class EventDailyAggregateAdmin(ReadOnlyAdmin):
+    list_display = ('date', 'event_type', 'book_id', 'count')
+    list_filter = ('event_type', 'date')
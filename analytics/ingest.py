@@ -0,0 +1,89 @@
+# analytics/ingest.py
+
+# ============================================
+# ANALYTICS - Tampon d'ingestion et compactage
+# ============================================
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+
+from zoonova.buffers import BatchBuffer
+from zoonova.utils import upsert_counters
+
+from .models import StorefrontEvent, EventDailyAggregate
+
+
+def _write_events(events):
+    StorefrontEvent.objects.bulk_create(events, batch_size=settings.EVENTS_FLUSH_SIZE)
+
+
+# Tampon propre à chaque worker : les événements sont écrits en une requête
+# par lot au lieu d'une requête par événement.
+event_buffer = BatchBuffer(
+    _write_events,
+    max_size=settings.EVENTS_FLUSH_SIZE,
+    max_age=settings.EVENTS_FLUSH_INTERVAL,
+    max_pending=settings.EVENTS_MAX_PENDING,
+)
+
+
+def enqueue_events(events, received_at):
+    """
+    Met en tampon des événements validés.
+    Lève zoonova.buffers.BufferFull si le tampon est saturé.
+    """
+    event_buffer.add(*[
+        StorefrontEvent(
+            event_type=event['type'],
+            session_id=event['session_id'],
+            path=event['path'],
+            book_id=event['book'],
+            metadata=event['metadata'],
+            occurred_at=event['occurred_at'],
+            received_at=received_at,
+        )
+        for event in events
+    ])
+
+
+def compact_events(before):
+    """
+    Agrège les événements bruts reçus avant la date `before` dans
+    EventDailyAggregate, puis les supprime.
+    
+    Returns:
+        tuple: (événements compactés, lignes d'agrégats mises à jour)
+    """
+    raw_events = StorefrontEvent.objects.filter(received_at__date__lt=before)
+
+    with transaction.atomic(using=router.db_for_write(StorefrontEvent)):
+        # Borne haute figée : les événements écrits pendant le compactage
+        # seront traités au prochain passage
+        max_id = raw_events.aggregate(max_id=Max('id'))['max_id']
+        if max_id is None:
+            return 0, 0
+        raw_events = raw_events.filter(id__lte=max_id)
+
+        totals = (
+            raw_events
+            .annotate(day=TruncDate('received_at'))
+            .values('day', 'event_type', 'book_id')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        rows = [
+            {
+                'date': row['day'],
+                'event_type': row['event_type'],
+                'book_id': row['book_id'] or 0,
+                'count': row['total'],
+            }
+            for row in totals
+        ]
+        upsert_counters(EventDailyAggregate, ['date', 'event_type', 'book_id'], rows)
+
+        compacted, _ = raw_events.delete()
+
+    return compacted, len(rows)
@@ -0,0 +1,31 @@
+# analytics/management/commands/rollup_events.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from analytics.ingest import event_buffer, compact_events
+
+
+class Command(BaseCommand):
+    help = "Compacte les événements bruts des jours passés en agrégats journaliers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-days',
+            type=int,
+            default=settings.EVENTS_RAW_RETENTION_DAYS,
+            help="Nombre de jours complets d'événements bruts à conserver en plus d'aujourd'hui"
+        )
+
+    def handle(self, *args, **options):
+        event_buffer.flush()
+
+        before = timezone.localdate() - timedelta(days=options['keep_days'])
+        compacted, rows = compact_events(before)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{compacted} événement(s) compacté(s) en {rows} ligne(s) d\'agrégats (avant le {before})'
+        ))
@@ -0,0 +1,115 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="StorefrontEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "event_type",
+                    models.CharField(
+                        choices=[
+                            ("page_view", "Page vue"),
+                            ("add_to_cart", "Ajout au panier"),
+                            ("checkout_start", "Début de paiement"),
+                        ],
+                        max_length=20,
+                        verbose_name="Type",
+                    ),
+                ),
+                (
+                    "session_id",
+                    models.CharField(blank=True, max_length=64, verbose_name="Session"),
+                ),
+                (
+                    "path",
+                    models.CharField(blank=True, max_length=500, verbose_name="Page"),
+                ),
+                (
+                    "book_id",
+                    models.PositiveBigIntegerField(
+                        blank=True, null=True, verbose_name="Livre"
+                    ),
+                ),
+                ("metadata", models.JSONField(blank=True, default=dict)),
+                (
+                    "occurred_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Survenu le"
+                    ),
+                ),
+                (
+                    "received_at",
+                    models.DateTimeField(db_index=True, verbose_name="Reçu le"),
+                ),
+            ],
+            options={
+                "verbose_name": "Événement",
+                "verbose_name_plural": "Événements",
+                "db_table": "storefront_events",
+            },
+        ),
+        migrations.CreateModel(
+            name="EventDailyAggregate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Jour")),
+                (
+                    "event_type",
+                    models.CharField(
+                        choices=[
+                            ("page_view", "Page vue"),
+                            ("add_to_cart", "Ajout au panier"),
+                            ("checkout_start", "Début de paiement"),
+                        ],
+                        max_length=20,
+                        verbose_name="Type",
+                    ),
+                ),
+                (
+                    "book_id",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Livre"),
+                ),
+                (
+                    "count",
+                    models.PositiveIntegerField(default=0, verbose_name="Nombre"),
+                ),
+            ],
+            options={
+                "verbose_name": "Agrégat journalier",
+                "verbose_name_plural": "Agrégats journaliers",
+                "db_table": "event_daily_aggregates",
+                "ordering": ["-date", "event_type"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "event_type", "book_id"),
+                        name="unique_event_daily_aggregate",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+
+# ============================================
+# 7. APP ANALYTICS - Événements de la boutique
+# ============================================
+
+from django.db import models
+
+
+EVENT_TYPE_CHOICES = [
+    ('page_view', 'Page vue'),
+    ('add_to_cart', 'Ajout au panier'),
+    ('checkout_start', 'Début de paiement'),
+]
+
+
+class StorefrontEvent(models.Model):
+    """Événement brut de la boutique (table en ajout seul, écrite par lots)"""
+    
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES, verbose_name="Type")
+    session_id = models.CharField(max_length=64, blank=True, verbose_name="Session")
+    path = models.CharField(max_length=500, blank=True, verbose_name="Page")
+    book_id = models.PositiveBigIntegerField(null=True, blank=True, verbose_name="Livre")
+    metadata = models.JSONField(default=dict, blank=True)
+    
+    occurred_at = models.DateTimeField(null=True, blank=True, verbose_name="Survenu le")
+    received_at = models.DateTimeField(db_index=True, verbose_name="Reçu le")
+    
+    class Meta:
+        db_table = 'storefront_events'
+        verbose_name = 'Événement'
+        verbose_name_plural = 'Événements'
+    
+    def __str__(self):
+        return f"{self.event_type} - {self.received_at}"
+
+
+class EventDailyAggregate(models.Model):
+    """Nombre d'événements par jour, type et livre (0 = sans livre)"""
+    
+    date = models.DateField(verbose_name="Jour")
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPE_CHOICES, verbose_name="Type")
+    book_id = models.PositiveBigIntegerField(default=0, verbose_name="Livre")
+    count = models.PositiveIntegerField(default=0, verbose_name="Nombre")
+    
+    class Meta:
+        db_table = 'event_daily_aggregates'
+        ordering = ['-date', 'event_type']
+        verbose_name = 'Agrégat journalier'
+        verbose_name_plural = 'Agrégats journaliers'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'event_type', 'book_id'],
+                name='unique_event_daily_aggregate'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} {self.event_type}: {self.count}"
@@ -0,0 +1,56 @@
+
+# ============================================
+# 7. APP ANALYTICS - Serializers Événements
+# ============================================
+
+import json
+
+from django.conf import settings
+from rest_framework import serializers
+
+from .models import EVENT_TYPE_CHOICES, EventDailyAggregate
+
+
+class EventSerializer(serializers.Serializer):
+    """Serializer pour un événement de la boutique"""
+    
+    type = serializers.ChoiceField(choices=EVENT_TYPE_CHOICES)
+    session_id = serializers.CharField(max_length=64, required=False, allow_blank=True, default='')
+    path = serializers.CharField(max_length=500, required=False, allow_blank=True, default='')
+    book = serializers.IntegerField(min_value=1, required=False, allow_null=True, default=None)
+    occurred_at = serializers.DateTimeField(required=False, allow_null=True, default=None)
+    metadata = serializers.DictField(required=False, default=dict)
+    
+    def validate_metadata(self, value):
+        """Limite le nombre de clés et la taille des métadonnées"""
+        if len(value) > settings.EVENTS_METADATA_MAX_KEYS:
+            raise serializers.ValidationError(
+                f"Les métadonnées ne peuvent pas dépasser {settings.EVENTS_METADATA_MAX_KEYS} clés"
+            )
+        if len(json.dumps(value, default=str).encode('utf-8')) > settings.EVENTS_METADATA_MAX_BYTES:
+            raise serializers.ValidationError(
+                f"Les métadonnées ne peuvent pas dépasser {settings.EVENTS_METADATA_MAX_BYTES} octets"
+            )
+        return value
+
+
+class EventBatchSerializer(serializers.Serializer):
+    """Serializer pour un lot d'événements"""
+    
+    events = EventSerializer(many=True, allow_empty=False)
+    
+    def validate_events(self, value):
+        """Limite la taille d'un lot"""
+        if len(value) > settings.EVENTS_MAX_BATCH_SIZE:
+            raise serializers.ValidationError(
+                f"Un lot ne peut pas dépasser {settings.EVENTS_MAX_BATCH_SIZE} événements"
+            )
+        return value
+
+
+class EventDailyAggregateSerializer(serializers.ModelSerializer):
+    """Serializer pour les agrégats journaliers"""
+    
+    class Meta:
+        model = EventDailyAggregate
+        fields = ['date', 'event_type', 'book_id', 'count']
@@ -0,0 +1,157 @@
+# ============================================
+# ANALYTICS - Tests
+# ============================================
+
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connections, router
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import Admin
+from books.models import Book, BookDailyStats
+from books.stats import flush_book_stats, record_book_sales
+from orders.models import Country, Order, OrderDailyStats
+from .ingest import compact_events, event_buffer
+from .models import EventDailyAggregate, StorefrontEvent
+from .views import EventIngestThrottle
+
+
+class EventIngestTests(TestCase):
+
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        event_buffer.flush()
+        StorefrontEvent.objects.all().delete()
+        self.client = APIClient()
+
+    def send(self, events):
+        return self.client.post('/api/v1/events/', {'events': events}, format='json')
+
+    def test_batch_is_buffered_then_compacted_into_daily_aggregates(self):
+        response = self.send([
+            {'type': 'page_view', 'book': 7, 'metadata': {'source': 'newsletter'}},
+            {'type': 'page_view', 'book': 7},
+            {'type': 'add_to_cart', 'book': 7},
+            {'type': 'checkout_start'},
+        ])
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['accepted'], 4)
+        self.assertFalse(StorefrontEvent.objects.exists())
+
+        self.assertEqual(event_buffer.flush(), 4)
+        self.assertEqual(StorefrontEvent.objects.count(), 4)
+
+        self.assertEqual(compact_events(timezone.localdate() + timedelta(days=1)), (4, 3))
+        self.assertFalse(StorefrontEvent.objects.exists())
+        self.assertEqual(
+            sorted(EventDailyAggregate.objects.values_list('event_type', 'book_id', 'count')),
+            [('add_to_cart', 7, 1), ('checkout_start', 0, 1), ('page_view', 7, 2)]
+        )
+
+    def test_invalid_batches_return_400(self):
+        for events in [
+            [],
+            [{'type': 'purchase'}],
+            [{'type': 'page_view', 'book': 0}],
+            [{'type': 'page_view', 'metadata': {f'cle{i}': i for i in range(21)}}],
+            [{'type': 'page_view', 'metadata': {'texte': 'x' * 3000}}],
+            [{'type': 'page_view'}] * 101,
+        ]:
+            with self.subTest(events=str(events)[:60]):
+                self.assertEqual(self.send(events).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(len(event_buffer), 0)
+
+    def test_full_buffer_returns_503(self):
+        with mock.patch.object(event_buffer, 'max_pending', 0):
+            response = self.send([{'type': 'page_view'}])
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(len(event_buffer), 0)
+
+
+class EventIngestThrottleTests(TestCase):
+
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_batches_beyond_the_rate_return_429(self):
+        client = APIClient()
+        with mock.patch.object(EventIngestThrottle, 'THROTTLE_RATES', {'event_ingest': '2/min'}):
+            statuses = [client.post('/api/v1/events/', {'events': []}, format='json').status_code for _ in range(3)]
+            other_ip = client.post('/api/v1/events/', {'events': []}, format='json', REMOTE_ADDR='10.0.0.2')
+
+        self.assertNotIn(status.HTTP_429_TOO_MANY_REQUESTS, statuses[:2])
+        self.assertEqual(statuses[2], status.HTTP_429_TOO_MANY_REQUESTS)
+        # Compté par adresse IP
+        self.assertNotEqual(other_ip.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class DailyAggregatesTests(TestCase):
+
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(Admin.objects.create_superuser('admin@example.com', 'motdepasse'))
+
+    def test_impossible_date_returns_400(self):
+        for params in [{'from': '2024-02-30'}, {'to': '2024-13-01'}]:
+            with self.subTest(params=params):
+                response = self.client.get('/api/v1/events/daily/', params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_book_returns_400(self):
+        response = self.client.get('/api/v1/events/daily/', {'book': 'abc'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_valid_range_is_accepted(self):
+        response = self.client.get('/api/v1/events/daily/', {'from': '2024-02-29', 'to': '2024-03-01'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class AnalyticsRoutingTests(TestCase):
+    """Tables de reporting dans la base `analytics`, le reste dans `default`"""
+
+    databases = {'default', 'analytics'}
+
+    def test_reporting_models_are_routed_to_analytics(self):
+        for model in [BookDailyStats, OrderDailyStats, EventDailyAggregate, StorefrontEvent]:
+            with self.subTest(model=model.__name__):
+                self.assertEqual(router.db_for_write(model), 'analytics')
+                self.assertTrue(router.allow_migrate_model('analytics', model))
+                self.assertFalse(router.allow_migrate_model('default', model))
+        for model in [Book, Order, Country]:
+            with self.subTest(model=model.__name__):
+                self.assertEqual(router.db_for_write(model), 'default')
+        self.assertFalse(router.allow_migrate('analytics', 'books'))
+
+    def test_stats_writes_do_not_touch_the_main_database(self):
+        book = Book.objects.create(titre='Le Loup', nom='Auteur', description='Album', prix=1500, quantites=3)
+        flush_book_stats()
+        record_book_sales([(book.id, 2, 1500)])
+
+        with CaptureQueriesContext(connections['default']) as default_queries:
+            flush_book_stats()
+
+        self.assertEqual(len(default_queries), 0)
+        stats = BookDailyStats.objects.get(book_id=book.id)
+        self.assertEqual(stats._state.db, 'analytics')
+        # La relation est suivie dans la base principale
+        self.assertEqual(stats.book, book)
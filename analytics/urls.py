@@ -0,0 +1,9 @@
+# analytics/urls.py
+
+from django.urls import path
+from .views import ingest_events, daily_aggregates
+
+urlpatterns = [
+    path('', ingest_events, name='ingest_events'),
+    path('daily/', daily_aggregates, name='event_daily_aggregates'),
+]
@@ -0,0 +1,100 @@
+# analytics/views.py
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes
+from rest_framework.response import Response
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.throttling import SimpleRateThrottle
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+import logging
+
+from zoonova.buffers import BufferFull
+from .models import EventDailyAggregate
+from .ingest import enqueue_events
+from .serializers import EventBatchSerializer, EventDailyAggregateSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class EventIngestThrottle(SimpleRateThrottle):
+    """
+    Limite d'envoi de lots d'événements par adresse IP (EVENTS_THROTTLE_RATE).
+    """
+    
+    scope = 'event_ingest'
+    
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': self.get_ident(request)
+        }
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@throttle_classes([EventIngestThrottle])
+def ingest_events(request):
+    """
+    Recevoir un lot d'événements de la boutique (page vue, ajout au panier,
+    début de paiement). Les événements sont mis en tampon et écrits par lots.
+    """
+    serializer = EventBatchSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    events = serializer.validated_data['events']
+    
+    try:
+        enqueue_events(events, received_at=timezone.now())
+    except BufferFull:
+        logger.warning(f"Tampon d'événements saturé, lot de {len(events)} refusé")
+        response = Response({
+            'error': 'Service temporairement saturé, réessayez plus tard'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = str(settings.EVENTS_FLUSH_INTERVAL)
+        return response
+    
+    return Response({
+        'accepted': len(events)
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def daily_aggregates(request):
+    """
+    Agrégats journaliers des événements (admin uniquement)
+    """
+    queryset = EventDailyAggregate.objects.all()
+    
+    try:
+        date_from = parse_date(request.query_params.get('from', ''))
+        date_to = parse_date(request.query_params.get('to', ''))
+    except ValueError:
+        # Date bien formée mais inexistante (ex: 2024-02-30)
+        return Response({
+            'error': 'Intervalle de dates invalide, format attendu: AAAA-MM-JJ'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    
+    event_type = request.query_params.get('type')
+    if event_type:
+        queryset = queryset.filter(event_type=event_type)
+    
+    book_id = request.query_params.get('book')
+    if book_id:
+        try:
+            book_id = int(book_id)
+        except ValueError:
+            return Response({
+                'error': 'book invalide, identifiant numérique attendu'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        queryset = queryset.filter(book_id=book_id)
+    
+    return Response(EventDailyAggregateSerializer(queryset, many=True).data)
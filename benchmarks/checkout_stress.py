@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+# ============================================
+# BENCHMARK - Achats simultanés du dernier stock d'un best-seller
+# ============================================
+#
+# N clients achètent en même temps un livre dont le stock est inférieur à la
+# demande (POST /api/v1/orders/, puis optionnellement la session de paiement).
+# Base SQLite neuve dans un dossier temporaire, migrée et peuplée à chaque
+# exécution ; emails en mémoire (locmem), Stripe remplacé par un stand-in
+# avec latence configurable. Les requêtes passent par la pile Django complète
+# (middlewares, DRF, sérialiseurs) via le client de test, dans des threads ou
+# des processus.
+#
+# Mesures : débit, latences p50 / p99 / max, erreurs « database is locked »,
+# conflits de stock, et survente détectée (exemplaires réservés ou vendus au-delà
+# du stock initial de Book.quantites).
+#
+# Exemples :
+#   python benchmarks/checkout_stress.py
+#   python benchmarks/checkout_stress.py --customers 200 --stock 20 --workers 50
+#   python benchmarks/checkout_stress.py --mode processes --workers 8 --checkout
+#   python benchmarks/checkout_stress.py --json avant.json   # comparer avant / après
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from types import SimpleNamespace
+from unittest import mock
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+LOCKED = 'database is locked'
+
+
+def configure_environment(workdir):
+    """Base jetable et services externes remplacés (avant django.setup())"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'zoonova.settings')
+    os.environ['DATABASE_ENGINE'] = 'django.db.backends.sqlite3'
+    os.environ['DATABASE_NAME'] = os.path.join(workdir, 'default.sqlite3')
+    os.environ['ANALYTICS_DATABASE_ENGINE'] = 'django.db.backends.sqlite3'
+    os.environ['ANALYTICS_DATABASE_NAME'] = os.path.join(workdir, 'analytics.sqlite3')
+    os.environ['EMAIL_BACKEND'] = 'django.core.mail.backends.locmem.EmailBackend'
+    os.environ['STRIPE_SECRET_KEY'] = 'sk_test_benchmark'
+    os.environ['STRIPE_SUCCESS_URL'] = 'http://localhost/success'
+    os.environ['STRIPE_CANCEL_URL'] = 'http://localhost/cancel'
+    os.environ['ALLOWED_HOSTS'] = 'testserver,localhost'
+
+
+def describe_exception(exception):
+    """Type, message et dernière ligne du projet dans la pile"""
+    frames = [
+        frame for frame in traceback.extract_tb(exception.__traceback__)
+        if frame.filename.startswith(BASE_DIR) and 'site-packages' not in frame.filename
+    ]
+    where = f' ({os.path.relpath(frames[-1].filename, BASE_DIR)}:{frames[-1].lineno})' if frames else ''
+    return f'{type(exception).__name__}: {exception}{where}'
+
+
+_errors = threading.local()
+
+
+class ErrorCapture(logging.Handler):
+    """Garde la dernière exception journalisée par django.request dans le thread courant"""
+
+    def emit(self, record):
+        if record.exc_info and record.exc_info[1] is not None:
+            _errors.last = describe_exception(record.exc_info[1])
+
+
+def _stripe_session(latency):
+    """Stand-in de stripe.checkout.Session.create (latence réseau simulée)"""
+    def create(**kwargs):
+        if latency:
+            time.sleep(latency)
+        session_id = f"cs_test_{kwargs['metadata']['order_id']}"
+        return SimpleNamespace(id=session_id, url=f'https://checkout.stripe.test/{session_id}')
+    return create
+
+
+_stripe_patch = None
+
+
+def init_worker(workdir, stripe_latency):
+    """Initialise Django dans un processus (ou le processus principal)"""
+    global _stripe_patch
+
+    configure_environment(workdir)
+    import django
+    django.setup()
+    # Les erreurs sont comptées dans le rapport, pas affichées une à une
+    request_logger = logging.getLogger('django.request')
+    request_logger.handlers = [ErrorCapture()]
+    request_logger.propagate = False
+
+    if _stripe_patch is None:
+        _stripe_patch = mock.patch('stripe.checkout.Session.create', side_effect=_stripe_session(stripe_latency))
+        _stripe_patch.start()
+
+
+def seed(stock):
+    """Migre les deux bases et crée le best-seller et le pays de livraison"""
+    from django.core.management import call_command
+    from django.db import connections
+
+    from books.inventory import record_initial_stock
+    from books.models import Book
+    from orders.models import Country
+
+    call_command('migrate', verbosity=0)
+    call_command('migrate', database='analytics', verbosity=0)
+
+    country = Country.objects.create(name='France', code='FR', shipping_zone='france', shipping_cost=471)
+    book = Book.objects.create(
+        titre='Best-seller', nom='Auteur', description='Benchmark', prix=2000,
+        quantites=stock, slug='best-seller', code_bare='9780000000000'
+    )
+    record_initial_stock(book, note='Benchmark')
+
+    connections.close_all()
+    return {'book_id': book.id, 'country_id': country.id}
+
+
+def buy(index, book_id, country_id, quantity, checkout, start_at):
+    """
+    Un client : création de commande puis, si demandé, session de paiement.
+
+    Returns:
+        dict: statut, latences et erreur éventuelle
+    """
+    from django.db import connections
+    from django.test import Client
+
+    # Les exceptions sont lues dans le journal django.request du thread :
+    # le client de test les partage entre threads (signal global)
+    client = Client(raise_request_exception=False)
+    payload = {
+        'email': f'client{index}@example.com',
+        'first_name': 'Client',
+        'last_name': str(index),
+        'phone': '0600000000',
+        'voie': 'rue des Livres',
+        'numero_voie': '1',
+        'code_postal': '75001',
+        'ville': 'Paris',
+        'country': country_id,
+        'items': [{'book_id': book_id, 'quantity': quantity}],
+    }
+
+    # Départ simultané de tous les clients
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+
+    result = {'status': None, 'latency': None, 'checkout_status': None, 'checkout_latency': None, 'error': ''}
+    started = time.perf_counter()
+    try:
+        _errors.last = ''
+        response = client.post('/api/v1/orders/', payload, content_type='application/json')
+        result['status'] = response.status_code
+        if response.status_code >= 400:
+            result['error'] = _errors.last or response.content.decode(errors='replace')[:300]
+        elif checkout:
+            order_id = response.json()['order']['id']
+            checkout_started = time.perf_counter()
+            response = client.post(
+                '/api/v1/payments/create-checkout/', {'order_id': order_id}, content_type='application/json'
+            )
+            result['checkout_latency'] = time.perf_counter() - checkout_started
+            result['checkout_status'] = response.status_code
+            if response.status_code >= 400:
+                result['error'] = _errors.last or response.content.decode(errors='replace')[:300]
+    except Exception as e:
+        result['status'] = 'exception'
+        result['error'] = describe_exception(e)
+    finally:
+        result['latency'] = time.perf_counter() - started
+        connections.close_all()
+    return result
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(round(fraction * (len(values) - 1))), len(values) - 1)]
+
+
+def check_stock(book_id, stock):
+    """Compare les exemplaires réservés ou vendus au stock initial"""
+    from django.db.models import Sum
+
+    from books.models import Book
+    from orders.models import OrderItem, StockReservation
+
+    book = Book.objects.with_stock().get(pk=book_id)
+    ordered = OrderItem.objects.filter(book_id=book_id).aggregate(total=Sum('quantity'))['total'] or 0
+    reserved = StockReservation.objects.filter(
+        book_id=book_id, status='active'
+    ).aggregate(total=Sum('quantity'))['total'] or 0
+    return {
+        'initial_stock': stock,
+        'units_ordered': ordered,
+        'active_reservations': reserved,
+        'reserved_quantity': book.reserved_quantity,
+        'effective_stock': book.stock_quantity,
+        'oversold_units': max(ordered - stock, 0),
+        'reserved_counter_drift': book.reserved_quantity - reserved,
+    }
+
+
+def run(options):
+    workdir = tempfile.mkdtemp(prefix='checkout_stress_')
+    try:
+        init_worker(workdir, options.stripe_latency / 1000)
+        seeded = seed(options.stock)
+
+        start_at = time.time() + 1.0 + (2.0 if options.mode == 'processes' else 0)
+        args = (seeded['book_id'], seeded['country_id'], options.quantity, options.checkout, start_at)
+
+        if options.mode == 'threads':
+            executor = ThreadPoolExecutor(max_workers=options.workers)
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=options.workers,
+                mp_context=get_context('spawn'),
+                initializer=init_worker,
+                initargs=(workdir, options.stripe_latency / 1000)
+            )
+        with executor:
+            futures = [executor.submit(buy, index, *args) for index in range(options.customers)]
+            results = [future.result() for future in futures]
+        elapsed = time.time() - start_at
+
+        # Statistiques de ventes en mémoire tampon : écrites avant la suppression de la base
+        from books.stats import flush_book_stats
+        flush_book_stats()
+
+        latencies = [result['latency'] for result in results]
+        statuses = {}
+        for result in results:
+            statuses[str(result['status'])] = statuses.get(str(result['status']), 0) + 1
+        # Verrou non obtenu à temps : 503 (zoonova.utils.custom_exception_handler)
+        locked = sum(1 for result in results if LOCKED in result['error'] or result['status'] == 503)
+        created = sum(1 for result in results if result['status'] == 201)
+        conflicts = sum(1 for result in results if result['status'] in (400, 409) and 'Stock insuffisant' in result['error'])
+        checkout_latencies = [result['checkout_latency'] for result in results if result['checkout_latency'] is not None]
+
+        report = {
+            'mode': options.mode,
+            'workers': options.workers,
+            'customers': options.customers,
+            'quantity': options.quantity,
+            'checkout': options.checkout,
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput_rps': round(len(results) / elapsed, 1) if elapsed > 0 else None,
+            'statuses': statuses,
+            'orders_created': created,
+            'stock_conflicts': conflicts,
+            'database_locked_errors': locked,
+            'other_errors': sum(
+                1 for result in results
+                if result['error'] and LOCKED not in result['error'] and result['status'] != 503
+                and 'Stock insuffisant' not in result['error']
+            ),
+            'latency_ms': {
+                'p50': round(percentile(latencies, 0.50) * 1000, 1),
+                'p99': round(percentile(latencies, 0.99) * 1000, 1),
+                'max': round(max(latencies) * 1000, 1),
+            },
+            'stock': check_stock(seeded['book_id'], options.stock),
+        }
+        if checkout_latencies:
+            report['checkout_latency_ms'] = {
+                'p50': round(percentile(checkout_latencies, 0.50) * 1000, 1),
+                'p99': round(percentile(checkout_latencies, 0.99) * 1000, 1),
+            }
+        report['sample_errors'] = sorted({
+            result['error'].strip().splitlines()[-1][:200] for result in results
+            if result['error'] and 'Stock insuffisant' not in result['error']
+        })[:5]
+        return report
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def print_report(report):
+    stock = report['stock']
+    print(f"{report['customers']} clients ({report['mode']}, {report['workers']} workers), "
+          f"{report['quantity']} exemplaire(s) chacun, stock initial {stock['initial_stock']}")
+    print(f"  Durée         : {report['elapsed_seconds']} s, {report['throughput_rps']} requêtes/s")
+    print(f"  Latence       : p50 {report['latency_ms']['p50']} ms, p99 {report['latency_ms']['p99']} ms, "
+          f"max {report['latency_ms']['max']} ms")
+    if 'checkout_latency_ms' in report:
+        print(f"  Paiement      : p50 {report['checkout_latency_ms']['p50']} ms, "
+              f"p99 {report['checkout_latency_ms']['p99']} ms")
+    print(f"  Statuts HTTP  : {report['statuses']}")
+    print(f"  Commandes     : {report['orders_created']} créée(s), {report['stock_conflicts']} refus de stock")
+    print(f"  Verrous SQLite: {report['database_locked_errors']} « {LOCKED} »")
+    print(f"  Autres erreurs: {report['other_errors']}")
+    for error in report['sample_errors']:
+        print(f"    - {error}")
+    print(f"  Stock         : {stock['units_ordered']} exemplaire(s) commandé(s), "
+          f"{stock['active_reservations']} réservé(s), compteur reserved_quantity {stock['reserved_quantity']}")
+    if stock['oversold_units'] or stock['reserved_counter_drift']:
+        print(f"  SURVENTE      : {stock['oversold_units']} exemplaire(s) au-delà du stock, "
+              f"écart du compteur de réservation {stock['reserved_counter_drift']}")
+    else:
+        print("  Survente      : aucune")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de concurrence sur la création de commande")
+    parser.add_argument('--customers', type=int, default=200, help='Nombre de clients simultanés')
+    parser.add_argument('--stock', type=int, default=20, help='Stock initial du best-seller')
+    parser.add_argument('--quantity', type=int, default=1, help='Exemplaires achetés par client')
+    parser.add_argument('--mode', choices=['threads', 'processes'], default='threads')
+    parser.add_argument('--workers', type=int, default=50, help='Threads ou processus en parallèle')
+    parser.add_argument('--checkout', action='store_true', help='Créer aussi la session de paiement (Stripe simulé)')
+    parser.add_argument('--stripe-latency', type=float, default=0, help='Latence simulée de Stripe (ms)')
+    parser.add_argument('--json', default=None, help='Fichier où écrire le rapport JSON')
+    options = parser.parse_args()
+
+    report = run(options)
+    print_report(report)
+    if options.json:
+        with open(options.json, 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+
+    # Code de sortie non nul en cas de survente (utilisable en CI)
+    return 1 if report['stock']['oversold_units'] or report['stock']['reserved_counter_drift'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,7 +1,10 @@
 from django.contrib import admin
+from django.db import models
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
-from .models import Book
+from .models import Book, InventoryMovement, PriceSchedule, RestockSuggestion, StockSubscription
+from .inventory import record_initial_stock, set_stock
+from .pricing import refresh_current_prices
 from media.admin import BookImageInline, BookVideoInline
 
 # --- 1. Création du filtre personnalisé ---
@@ -20,19 +23,27 @@ class InventoryStatusFilter(admin.SimpleListFilter):
     def queryset(self, request, queryset):
         """Filtre la requête selon l'option choisie"""
         if self.value() == 'in_stock':
-            return queryset.filter(quantites__gt=0)
+            return queryset.filter(effective_stock__gt=0)
         if self.value() == 'out_of_stock':
-            return queryset.filter(quantites=0)
+            return queryset.filter(effective_stock__lte=0)
         if self.value() == 'low_stock':
-            return queryset.filter(quantites__gt=0, quantites__lt=5)
+            return queryset.filter(effective_stock__gt=0, effective_stock__lt=5)
         return queryset
 
 
+class PriceScheduleInline(admin.TabularInline):
+    """Promotions et changements de prix programmés du livre"""
+    model = PriceSchedule
+    extra = 0
+    fields = ('price', 'starts_at', 'ends_at', 'label')
+    ordering = ('-starts_at',)
+
+
 # --- 2. Configuration de l'Admin ---
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     # Inlines pour les images et vidéos
-    inlines = [BookImageInline, BookVideoInline]
+    inlines = [BookImageInline, BookVideoInline, PriceScheduleInline]
     
     # Liste des colonnes
     list_display = (
@@ -65,8 +76,9 @@ class BookAdmin(admin.ModelAdmin):
             'fields': ('titre', 'slug', 'nom', 'description', 'legende')
         }),
         ('Commerce', {
-            'fields': (('prix', 'display_prix_hint'), 'quantites', 'is_active', 'is_featured'),
-            'description': "Le prix doit être entré en centimes (ex: 2500 pour 25.00€)."
+            'fields': (('prix', 'display_prix_hint'), 'prix_courant', ('quantites', 'reserved_quantity'), 'is_active', 'is_featured'),
+            'description': "Le prix doit être entré en centimes (ex: 2500 pour 25.00€). "
+                           "Le prix courant suit les prix programmés ci-dessous."
         }),
         ('Détails Éditoriaux', {
             'fields': ('editeur', 'date_publication', 'langue', 'code_bare', 'nombre_pages'),
@@ -88,6 +100,8 @@ class BookAdmin(admin.ModelAdmin):
     
     readonly_fields = (
         'display_prix_hint', 
+        'prix_courant', 
+        'reserved_quantity', 
         'views_count', 
         'sales_count', 
         'created_at', 
@@ -96,23 +110,48 @@ class BookAdmin(admin.ModelAdmin):
     
     save_on_top = True
 
+    def get_queryset(self, request):
+        # Stock effectif : instantané + mouvements d'inventaire pas encore compactés
+        return super().get_queryset(request).with_stock()
+
+    def get_object(self, request, object_id, from_field=None):
+        # Le formulaire affiche et compare le stock effectif
+        obj = super().get_object(request, object_id, from_field)
+        if obj is not None:
+            obj.quantites = obj.stock_quantity
+        return obj
+
+    def save_model(self, request, obj, form, change):
+        """Le stock saisi est enregistré comme mouvement d'inventaire"""
+        super().save_model(request, obj, form, change)
+        if not change:
+            record_initial_stock(obj, note=f"Création par {request.user}")
+        elif 'quantites' in form.changed_data:
+            set_stock(obj, obj.quantites, note=f"Admin ({request.user})")
+
     # --- Méthodes Personnalisées ---
 
-    @admin.display(description="Prix (€)")
+    @admin.display(description="Prix (€)", ordering='prix_courant')
     def display_prix_euros(self, obj):
-        return f"{obj.prix / 100:.2f} €"
+        if obj.en_promotion:
+            return format_html(
+                '<s>{}</s> <span style="color: green; font-weight: bold;">{}</span>',
+                f"{obj.prix / 100:.2f} €", f"{obj.prix_courant / 100:.2f} €"
+            )
+        return f"{obj.prix_courant / 100:.2f} €"
 
     @admin.display(description="Stock")
     def display_stock_status(self, obj):
-        if obj.quantites == 0:
+        stock = obj.stock_quantity
+        if stock <= 0:
             color = 'red'
             text = 'Rupture'
-        elif obj.quantites < 5:
+        elif stock < 5:
             color = 'orange'
-            text = f'Faible ({obj.quantites})'
+            text = f'Faible ({stock})'
         else:
             color = 'green'
-            text = f'{obj.quantites}'
+            text = f'{stock}'
             
         return format_html(
             '<span style="color: {}; font-weight: bold;">{}</span>',
@@ -123,4 +162,109 @@ class BookAdmin(admin.ModelAdmin):
     def display_prix_hint(self, obj):
         if obj.prix:
             return f"Soit {obj.prix / 100:.2f} €"
-        return "0.00 €"
\ No newline at end of file
+        return "0.00 €"
+
+
+# --- 3. Journal d'inventaire ---
+@admin.register(InventoryMovement)
+class InventoryMovementAdmin(admin.ModelAdmin):
+    """Mouvements de stock (journal en ajout seul, lecture seule)"""
+    list_display = ('created_at', 'book', 'delta', 'reason', 'order', 'note', 'applied')
+    list_filter = ('reason', 'applied', 'created_at')
+    search_fields = ('book__titre', 'book__code_bare', 'note')
+    list_select_related = ('book', 'order')
+    raw_id_fields = ('book', 'order')
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# --- 4. Alertes de retour en stock ---
+@admin.register(StockSubscription)
+class StockSubscriptionAdmin(admin.ModelAdmin):
+    """Demandes d'alerte des visiteurs (envoyées par `manage.py send_stock_notifications`)"""
+    list_display = ('email', 'book', 'status', 'attempts', 'created_at', 'notified_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('email', 'book__titre', 'book__code_bare')
+    list_select_related = ('book',)
+    raw_id_fields = ('book',)
+    readonly_fields = ('attempts', 'created_at', 'notified_at')
+    date_hierarchy = 'created_at'
+
+
+# --- 5. Rapport de réassort ---
+@admin.register(RestockSuggestion)
+class RestockSuggestionAdmin(admin.ModelAdmin):
+    """Rapport calculé par `manage.py forecast_restock` (lecture seule)"""
+    list_display = (
+        'display_book',
+        'stock',
+        'daily_forecast',
+        'display_days_of_cover',
+        'suggested_quantity',
+        'method',
+        'computed_at'
+    )
+    list_filter = ('method',)
+    search_fields = ('book__titre', 'book__code_bare')
+    ordering = (models.F('days_of_cover').asc(nulls_last=True),)
+
+    def get_queryset(self, request):
+        # Livres chargés par une requête séparée (suggestions dans la base analytics)
+        return super().get_queryset(request).prefetch_related('book')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Recherche les livres dans la base principale, puis filtre par identifiant"""
+        if not search_term:
+            return queryset, False
+        book_ids = Book.objects.filter(
+            models.Q(titre__icontains=search_term) | models.Q(code_bare__icontains=search_term)
+        ).values_list('id', flat=True)
+        return queryset.filter(book_id__in=list(book_ids)), False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Livre")
+    def display_book(self, obj):
+        # Pas de champ FK dans list_display : l'admin ajouterait un select_related
+        # impossible entre les deux bases
+        return obj.book
+
+    @admin.display(description="Jours de couverture", ordering='days_of_cover')
+    def display_days_of_cover(self, obj):
+        if obj.days_of_cover is None:
+            return "∞"
+        color = 'red' if obj.days_of_cover < 7 else 'orange' if obj.days_of_cover < 30 else 'green'
+        return format_html(
+            '<span style="color: {}; font-weight: bold;">{}</span>',
+            color, f'{obj.days_of_cover:.1f}'
+        )
+
+
+# --- 6. Prix programmés ---
+@admin.register(PriceSchedule)
+class PriceScheduleAdmin(admin.ModelAdmin):
+    """Promotions programmées (appliquées par `manage.py apply_price_schedules`)"""
+    list_display = ('book', 'price', 'starts_at', 'ends_at', 'label')
+    list_filter = ('starts_at', 'ends_at')
+    search_fields = ('label', 'book__titre', 'book__code_bare')
+    list_select_related = ('book',)
+    raw_id_fields = ('book',)
+    date_hierarchy = 'starts_at'
+
+    def delete_queryset(self, request, queryset):
+        # Suppression groupée : PriceSchedule.delete() n'est pas appelé
+        book_ids = set(queryset.values_list('book_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_current_prices(book_ids)
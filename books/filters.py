@@ -0,0 +1,18 @@
+# books/filters.py
+
+from rest_framework import filters
+
+
+class BookOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter acceptant des alias lisibles en plus des noms de champs
+    (ex: `?ordering=trending` pour trier par score de tendance décroissant)
+    """
+    ordering_aliases = {
+        'trending': '-trending_score',
+        '-trending': 'trending_score',
+    }
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        fields = [self.ordering_aliases.get(field, field) for field in fields]
+        return super().remove_invalid_fields(queryset, fields, view, request)
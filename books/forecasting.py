@@ -0,0 +1,132 @@
+# books/forecasting.py
+
+# ============================================
+# BOOKS - Prévision des ventes et réassort
+# ============================================
+
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+
+def load_daily_sales(book_ids, start, days):
+    """
+    Charge les ventes journalières des livres dans une matrice
+    (livres x jours), à partir de la table d'agrégats BookDailyStats.
+
+    BookDailyStats est dans la base analytics : les livres ne sont pas
+    filtrés par un `book_id__in` de tout le catalogue (paramètres en nombre
+    illimité), les ventes de la période sont lues en flux et celles des
+    livres hors de `book_ids` ignorées.
+    """
+    from .models import BookDailyStats
+
+    index = {book_id: i for i, book_id in enumerate(book_ids)}
+    sales = np.zeros((len(book_ids), days))
+
+    rows = BookDailyStats.objects.filter(
+        date__gte=start,
+        date__lt=start + timedelta(days=days),
+        units_sold__gt=0
+    ).values_list('book_id', 'date', 'units_sold').iterator(chunk_size=settings.REPORTING_READ_CHUNK_SIZE)
+
+    records = [
+        (index[book_id], (day - start).days, units)
+        for book_id, day, units in rows
+        if book_id in index
+    ]
+    if records:
+        book_idx, day_idx, units = np.array(records).T
+        np.add.at(sales, (book_idx.astype(int), day_idx.astype(int)), units)
+    return sales
+
+
+def moving_average(sales, window):
+    """Moyenne mobile des `window` derniers jours, pour tous les livres à la fois"""
+    return sales[:, -window:].mean(axis=1)
+
+
+def exponential_smoothing(sales, alpha):
+    """
+    Lissage exponentiel simple : la boucle porte sur les jours, chaque pas
+    est calculé pour tous les livres en une seule opération vectorielle.
+    """
+    level = sales[:, 0].copy()
+    for day in range(1, sales.shape[1]):
+        level = alpha * sales[:, day] + (1 - alpha) * level
+    return level
+
+
+def restock_plan(stock, forecast, lead_time, cover_days):
+    """
+    Jours de couverture et quantités à commander pour tenir `lead_time`
+    jours de délai fournisseur plus `cover_days` jours de ventes.
+    
+    Returns:
+        tuple: (jours de couverture, inf si aucune vente prévue ;
+                quantités suggérées, entiers >= 0)
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_of_cover = np.where(forecast > 0, stock / forecast, np.inf)
+    target = forecast * (lead_time + cover_days)
+    suggested = np.maximum(np.ceil(target - stock), 0).astype(int)
+    return days_of_cover, suggested
+
+
+def compute_restock_suggestions(method=None, history_days=None, window=None, alpha=None,
+                                lead_time=None, cover_days=None):
+    """
+    Calcule et enregistre les suggestions de réassort de tous les livres actifs.
+    
+    Returns:
+        int: nombre de livres traités
+    """
+    from .models import Book, RestockSuggestion
+
+    method = method or settings.RESTOCK_FORECAST_METHOD
+    history_days = history_days or settings.RESTOCK_HISTORY_DAYS
+    window = min(window or settings.RESTOCK_SMA_WINDOW, history_days)
+    alpha = alpha or settings.RESTOCK_SES_ALPHA
+    lead_time = settings.RESTOCK_LEAD_TIME_DAYS if lead_time is None else lead_time
+    cover_days = settings.RESTOCK_COVER_DAYS if cover_days is None else cover_days
+
+    books = list(Book.objects.with_stock().filter(is_active=True).values_list('id', 'effective_stock'))
+    if not books:
+        return 0
+
+    book_ids = [book_id for book_id, _ in books]
+    stock = np.array([max(quantites, 0) for _, quantites in books], dtype=float)
+
+    # Historique jusqu'à hier inclus : la journée en cours est incomplète
+    today = timezone.localdate()
+    sales = load_daily_sales(book_ids, today - timedelta(days=history_days), history_days)
+
+    if method == 'sma':
+        forecast = moving_average(sales, window)
+    else:
+        forecast = exponential_smoothing(sales, alpha)
+
+    days_of_cover, suggested = restock_plan(stock, forecast, lead_time, cover_days)
+
+    now = timezone.now()
+    RestockSuggestion.objects.bulk_create(
+        [
+            RestockSuggestion(
+                book_id=book_id,
+                method=method,
+                stock=int(stock[i]),
+                daily_forecast=round(float(forecast[i]), 4),
+                days_of_cover=round(float(days_of_cover[i]), 1) if np.isfinite(days_of_cover[i]) else None,
+                suggested_quantity=int(suggested[i]),
+                computed_at=now,
+            )
+            for i, book_id in enumerate(book_ids)
+        ],
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['book'],
+        update_fields=['method', 'stock', 'daily_forecast', 'days_of_cover', 'suggested_quantity', 'computed_at'],
+    )
+    return len(book_ids)
@@ -0,0 +1,149 @@
+# ============================================
+# BOOKS - Journal d'inventaire (mouvements de stock)
+# ============================================
+#
+# Le stock n'est plus modifié en place : chaque variation (vente, ajustement,
+# stock initial) est un InventoryMovement inséré en ajout seul. Plusieurs
+# ventes simultanées du même livre ne se disputent donc plus la ligne Book.
+#
+# Book.quantites est un instantané : `compact_movements` (manage.py
+# compact_inventory) y reporte périodiquement les mouvements non appliqués.
+# Stock effectif = quantites + somme des mouvements non appliqués
+# (Book.objects.with_stock()).
+
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+logger = logging.getLogger(__name__)
+
+
+def record_movements(movements):
+    """Insère une liste d'InventoryMovement en une seule requête"""
+    from .models import InventoryMovement
+    from .notifications import queue_stock_notifications
+
+    movements = InventoryMovement.objects.bulk_create(movements)
+    queue_stock_notifications({movement.book_id for movement in movements if movement.delta > 0})
+    return movements
+
+
+def record_initial_stock(book, note=''):
+    """
+    Trace le stock saisi à la création d'un livre. Le mouvement est déjà
+    appliqué : la quantité est dans Book.quantites.
+    """
+    from .models import InventoryMovement
+
+    if book.quantites:
+        InventoryMovement.objects.create(
+            book=book,
+            delta=book.quantites,
+            reason='initial',
+            note=note,
+            applied=True
+        )
+
+
+def set_stock(book, quantity, reason='adjustment', note=''):
+    """
+    Fixe le stock effectif d'un livre (inventaire, réception) en insérant le
+    mouvement d'écart avec le stock effectif actuel. Le stock est relu sous
+    verrou : deux saisies simultanées ne calculent pas leur écart sur la même
+    valeur.
+
+    Returns:
+        InventoryMovement | None: le mouvement inséré (None si aucun écart)
+    """
+    from .models import Book, InventoryMovement
+
+    with transaction.atomic():
+        list(Book.objects.select_for_update().filter(pk=book.pk).values_list('pk'))
+        current = Book.objects.with_stock().values_list('effective_stock', flat=True).get(pk=book.pk)
+        delta = quantity - current
+        if not delta:
+            return None
+        movement, = record_movements([
+            InventoryMovement(book_id=book.pk, delta=delta, reason=reason, note=note)
+        ])
+    return movement
+
+
+def compact_movements(batch_size=None):
+    """
+    Reporte par lots les mouvements non appliqués dans Book.quantites, en un
+    seul UPDATE par lot. Les mouvements verrouillés par une autre compaction
+    sont ignorés.
+
+    `quantites` ne peut pas être négatif : un solde négatif (survente) est
+    ramené à 0 par un mouvement `correction` déjà appliqué, pour que
+    l'instantané reste égal à la somme des mouvements appliqués.
+
+    Returns:
+        tuple: (nombre de mouvements appliqués, nombre de livres mis à jour)
+    """
+    from .models import Book, InventoryMovement
+
+    batch_size = batch_size or settings.INVENTORY_COMPACT_BATCH_SIZE
+    applied = 0
+    books = set()
+
+    while True:
+        with transaction.atomic():
+            rows = list(
+                InventoryMovement.objects
+                .filter(applied=False)
+                .select_for_update(skip_locked=True)
+                .order_by('id')
+                .values_list('id', 'book_id', 'delta')[:batch_size]
+            )
+            if not rows:
+                return applied, len(books)
+
+            deltas = Counter()
+            for _, book_id, delta in rows:
+                deltas[book_id] += delta
+
+            book_ids = [book_id for book_id in sorted(deltas) if deltas[book_id]]
+            if book_ids:
+                current = dict(
+                    Book.objects.select_for_update().filter(pk__in=book_ids)
+                    .order_by('pk').values_list('pk', 'quantites')
+                )
+                corrections = {
+                    book_id: -(current[book_id] + deltas[book_id])
+                    for book_id in current
+                    if current[book_id] + deltas[book_id] < 0
+                }
+                Book.objects.filter(pk__in=book_ids).update(
+                    quantites=F('quantites') + Case(
+                        *[
+                            When(pk=book_id, then=Value(deltas[book_id] + corrections.get(book_id, 0)))
+                            for book_id in book_ids
+                        ],
+                        output_field=IntegerField()
+                    )
+                )
+                if corrections:
+                    logger.warning(f"Inventaire : stock négatif ramené à 0 pour les livres {sorted(corrections)}")
+                    InventoryMovement.objects.bulk_create([
+                        InventoryMovement(
+                            book_id=book_id,
+                            delta=correction,
+                            reason='correction',
+                            note="Stock négatif ramené à 0 (survente)",
+                            applied=True
+                        )
+                        for book_id, correction in sorted(corrections.items())
+                    ])
+
+            InventoryMovement.objects.filter(
+                id__in=[movement_id for movement_id, _, _ in rows]
+            ).update(applied=True)
+
+        applied += len(rows)
+        books.update(deltas)
+        logger.info(f"Inventaire : {len(rows)} mouvements compactés sur {len(deltas)} livres")
@@ -0,0 +1,23 @@
+# books/management/commands/apply_price_schedules.py
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from books.pricing import next_price_boundary, refresh_current_prices
+
+
+class Command(BaseCommand):
+    help = (
+        "Recopie le prix en vigueur (prix programmés) dans Book.prix_courant. "
+        "À planifier chaque minute (cron) : les promotions démarrent et se terminent à la borne suivante"
+    )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        changed = refresh_current_prices(at=now)
+        boundary = next_price_boundary(now)
+        suffix = (
+            f", prochaine borne le {timezone.localtime(boundary):%d/%m/%Y %H:%M}"
+            if boundary else ''
+        )
+        self.stdout.write(self.style.SUCCESS(f'{changed} prix mis à jour{suffix}'))
@@ -0,0 +1,21 @@
+# books/management/commands/compact_inventory.py
+
+from django.core.management.base import BaseCommand
+
+from books.inventory import compact_movements
+
+
+class Command(BaseCommand):
+    help = (
+        "Reporte les mouvements d'inventaire non appliqués dans Book.quantites. "
+        "À planifier régulièrement (cron), par exemple toutes les 5 minutes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        movements, books = compact_movements(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{movements} mouvement(s) appliqué(s) sur {books} livre(s)'
+        ))
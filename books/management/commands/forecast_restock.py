@@ -0,0 +1,28 @@
+# books/management/commands/forecast_restock.py
+
+from django.core.management.base import BaseCommand
+
+from books.forecasting import compute_restock_suggestions
+
+
+class Command(BaseCommand):
+    help = "Prévoit les ventes de tous les livres et calcule les suggestions de réassort"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--method', choices=['sma', 'ses'], help='Moyenne mobile ou lissage exponentiel')
+        parser.add_argument('--history-days', type=int, help="Nombre de jours d'historique")
+        parser.add_argument('--window', type=int, help='Fenêtre de la moyenne mobile (jours)')
+        parser.add_argument('--alpha', type=float, help='Coefficient du lissage exponentiel (0-1)')
+        parser.add_argument('--lead-time', type=int, help='Délai fournisseur (jours)')
+        parser.add_argument('--cover-days', type=int, help='Jours de ventes à couvrir après réception')
+
+    def handle(self, *args, **options):
+        count = compute_restock_suggestions(
+            method=options['method'],
+            history_days=options['history_days'],
+            window=options['window'],
+            alpha=options['alpha'],
+            lead_time=options['lead_time'],
+            cover_days=options['cover_days'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'{count} livre(s) analysé(s)'))
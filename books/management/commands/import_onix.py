@@ -0,0 +1,51 @@
+# books/management/commands/import_onix.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.onix import import_onix
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée ou met à jour les livres d'un fichier ONIX éditeur (clé : ISBN-13). "
+        "Le fichier est lu en flux, en mémoire constante"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichier ONIX (XML)')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--activate',
+            action='store_true',
+            help='Publier directement les nouveaux livres ayant un prix (défaut: créés inactifs)'
+        )
+        parser.add_argument(
+            '--report',
+            default=None,
+            help='Fichier JSON où écrire les notices ignorées'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as source:
+                report = import_onix(
+                    source,
+                    batch_size=options['batch_size'],
+                    activate=options['activate']
+                )
+        except OSError as e:
+            raise CommandError(f"Lecture de {options['path']} impossible: {e}")
+        except SyntaxError as e:  # xml.etree.ElementTree.ParseError
+            raise CommandError(f"Fichier ONIX invalide: {e}")
+
+        if options['report'] and report['skipped']:
+            with open(options['report'], 'w', encoding='utf-8') as output:
+                json.dump(report['skipped'], output, ensure_ascii=False, indent=2)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['products']} notice(s) : {report['created']} livre(s) créé(s), "
+            f"{report['updated']} mis à jour, {report['unchanged']} inchangé(s), "
+            f"{len(report['skipped'])} ignorée(s)"
+        ))
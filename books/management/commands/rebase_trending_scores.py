@@ -0,0 +1,16 @@
+# books/management/commands/rebase_trending_scores.py
+
+from django.core.management.base import BaseCommand
+
+from books.trending import current_scale, rebase_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Ramène les scores de tendance à leur valeur décrue et déplace leur origine à maintenant "
+        "(applique aussi TRENDING_HALF_LIFE_HOURS). À planifier chaque semaine (cron)"
+    )
+
+    def handle(self, *args, **options):
+        updated = rebase_scores()
+        self.stdout.write(self.style.SUCCESS(f'{updated} score(s) recalculé(s) - {current_scale()}'))
@@ -0,0 +1,38 @@
+# books/management/commands/rollup_book_stats.py
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from books.stats import flush_book_stats, rebuild_book_sales
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les ventes et le chiffre d'affaires de BookDailyStats "
+        "à partir des commandes (par défaut hier et aujourd'hui)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='Date de début AAAA-MM-JJ')
+        parser.add_argument('--to', dest='date_to', help='Date de fin AAAA-MM-JJ (incluse)')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        try:
+            date_to = parse_date(options['date_to']) if options['date_to'] else today
+            date_from = parse_date(options['date_from']) if options['date_from'] else today - timedelta(days=1)
+        except ValueError:
+            date_from = date_to = None
+
+        if not date_from or not date_to or date_from > date_to:
+            raise CommandError('Intervalle de dates invalide (format AAAA-MM-JJ)')
+
+        flush_book_stats()
+        rows = rebuild_book_sales(date_from, date_to)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{rows} ligne(s) de statistiques recalculée(s) du {date_from} au {date_to}'
+        ))
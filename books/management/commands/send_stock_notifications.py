@@ -0,0 +1,23 @@
+# books/management/commands/send_stock_notifications.py
+
+from django.core.management.base import BaseCommand
+
+from books.notifications import send_stock_notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Envoie les alertes de retour en stock en file, par lots sur une seule connexion SMTP. "
+        "À planifier régulièrement (cron), par exemple toutes les 15 minutes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        report = send_stock_notifications(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['emails']} email(s) envoyé(s) pour {report['notified']} alerte(s), "
+            f"{report['failed']} échec(s) dont {report['dead']} alerte(s) abandonnée(s), "
+            f"{report['requeued']} alerte(s) remise(s) en attente"
+        ))
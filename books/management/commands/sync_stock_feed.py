@@ -0,0 +1,59 @@
+# books/management/commands/sync_stock_feed.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.stockfeed import check_encoding, sync_stock_feed
+
+
+class Command(BaseCommand):
+    help = (
+        "Aligne le stock sur le flux CSV quotidien du distributeur (ISBN ; quantité). "
+        "Seuls les livres dont le stock change sont écrits"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichier CSV du distributeur')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Afficher les changements sans rien modifier'
+        )
+        parser.add_argument(
+            '--report',
+            default=None,
+            help='Fichier JSON où écrire le compte rendu complet (changements, ISBN inconnus, erreurs)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as raw:
+                check_encoding(iter(lambda: raw.read(64 * 1024), b''))
+            with open(options['path'], encoding='utf-8-sig', newline='') as feed:
+                report = sync_stock_feed(
+                    feed,
+                    dry_run=options['dry_run'],
+                    batch_size=options['batch_size'],
+                    note=f"Flux fournisseur {options['path']}"[:255]
+                )
+        except (OSError, UnicodeDecodeError) as e:
+            raise CommandError(f"Lecture de {options['path']} impossible: {e}")
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+        elif options['dry_run']:
+            for change in report['changes']:
+                self.stdout.write(f"{change['isbn']} : {change['old']} -> {change['new']}")
+
+        for error in report['errors']:
+            self.stderr.write(f"Ligne {error['line']} ({error['isbn']}): {error['error']}")
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{report['rows']} ligne(s) : {len(report['changes'])} changement(s), "
+            f"{report['unchanged']} inchangé(s), {len(report['unknown'])} ISBN inconnu(s), "
+            f"{len(report['errors'])} erreur(s)"
+        ))
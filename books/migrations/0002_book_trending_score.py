@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="trending_score",
+            field=models.FloatField(
+                db_index=True,
+                default=0,
+                help_text="Score de tendance (vues et ventes récentes, voir books/trending.py)",
+                verbose_name="Score de tendance",
+            ),
+        ),
+    ]
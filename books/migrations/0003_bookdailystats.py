@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0002_book_trending_score"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Jour")),
+                ("views", models.PositiveIntegerField(default=0, verbose_name="Vues")),
+                (
+                    "units_sold",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Exemplaires vendus"
+                    ),
+                ),
+                (
+                    "revenue",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Chiffre d'affaires en centimes",
+                        verbose_name="Chiffre d'affaires",
+                    ),
+                ),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="books.book",
+                        verbose_name="Livre",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Statistique journalière",
+                "verbose_name_plural": "Statistiques journalières",
+                "db_table": "book_daily_stats",
+                "ordering": ["date"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("book", "date"), name="unique_book_daily_stats"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0003_bookdailystats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RestockSuggestion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "method",
+                    models.CharField(
+                        choices=[
+                            ("sma", "Moyenne mobile"),
+                            ("ses", "Lissage exponentiel"),
+                        ],
+                        max_length=3,
+                        verbose_name="Méthode",
+                    ),
+                ),
+                ("stock", models.PositiveIntegerField(verbose_name="Stock au calcul")),
+                (
+                    "daily_forecast",
+                    models.FloatField(verbose_name="Ventes prévues / jour"),
+                ),
+                (
+                    "days_of_cover",
+                    models.FloatField(
+                        blank=True,
+                        db_index=True,
+                        help_text="Vide si aucune vente n'est prévue",
+                        null=True,
+                        verbose_name="Jours de couverture",
+                    ),
+                ),
+                (
+                    "suggested_quantity",
+                    models.PositiveIntegerField(
+                        db_index=True, default=0, verbose_name="Quantité à commander"
+                    ),
+                ),
+                ("computed_at", models.DateTimeField(verbose_name="Calculé le")),
+                (
+                    "book",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="restock_suggestion",
+                        to="books.book",
+                        verbose_name="Livre",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Suggestion de réassort",
+                "verbose_name_plural": "Suggestions de réassort",
+                "db_table": "restock_suggestions",
+                "ordering": ["days_of_cover"],
+            },
+        ),
+    ]
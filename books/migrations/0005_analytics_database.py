@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0004_restocksuggestion"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="bookdailystats",
+            name="book",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="daily_stats",
+                to="books.book",
+                verbose_name="Livre",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="restocksuggestion",
+            name="book",
+            field=models.OneToOneField(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="restock_suggestion",
+                to="books.book",
+                verbose_name="Livre",
+            ),
+        ),
+    ]
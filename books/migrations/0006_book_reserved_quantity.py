@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0005_analytics_database"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="reserved_quantity",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Exemplaires réservés par des commandes en attente de paiement (cache des réservations actives, voir orders/reservations.py)",
+                verbose_name="Quantité réservée",
+            ),
+        ),
+    ]
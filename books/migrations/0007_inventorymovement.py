@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0006_book_reserved_quantity"),
+        ("orders", "0007_stockreservation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InventoryMovement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("delta", models.IntegerField(verbose_name="Variation")),
+                (
+                    "reason",
+                    models.CharField(
+                        choices=[
+                            ("initial", "Stock initial"),
+                            ("adjustment", "Ajustement"),
+                            ("sale", "Vente"),
+                        ],
+                        max_length=20,
+                        verbose_name="Motif",
+                    ),
+                ),
+                (
+                    "note",
+                    models.CharField(blank=True, max_length=255, verbose_name="Note"),
+                ),
+                (
+                    "applied",
+                    models.BooleanField(
+                        default=False,
+                        help_text="Déjà reporté dans Book.quantites",
+                        verbose_name="Appliqué",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Créé le"),
+                ),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inventory_movements",
+                        to="books.book",
+                        verbose_name="Livre",
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="orders.order",
+                        verbose_name="Commande",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Mouvement de stock",
+                "verbose_name_plural": "Mouvements de stock",
+                "db_table": "inventory_movements",
+                "ordering": ["-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["book", "-id"], name="inventory_book_history_idx"
+                    ),
+                    models.Index(
+                        condition=models.Q(("applied", False)),
+                        fields=["book"],
+                        name="inventory_pending_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0007_inventorymovement"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="inventorymovement",
+            name="reason",
+            field=models.CharField(
+                choices=[
+                    ("initial", "Stock initial"),
+                    ("adjustment", "Ajustement"),
+                    ("sale", "Vente"),
+                    ("cancellation", "Annulation de commande"),
+                ],
+                max_length=20,
+                verbose_name="Motif",
+            ),
+        ),
+    ]
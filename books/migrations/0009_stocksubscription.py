@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0008_inventorymovement_cancellation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockSubscription",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("email", models.EmailField(max_length=254, verbose_name="Email")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("waiting", "En attente du stock"),
+                            ("queued", "À notifier"),
+                            ("sent", "Notifiée"),
+                        ],
+                        default="waiting",
+                        max_length=10,
+                        verbose_name="Statut",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Créée le"),
+                ),
+                (
+                    "notified_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Notifiée le"
+                    ),
+                ),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_subscriptions",
+                        to="books.book",
+                        verbose_name="Livre",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Alerte de retour en stock",
+                "verbose_name_plural": "Alertes de retour en stock",
+                "db_table": "stock_subscriptions",
+                "ordering": ["-created_at"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("status", "waiting")),
+                        fields=["book"],
+                        name="stock_subscription_waiting_idx",
+                    ),
+                    models.Index(
+                        condition=models.Q(("status", "queued")),
+                        fields=["id"],
+                        name="stock_subscription_queued_idx",
+                    ),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        condition=models.Q(("status", "sent"), _negated=True),
+                        fields=("book", "email"),
+                        name="stock_subscription_pending_unique",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_prices(apps, schema_editor):
+    """Aucune programmation existante : le prix courant est le prix"""
+    Book = apps.get_model('books', 'Book')
+    Book.objects.update(prix_courant=models.F('prix'))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0009_stocksubscription"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="prix_courant",
+            field=models.PositiveIntegerField(
+                db_index=True,
+                default=0,
+                help_text="Prix appliqué en centimes (promotion en cours comprise)",
+                verbose_name="Prix courant",
+            ),
+        ),
+        migrations.RunPython(copy_prices, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name="PriceSchedule",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "price",
+                    models.PositiveIntegerField(
+                        help_text="Prix en centimes pendant la période",
+                        verbose_name="Prix",
+                    ),
+                ),
+                ("starts_at", models.DateTimeField(verbose_name="Début")),
+                (
+                    "ends_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Vide : le prix reste en vigueur jusqu'à une nouvelle programmation",
+                        null=True,
+                        verbose_name="Fin",
+                    ),
+                ),
+                (
+                    "label",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="Libellé"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Créé le"),
+                ),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="price_schedules",
+                        to="books.book",
+                        verbose_name="Livre",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Prix programmé",
+                "verbose_name_plural": "Prix programmés",
+                "db_table": "price_schedules",
+                "ordering": ["-starts_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["book", "-starts_at"], name="price_schedule_book_idx"
+                    ),
+                    models.Index(fields=["ends_at"], name="price_schedule_ends_idx"),
+                ],
+                "constraints": [
+                    models.CheckConstraint(
+                        condition=models.Q(
+                            ("ends_at__isnull", True),
+                            ("ends_at__gt", models.F("starts_at")),
+                            _connector="OR",
+                        ),
+                        name="price_schedule_period_valid",
+                    )
+                ],
+            },
+        ),
+    ]
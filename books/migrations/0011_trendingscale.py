@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+from books.trending import TRENDING_EPOCH
+
+
+def seed_scale(apps, schema_editor):
+    """Échelle utilisée jusqu'ici par les scores stockés"""
+    TrendingScale = apps.get_model('books', 'TrendingScale')
+    TrendingScale.objects.get_or_create(
+        pk=1,
+        defaults={'epoch': TRENDING_EPOCH, 'half_life_hours': settings.TRENDING_HALF_LIFE_HOURS}
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0010_pricing"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendingScale",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("epoch", models.DateTimeField(verbose_name="Origine des scores")),
+                (
+                    "half_life_hours",
+                    models.FloatField(verbose_name="Demi-vie (heures)"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Modifiée le"),
+                ),
+            ],
+            options={
+                "verbose_name": "Échelle des scores de tendance",
+                "verbose_name_plural": "Échelle des scores de tendance",
+                "db_table": "trending_scale",
+            },
+        ),
+        migrations.RunPython(seed_scale, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0011_trendingscale"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="stocksubscription",
+            name="stock_subscription_pending_unique",
+        ),
+        migrations.RemoveIndex(
+            model_name="stocksubscription",
+            name="stock_subscription_queued_idx",
+        ),
+        migrations.AddField(
+            model_name="stocksubscription",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(
+                default=0, verbose_name="Envois échoués"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="stocksubscription",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("waiting", "En attente du stock"),
+                    ("queued", "À notifier"),
+                    ("sent", "Notifiée"),
+                    ("failed", "Échec d'envoi"),
+                ],
+                default="waiting",
+                max_length=10,
+                verbose_name="Statut",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stocksubscription",
+            index=models.Index(
+                condition=models.Q(("status", "queued")),
+                fields=["attempts", "id"],
+                name="stock_subscription_queued_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="stocksubscription",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("status__in", ["waiting", "queued"])),
+                fields=("book", "email"),
+                name="stock_subscription_pending_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0012_stocksubscription_attempts"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="inventorymovement",
+            name="reason",
+            field=models.CharField(
+                choices=[
+                    ("initial", "Stock initial"),
+                    ("adjustment", "Ajustement"),
+                    ("sale", "Vente"),
+                    ("cancellation", "Annulation de commande"),
+                    ("correction", "Correction (stock négatif)"),
+                ],
+                max_length=20,
+                verbose_name="Motif",
+            ),
+        ),
+    ]
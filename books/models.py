@@ -4,12 +4,46 @@
 # ============================================
 
 from django.db import models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.text import slugify
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 
+
+class BookQuerySet(models.QuerySet):
+    
+    def with_stock(self):
+        """
+        Annote le stock effectif : instantané `quantites` plus les mouvements
+        d'inventaire pas encore compactés (`pending_quantity`, `effective_stock`)
+        """
+        pending = (
+            InventoryMovement.objects
+            .filter(book=OuterRef('pk'), applied=False)
+            .order_by()
+            .values('book')
+            .annotate(total=Sum('delta'))
+            .values('total')
+        )
+        return self.annotate(
+            pending_quantity=Coalesce(Subquery(pending), Value(0))
+        ).annotate(
+            effective_stock=models.F('quantites') + models.F('pending_quantity')
+        )
+
+
 class Book(models.Model):
     """Livre du catalogue avec toutes les informations détaillées"""
     
+    # Colonnes modifiées uniquement par des UPDATE atomiques (inventaire,
+    # réservations, compteurs) : save() ne les réécrit jamais sur un livre
+    # existant, pour ne pas écraser une valeur plus récente
+    ATOMIC_FIELDS = ('quantites', 'reserved_quantity', 'views_count', 'sales_count', 'trending_score')
+    
+    objects = BookQuerySet.as_manager()
+    
     # Informations de base
     titre = models.CharField(max_length=255, db_index=True, verbose_name="Titre")
     nom = models.CharField(max_length=255, verbose_name="Nom/Auteur")
@@ -22,6 +56,15 @@ class Book(models.Model):
         validators=[MinValueValidator(0)],
         verbose_name="Prix"
     )
+    # Prix de vente courant : `prix`, ou prix de la promotion en cours
+    # (PriceSchedule). Matérialisé par books/pricing.py ; catalogue, filtres
+    # et commandes ne lisent que cette colonne
+    prix_courant = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        help_text="Prix appliqué en centimes (promotion en cours comprise)",
+        verbose_name="Prix courant"
+    )
     
     # Caractéristiques physiques du livre
     code_bare = models.CharField(
@@ -85,6 +128,12 @@ class Book(models.Model):
         help_text="Stock disponible",
         verbose_name="Quantité en stock"
     )
+    reserved_quantity = models.PositiveIntegerField(
+        default=0,
+        help_text="Exemplaires réservés par des commandes en attente de paiement "
+                  "(cache des réservations actives, voir orders/reservations.py)",
+        verbose_name="Quantité réservée"
+    )
     
     # SEO et URL
     slug = models.SlugField(max_length=255, unique=True, db_index=True)
@@ -94,6 +143,12 @@ class Book(models.Model):
     # Statistiques
     views_count = models.PositiveIntegerField(default=0, verbose_name="Vues")
     sales_count = models.PositiveIntegerField(default=0, verbose_name="Ventes")
+    trending_score = models.FloatField(
+        default=0,
+        db_index=True,
+        help_text="Score de tendance (vues et ventes récentes, voir books/trending.py)",
+        verbose_name="Score de tendance"
+    )
     
     # Gestion
     is_active = models.BooleanField(default=True, verbose_name="Actif")
@@ -115,6 +170,20 @@ class Book(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.titre)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'prix' in update_fields:
+            # Un nouveau livre n'a pas encore de prix programmé
+            self.prix_courant = (
+                self.prix if self._state.adding
+                else PriceSchedule.objects.current_price(self.pk, default=self.prix)
+            )
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'prix_courant'}
+        if not self._state.adding and update_fields is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.ATOMIC_FIELDS
+            ]
         super().save(*args, **kwargs)
     
     @property
@@ -122,10 +191,30 @@ class Book(models.Model):
         """Retourne le prix en euros"""
         return self.prix / 100
     
+    @property
+    def prix_courant_euros(self):
+        """Retourne le prix courant en euros"""
+        return self.prix_courant / 100
+    
+    @property
+    def en_promotion(self):
+        """Vrai si une promotion programmée baisse le prix"""
+        return self.prix_courant < self.prix
+    
+    @property
+    def stock_quantity(self):
+        """Stock physique : instantané plus mouvements en attente (si annotés via with_stock)"""
+        return self.quantites + getattr(self, 'pending_quantity', 0)
+    
+    @property
+    def available_quantity(self):
+        """Stock vendable : stock physique moins les réservations actives"""
+        return max(self.stock_quantity - self.reserved_quantity, 0)
+    
     @property
     def in_stock(self):
         """Vérifie si le livre est en stock"""
-        return self.quantites > 0
+        return self.available_quantity > 0
     
     @property
     def dimensions(self):
@@ -134,3 +223,322 @@ class Book(models.Model):
             return f"{self.largeur_cm} × {self.hauteur_cm} × {self.epaisseur_cm} cm"
         return "Non renseignées"
 
+
+
+class PriceScheduleQuerySet(models.QuerySet):
+    
+    def active(self, at=None):
+        """Prix programmés en vigueur à la date donnée (maintenant par défaut)"""
+        at = at or timezone.now()
+        return self.filter(starts_at__lte=at).filter(
+            models.Q(ends_at__isnull=True) | models.Q(ends_at__gt=at)
+        )
+    
+    def current_price(self, book_id, default, at=None):
+        """Prix programmé en vigueur pour un livre, sinon `default`"""
+        price = (
+            self.active(at).filter(book_id=book_id)
+            .order_by('-starts_at', '-id')
+            .values_list('price', flat=True)
+            .first()
+        )
+        return default if price is None else price
+
+
+class PriceSchedule(models.Model):
+    """
+    Prix programmé d'un livre (promotion, changement de prix) sur une période.
+    Le prix en vigueur est recopié dans `Book.prix_courant` à chaque borne par
+    `manage.py apply_price_schedules` (voir books/pricing.py). Si plusieurs
+    périodes se chevauchent, celle qui a commencé le plus récemment l'emporte.
+    """
+    
+    objects = PriceScheduleQuerySet.as_manager()
+    
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name='price_schedules',
+        verbose_name="Livre"
+    )
+    price = models.PositiveIntegerField(
+        help_text="Prix en centimes pendant la période",
+        verbose_name="Prix"
+    )
+    starts_at = models.DateTimeField(verbose_name="Début")
+    ends_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Vide : le prix reste en vigueur jusqu'à une nouvelle programmation",
+        verbose_name="Fin"
+    )
+    label = models.CharField(max_length=100, blank=True, verbose_name="Libellé")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+    
+    class Meta:
+        db_table = 'price_schedules'
+        ordering = ['-starts_at']
+        verbose_name = "Prix programmé"
+        verbose_name_plural = "Prix programmés"
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(ends_at__isnull=True) | models.Q(ends_at__gt=models.F('starts_at')),
+                name='price_schedule_period_valid'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['book', '-starts_at'], name='price_schedule_book_idx'),
+            # Bornes de fin à venir, relues par le job à chaque passage
+            models.Index(fields=['ends_at'], name='price_schedule_ends_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.book_id}: {self.price / 100:.2f}€ à partir du {self.starts_at:%d/%m/%Y %H:%M}"
+    
+    def clean(self):
+        if self.ends_at and self.ends_at <= self.starts_at:
+            raise ValidationError("La fin doit être postérieure au début.")
+    
+    def save(self, *args, **kwargs):
+        from .pricing import refresh_current_prices
+        
+        super().save(*args, **kwargs)
+        refresh_current_prices([self.book_id])
+    
+    def delete(self, *args, **kwargs):
+        from .pricing import refresh_current_prices
+        
+        book_id = self.book_id
+        result = super().delete(*args, **kwargs)
+        refresh_current_prices([book_id])
+        return result
+
+
+
+class InventoryMovement(models.Model):
+    """
+    Mouvement de stock d'un livre (journal en ajout seul).
+    Les mouvements non appliqués sont reportés dans `Book.quantites` par
+    `manage.py compact_inventory` ; le stock effectif est donc
+    `quantites + somme des mouvements non appliqués`.
+    """
+    
+    REASON_CHOICES = [
+        ('initial', 'Stock initial'),
+        ('adjustment', 'Ajustement'),
+        ('sale', 'Vente'),
+        ('cancellation', 'Annulation de commande'),
+        ('correction', 'Correction (stock négatif)'),
+    ]
+    
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name='inventory_movements',
+        verbose_name="Livre"
+    )
+    delta = models.IntegerField(verbose_name="Variation")
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, verbose_name="Motif")
+    order = models.ForeignKey(
+        'orders.Order',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Commande"
+    )
+    note = models.CharField(max_length=255, blank=True, verbose_name="Note")
+    applied = models.BooleanField(
+        default=False,
+        help_text="Déjà reporté dans Book.quantites",
+        verbose_name="Appliqué"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+    
+    class Meta:
+        db_table = 'inventory_movements'
+        ordering = ['-id']
+        verbose_name = "Mouvement de stock"
+        verbose_name_plural = "Mouvements de stock"
+        indexes = [
+            models.Index(fields=['book', '-id'], name='inventory_book_history_idx'),
+            models.Index(
+                fields=['book'],
+                condition=models.Q(applied=False),
+                name='inventory_pending_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.delta:+d} livre {self.book_id} ({self.reason})"
+
+
+
+class StockSubscription(models.Model):
+    """
+    Demande d'alerte « de retour en stock » d'un visiteur pour un livre épuisé.
+    Une hausse de stock passe les demandes en attente du livre à l'état
+    `queued` ; `manage.py send_stock_notifications` envoie les emails par lots
+    (voir books/notifications.py). Après STOCK_NOTIFICATION_MAX_ATTEMPTS
+    échecs d'envoi, la demande passe à l'état `failed` et n'est plus retentée.
+    """
+    
+    STATUS_CHOICES = [
+        ('waiting', 'En attente du stock'),
+        ('queued', "À notifier"),
+        ('sent', 'Notifiée'),
+        ('failed', "Échec d'envoi"),
+    ]
+    
+    email = models.EmailField(verbose_name="Email")
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.CASCADE,
+        related_name='stock_subscriptions',
+        verbose_name="Livre"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='waiting',
+        verbose_name="Statut"
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Envois échoués")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créée le")
+    notified_at = models.DateTimeField(null=True, blank=True, verbose_name="Notifiée le")
+    
+    class Meta:
+        db_table = 'stock_subscriptions'
+        ordering = ['-created_at']
+        verbose_name = "Alerte de retour en stock"
+        verbose_name_plural = "Alertes de retour en stock"
+        constraints = [
+            # Une seule demande en cours par visiteur et par livre
+            models.UniqueConstraint(
+                fields=['book', 'email'],
+                condition=models.Q(status__in=['waiting', 'queued']),
+                name='stock_subscription_pending_unique'
+            ),
+        ]
+        indexes = [
+            # Vérifié à chaque hausse de stock : ne contient que les demandes en attente
+            models.Index(
+                fields=['book'],
+                condition=models.Q(status='waiting'),
+                name='stock_subscription_waiting_idx'
+            ),
+            # Demandes jamais retentées en premier
+            models.Index(
+                fields=['attempts', 'id'],
+                condition=models.Q(status='queued'),
+                name='stock_subscription_queued_idx'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.email} - livre {self.book_id} ({self.status})"
+
+
+
+class TrendingScale(models.Model):
+    """
+    Échelle commune des scores de tendance (une seule ligne) : origine des
+    temps et demi-vie avec lesquelles `Book.trending_score` est calculé.
+    `manage.py rebase_trending_scores` avance l'origine (voir books/trending.py).
+    """
+    
+    epoch = models.DateTimeField(verbose_name="Origine des scores")
+    half_life_hours = models.FloatField(verbose_name="Demi-vie (heures)")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifiée le")
+    
+    class Meta:
+        db_table = 'trending_scale'
+        verbose_name = "Échelle des scores de tendance"
+        verbose_name_plural = "Échelle des scores de tendance"
+    
+    def __str__(self):
+        return f"Origine {self.epoch:%d/%m/%Y %H:%M}, demi-vie {self.half_life_hours:g} h"
+
+
+
+class BookDailyStats(models.Model):
+    """Statistiques journalières d'un livre (vues, ventes, chiffre d'affaires)"""
+    
+    book = models.ForeignKey(
+        Book,
+        # Table de la base analytics : pas de contrainte SQL ni de cascade
+        # vers la base principale (voir zoonova/db_routers.py)
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='daily_stats',
+        verbose_name="Livre"
+    )
+    date = models.DateField(verbose_name="Jour")
+    
+    views = models.PositiveIntegerField(default=0, verbose_name="Vues")
+    units_sold = models.PositiveIntegerField(default=0, verbose_name="Exemplaires vendus")
+    revenue = models.PositiveIntegerField(
+        default=0,
+        help_text="Chiffre d'affaires en centimes",
+        verbose_name="Chiffre d'affaires"
+    )
+    
+    class Meta:
+        db_table = 'book_daily_stats'
+        ordering = ['date']
+        verbose_name = 'Statistique journalière'
+        verbose_name_plural = 'Statistiques journalières'
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'date'], name='unique_book_daily_stats'),
+        ]
+    
+    def __str__(self):
+        return f"{self.book_id} - {self.date}: {self.views} vues, {self.units_sold} ventes"
+    
+    @property
+    def revenue_euros(self):
+        return self.revenue / 100
+
+
+class RestockSuggestion(models.Model):
+    """Prévision des ventes et suggestion de réassort d'un livre"""
+    
+    METHOD_CHOICES = [
+        ('sma', 'Moyenne mobile'),
+        ('ses', 'Lissage exponentiel'),
+    ]
+    
+    book = models.OneToOneField(
+        Book,
+        # Table de la base analytics : pas de contrainte SQL ni de cascade
+        # vers la base principale (voir zoonova/db_routers.py)
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='restock_suggestion',
+        verbose_name="Livre"
+    )
+    method = models.CharField(max_length=3, choices=METHOD_CHOICES, verbose_name="Méthode")
+    stock = models.PositiveIntegerField(verbose_name="Stock au calcul")
+    daily_forecast = models.FloatField(verbose_name="Ventes prévues / jour")
+    days_of_cover = models.FloatField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Vide si aucune vente n'est prévue",
+        verbose_name="Jours de couverture"
+    )
+    suggested_quantity = models.PositiveIntegerField(
+        default=0,
+        db_index=True,
+        verbose_name="Quantité à commander"
+    )
+    computed_at = models.DateTimeField(verbose_name="Calculé le")
+    
+    class Meta:
+        db_table = 'restock_suggestions'
+        ordering = ['days_of_cover']
+        verbose_name = 'Suggestion de réassort'
+        verbose_name_plural = 'Suggestions de réassort'
+    
+    def __str__(self):
+        return f"{self.book_id}: commander {self.suggested_quantity}"
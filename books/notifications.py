@@ -0,0 +1,212 @@
+# ============================================
+# BOOKS - Alertes de retour en stock
+# ============================================
+#
+# 1. Un visiteur s'abonne à un livre épuisé (StockSubscription `waiting`)
+# 2. Toute hausse de stock (mouvement d'inventaire positif, réservation
+#    libérée) appelle `queue_stock_notifications` : un seul UPDATE sur
+#    l'index partiel des demandes en attente, sans lecture du stock, pour ne
+#    pas ralentir les mises à jour de stock
+# 3. `manage.py send_stock_notifications` vérifie le stock vendable et envoie
+#    les emails par lots sur une seule connexion SMTP, un email par visiteur
+#    regroupant tous ses livres revenus en stock. Les demandes du lot sont
+#    marquées `sent` dans une transaction courte ; les emails partent après
+#    son commit (aucun verrou tenu pendant l'échange SMTP). Un envoi échoué
+#    remet ses demandes en file, retentées aux passages suivants après les
+#    demandes jamais retentées ; après STOCK_NOTIFICATION_MAX_ATTEMPTS échecs
+#    la demande passe à l'état `failed` (lettre morte, visible dans l'admin)
+
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, F, OuterRef
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def subscribe(book, email):
+    """
+    Enregistre une demande d'alerte (une seule demande en cours par visiteur
+    et par livre). Deux demandes simultanées se heurtent à la contrainte
+    d'unicité : la seconde renvoie la demande créée par la première.
+
+    Returns:
+        tuple: (StockSubscription, créée)
+    """
+    from .models import StockSubscription
+
+    lookup = {'book': book, 'email': email.strip().lower(), 'status__in': ['waiting', 'queued']}
+    try:
+        with transaction.atomic():
+            return StockSubscription.objects.get_or_create(**lookup, defaults={'status': 'waiting'})
+    except IntegrityError:
+        return StockSubscription.objects.get(**lookup), False
+
+
+def queue_stock_notifications(book_ids):
+    """
+    Met en file d'envoi les demandes en attente de livres dont le stock vient
+    d'augmenter. Le stock vendable est vérifié à l'envoi.
+
+    Returns:
+        int: nombre de demandes mises en file
+    """
+    from .models import StockSubscription
+
+    book_ids = list(book_ids)
+    if not book_ids:
+        return 0
+    return StockSubscription.objects.filter(status='waiting', book_id__in=book_ids).update(status='queued')
+
+
+def _build_message(email, books, connection):
+    for book in books:
+        book.url = settings.BOOK_PAGE_URL.format(slug=book.slug)
+
+    subject = (
+        f"{books[0].titre} est de retour en stock" if len(books) == 1
+        else f"{len(books)} livres sont de retour en stock"
+    )
+    text_content = "Bonjour,\n\nVous nous avez demandé de vous prévenir, ces livres sont à nouveau disponibles :\n"
+    for book in books:
+        text_content += f"\n- {book.titre} ({book.prix_courant_euros:.2f}€) : {book.url}"
+    text_content += "\n\nLes stocks sont limités, ne tardez pas !\n\nL'équipe zoonova\n"
+
+    message = EmailMultiAlternatives(
+        subject=subject,
+        body=text_content,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[email],
+        connection=connection
+    )
+    message.attach_alternative(render_to_string('emails/back_in_stock.html', {'books': books}), "text/html")
+    return message
+
+
+def _requeue_failed(subscription_ids, report):
+    """
+    Remet en file les demandes dont l'email n'est pas parti (tentative
+    comptée), ou les passe à `failed` après STOCK_NOTIFICATION_MAX_ATTEMPTS
+    échecs. Une demande déjà renouvelée par le visiteur entre-temps reste
+    `sent` : la nouvelle demande sera notifiée à sa place.
+    """
+    from .models import StockSubscription
+
+    failed = StockSubscription.objects.filter(id__in=subscription_ids, status='sent')
+    renewed = StockSubscription.objects.filter(
+        book=OuterRef('book'), email=OuterRef('email'), status__in=['waiting', 'queued']
+    )
+    with transaction.atomic():
+        report['dead'] += failed.filter(
+            attempts__gte=settings.STOCK_NOTIFICATION_MAX_ATTEMPTS - 1
+        ).update(status='failed', attempts=F('attempts') + 1, notified_at=None)
+        failed.exclude(Exists(renewed)).update(status='queued', attempts=F('attempts') + 1, notified_at=None)
+
+
+def _deliver(by_email, connection, report, tried):
+    """
+    Envoie les emails d'un lot déjà marqué `sent` (après le commit).
+
+    Returns:
+        int: nombre d'emails envoyés
+    """
+    failed = []
+    emails = 0
+    for email, subscriptions in by_email.items():
+        try:
+            _build_message(email, [book for _, book in subscriptions], connection).send()
+        except Exception as e:
+            # Remise en file : retentée au prochain passage
+            logger.error(f"Erreur envoi alerte de stock à {email}: {str(e)}", exc_info=True)
+            failed.extend(subscription_id for subscription_id, _ in subscriptions)
+            report['failed'] += 1
+            continue
+        report['notified'] += len(subscriptions)
+        emails += 1
+
+    report['emails'] += emails
+    if failed:
+        tried.update(failed)
+        _requeue_failed(failed, report)
+    return emails
+
+
+def _send_batch(batch_size, connection, report, tried):
+    """
+    Traite un lot de demandes `queued`, hors demandes déjà en échec pendant
+    ce passage (`tried`, complété par cette fonction).
+
+    Returns:
+        bool: False quand la file est vide
+    """
+    from .models import Book, StockSubscription
+
+    delivered = []
+    with transaction.atomic():
+        rows = list(
+            StockSubscription.objects
+            .filter(status='queued')
+            .exclude(id__in=tried)
+            .select_for_update(skip_locked=True)
+            .order_by('attempts', 'id')
+            .values_list('id', 'email', 'book_id')[:batch_size]
+        )
+        if not rows:
+            return False
+
+        books = (
+            Book.objects.with_stock()
+            .filter(pk__in={book_id for _, _, book_id in rows}, is_active=True)
+            .only('id', 'titre', 'slug', 'prix', 'prix_courant', 'quantites', 'reserved_quantity')
+            .in_bulk()
+        )
+
+        # Stock déjà reparti (ou livre désactivé) : la demande repart en attente
+        waiting = []
+        by_email = defaultdict(list)
+        for subscription_id, email, book_id in rows:
+            book = books.get(book_id)
+            if book is None or not book.in_stock:
+                waiting.append(subscription_id)
+            else:
+                by_email[email].append((subscription_id, book))
+
+        claimed = [subscription_id for subscriptions in by_email.values() for subscription_id, _ in subscriptions]
+        StockSubscription.objects.filter(id__in=claimed).update(status='sent', notified_at=timezone.now())
+        StockSubscription.objects.filter(id__in=waiting).update(status='waiting')
+        if by_email:
+            transaction.on_commit(lambda: delivered.append(_deliver(by_email, connection, report, tried)))
+
+    report['requeued'] += len(waiting)
+    # Un lot sans aucun envoi réussi (SMTP indisponible) arrête le passage
+    return not by_email or not delivered or delivered[0] > 0
+
+
+def send_stock_notifications(batch_size=None):
+    """
+    Envoie les alertes de retour en stock en file, par lots, sur une seule
+    connexion SMTP.
+
+    Returns:
+        dict: demandes notifiées, emails envoyés, échecs, demandes abandonnées
+            (`failed`), demandes remises en attente
+    """
+    batch_size = batch_size or settings.STOCK_NOTIFICATION_BATCH_SIZE
+    report = {'notified': 0, 'emails': 0, 'failed': 0, 'dead': 0, 'requeued': 0}
+    tried = set()
+
+    with get_connection() as connection:
+        while _send_batch(batch_size, connection, report, tried):
+            pass
+
+    logger.info(
+        f"Alertes de stock : {report['emails']} email(s) pour {report['notified']} demande(s), "
+        f"{report['failed']} échec(s) dont {report['dead']} abandon(s), "
+        f"{report['requeued']} remise(s) en attente"
+    )
+    return report
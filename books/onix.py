@@ -0,0 +1,348 @@
+# ============================================
+# BOOKS - Import du catalogue éditeur au format ONIX
+# ============================================
+#
+# Les fichiers ONIX (XML, souvent plusieurs centaines de Mo) sont lus avec
+# iterparse : chaque <Product> est converti en dictionnaire de champs Book
+# puis libéré aussitôt, la mémoire reste constante quelle que soit la taille
+# du fichier. Les livres sont écrits par paquets de ONIX_IMPORT_BATCH_SIZE :
+# une requête pour retrouver les livres existants (par code_bare), un
+# bulk_update des livres modifiés et un bulk_create des nouveaux livres.
+#
+# Balises de référence ONIX 3.0 (ONIX 2.1 pour le titre, les pages et la
+# date de publication). Le stock n'est pas importé : il vient du flux
+# distributeur (books/stockfeed.py).
+
+import logging
+import xml.etree.ElementTree as ET
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from datetime import date
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .pricing import refresh_current_prices
+
+logger = logging.getLogger(__name__)
+
+# Champs Book renseignés par l'import
+ONIX_FIELDS = (
+    'titre', 'legende', 'nom', 'description', 'editeur', 'langue', 'date_publication',
+    'nombre_pages', 'largeur_cm', 'hauteur_cm', 'epaisseur_cm', 'poids_grammes', 'prix',
+)
+
+# MeasureType ONIX -> champ Book
+MEASURE_FIELDS = {'01': 'hauteur_cm', '02': 'largeur_cm', '03': 'epaisseur_cm', '08': 'poids_grammes'}
+# Conversion en cm ou en grammes selon MeasureUnitCode
+MEASURE_UNITS = {
+    'cm': Decimal('1'), 'mm': Decimal('0.1'), 'in': Decimal('2.54'),
+    'gr': Decimal('1'), 'kg': Decimal('1000'), 'oz': Decimal('28.3495'), 'lb': Decimal('453.592'),
+}
+# PriceType par ordre de préférence : prix public TTC fixé, conseillé TTC
+PRICE_TYPES = ('04', '02')
+# Longueur des colonnes texte de Book
+MAX_LENGTHS = {'titre': 255, 'legende': 500, 'nom': 255, 'editeur': 255, 'langue': 50}
+# Codes langue ONIX (ISO 639-2/B) -> libellé Book.langue
+LANGUAGES = {'fre': 'Français', 'eng': 'Anglais', 'ger': 'Allemand', 'spa': 'Espagnol', 'ita': 'Italien'}
+
+
+class SlugAllocator:
+    """
+    Attribue des slugs uniques à un lot de livres sans aller-retour avec la
+    base : les slugs existants sont chargés une fois, les suffixes (-2, -3...)
+    sont calculés en mémoire.
+    """
+
+    def __init__(self):
+        self.reload()
+
+    def reload(self):
+        from .models import Book
+
+        self.taken = set(Book.objects.values_list('slug', flat=True).iterator())
+        self.next_suffix = {}
+
+    def allocate(self, titre):
+        base = slugify(titre)[:240] or 'livre'
+        slug = base
+        suffix = self.next_suffix.get(base, 2)
+        while slug in self.taken:
+            slug = f'{base}-{suffix}'
+            suffix += 1
+        self.next_suffix[base] = suffix
+        self.taken.add(slug)
+        return slug
+
+
+def _local(tag):
+    """Nom de balise sans espace de noms"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _children(element, name):
+    return [child for child in element if _local(child.tag) == name]
+
+
+def _find(element, *path):
+    """Premier descendant suivant un chemin de noms de balises"""
+    for name in path:
+        matches = _children(element, name)
+        if not matches:
+            return None
+        element = matches[0]
+    return element
+
+
+def _text(element, *path):
+    found = _find(element, *path) if path else element
+    if found is None:
+        return ''
+    return ''.join(found.itertext()).strip()
+
+
+def _decimal(value):
+    try:
+        number = Decimal(value.replace(',', '.'))
+    except (InvalidOperation, AttributeError):
+        return None
+    return number if number.is_finite() else None
+
+
+def _parse_date(value):
+    digits = ''.join(char for char in value if char.isdigit())
+    try:
+        if len(digits) >= 8:
+            return date(int(digits[:4]), int(digits[4:6]), int(digits[6:8]))
+        if len(digits) >= 4:
+            return date(int(digits[:4]), 1, 1)
+    except ValueError:
+        pass
+    return None
+
+
+def parse_product(product):
+    """
+    Convertit un élément <Product> en champs Book.
+
+    Returns:
+        dict: champs trouvés dans la notice (code_bare toujours présent, '' si absent)
+    """
+    record = {'code_bare': ''}
+
+    for identifier in _children(product, 'ProductIdentifier'):
+        if _text(identifier, 'ProductIDType') in ('15', '03'):  # ISBN-13, GTIN-13
+            record['code_bare'] = _text(identifier, 'IDValue').replace('-', '')
+            break
+
+    detail = _find(product, 'DescriptiveDetail')
+    source = detail if detail is not None else product
+
+    title = _find(source, 'TitleDetail', 'TitleElement')
+    if title is not None:
+        prefix = _text(title, 'TitlePrefix')
+        record['titre'] = ' '.join(filter(None, [prefix, _text(title, 'TitleText') or _text(title, 'TitleWithoutPrefix')]))
+        record['legende'] = _text(title, 'Subtitle')
+    elif _find(source, 'Title') is not None:  # ONIX 2.1
+        record['titre'] = _text(source, 'Title', 'TitleText')
+        record['legende'] = _text(source, 'Title', 'Subtitle')
+
+    authors = [
+        _text(contributor, 'PersonName') or _text(contributor, 'CorporateName')
+        for contributor in _children(source, 'Contributor')
+        if _text(contributor, 'ContributorRole') in ('', 'A01')
+    ]
+    if any(authors):
+        record['nom'] = ', '.join(filter(None, authors))
+
+    language = _text(source, 'Language', 'LanguageCode')
+    if language:
+        record['langue'] = LANGUAGES.get(language.lower(), language)
+
+    for extent in _children(source, 'Extent'):
+        if _text(extent, 'ExtentType') in ('00', '11'):
+            pages = _text(extent, 'ExtentValue')
+            if pages.isdigit():
+                record['nombre_pages'] = int(pages)
+                break
+    if 'nombre_pages' not in record and _text(source, 'NumberOfPages').isdigit():  # ONIX 2.1
+        record['nombre_pages'] = int(_text(source, 'NumberOfPages'))
+
+    for measure in _children(source, 'Measure'):
+        field = MEASURE_FIELDS.get(_text(measure, 'MeasureType'))
+        value = _decimal(_text(measure, 'Measurement'))
+        factor = MEASURE_UNITS.get(_text(measure, 'MeasureUnitCode').lower())
+        if field and value is not None and factor:
+            value *= factor
+            if field == 'poids_grammes':
+                record[field] = int(value.quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+            elif value < 1000:
+                record[field] = value.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+    collateral = _find(product, 'CollateralDetail')
+    for text_content in _children(collateral if collateral is not None else product, 'TextContent'):
+        if _text(text_content, 'TextType') in ('03', '02'):
+            record['description'] = _text(text_content, 'Text')
+            if _text(text_content, 'TextType') == '03':
+                break
+
+    publishing = _find(product, 'PublishingDetail')
+    source = publishing if publishing is not None else product
+    publisher = _text(source, 'Publisher', 'PublisherName')
+    if publisher:
+        record['editeur'] = publisher
+    for publishing_date in _children(source, 'PublishingDate'):
+        if _text(publishing_date, 'PublishingDateRole') in ('01', '11'):
+            record['date_publication'] = _parse_date(_text(publishing_date, 'Date'))
+            break
+    if 'date_publication' not in record and _text(source, 'PublicationDate'):  # ONIX 2.1
+        record['date_publication'] = _parse_date(_text(source, 'PublicationDate'))
+    if record.get('date_publication') is None:
+        record.pop('date_publication', None)
+
+    prices = {}
+    for supply in _children(product, 'ProductSupply') or [product]:
+        for supply_detail in _children(supply, 'SupplyDetail'):
+            for price in _children(supply_detail, 'Price'):
+                currency = _text(price, 'CurrencyCode') or 'EUR'
+                amount = _decimal(_text(price, 'PriceAmount'))
+                if currency == 'EUR' and amount is not None:
+                    prices.setdefault(_text(price, 'PriceType'), amount)
+    for price_type in PRICE_TYPES:
+        if price_type in prices:
+            record['prix'] = int((prices[price_type] * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+            break
+
+    for field, length in MAX_LENGTHS.items():
+        if field in record:
+            record[field] = record[field][:length]
+    return {field: value for field, value in record.items() if value != '' or field == 'code_bare'}
+
+
+def iter_products(source):
+    """
+    Parcourt les <Product> d'un fichier ONIX en mémoire constante.
+
+    Args:
+        source: chemin ou fichier binaire ouvert
+
+    Yields:
+        dict: champs Book de chaque notice (voir parse_product)
+    """
+    context = ET.iterparse(source, events=('start', 'end'))
+    root = None
+    for event, element in context:
+        if root is None:
+            root = element
+        if event == 'end' and _local(element.tag) == 'Product':
+            yield parse_product(element)
+            # Libérer la notice et les précédentes (déjà traitées)
+            element.clear()
+            root.clear()
+
+
+def _write_batch(records, allocator, activate, report):
+    """Crée ou met à jour un paquet de notices (clé : code_bare)"""
+    from .models import Book
+
+    existing = Book.objects.filter(
+        code_bare__in=[record['code_bare'] for record in records]
+    ).only('id', 'code_bare', *ONIX_FIELDS).in_bulk(field_name='code_bare')
+
+    to_create = []
+    to_update = []
+    changed_fields = set()
+    now = timezone.now()
+    for record in records:
+        book = existing.get(record['code_bare'])
+        if book is None:
+            if not record.get('titre'):
+                report['skipped'].append({'isbn': record['code_bare'], 'reason': "Titre absent"})
+                continue
+            values = {'nom': '', 'description': '', 'prix': 0}
+            values.update((field, record[field]) for field in ONIX_FIELDS if field in record)
+            to_create.append(Book(
+                **values,
+                prix_courant=values['prix'],
+                code_bare=record['code_bare'],
+                slug=allocator.allocate(record['titre']),
+                # Sans prix, le livre n'est jamais publié automatiquement
+                is_active=activate and 'prix' in record,
+            ))
+            continue
+
+        fields = [
+            field for field in ONIX_FIELDS
+            if field in record and getattr(book, field) != record[field]
+        ]
+        if not fields:
+            report['unchanged'] += 1
+            continue
+        for field in fields:
+            setattr(book, field, record[field])
+        book.updated_at = now
+        changed_fields.update(fields)
+        to_update.append(book)
+
+    with transaction.atomic():
+        if to_update:
+            Book.objects.bulk_update(to_update, sorted(changed_fields) + ['updated_at'])
+            if 'prix' in changed_fields:
+                # Le prix courant suit le nouveau prix, sauf promotion en cours
+                refresh_current_prices([book.pk for book in to_update])
+        if to_create:
+            Book.objects.bulk_create(to_create)
+
+    report['created'] += len(to_create)
+    report['updated'] += len(to_update)
+
+
+def import_onix(source, batch_size=None, activate=False):
+    """
+    Importe (crée ou met à jour) les livres d'un fichier ONIX.
+
+    Args:
+        source: chemin ou fichier binaire ouvert
+        batch_size (int): notices écrites par transaction (défaut: ONIX_IMPORT_BATCH_SIZE)
+        activate (bool): publier directement les nouveaux livres ayant un prix
+
+    Returns:
+        dict: compte rendu (notices lues, créées, mises à jour, inchangées, ignorées)
+    """
+    batch_size = batch_size or settings.ONIX_IMPORT_BATCH_SIZE
+    allocator = SlugAllocator()
+    report = {'products': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'skipped': []}
+
+    batch = {}
+
+    def flush():
+        try:
+            _write_batch(list(batch.values()), allocator, activate, report)
+        except IntegrityError as e:
+            # Livre créé en parallèle (admin) avec le même ISBN ou slug
+            logger.error(f"Import ONIX : paquet de {len(batch)} notice(s) rejeté : {str(e)}")
+            report['skipped'].extend(
+                {'isbn': isbn, 'reason': "Conflit d'écriture, relancer l'import"} for isbn in batch
+            )
+            allocator.reload()
+        batch.clear()
+
+    for record in iter_products(source):
+        report['products'] += 1
+        isbn = record['code_bare']
+        if not isbn.isdigit() or len(isbn) != 13:
+            report['skipped'].append({'isbn': isbn, 'reason': "ISBN-13 absent ou invalide"})
+            continue
+        # Une notice répétée dans le fichier remplace la précédente
+        batch[isbn] = record
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    logger.info(
+        f"Import ONIX : {report['products']} notice(s), {report['created']} créée(s), "
+        f"{report['updated']} mise(s) à jour, {len(report['skipped'])} ignorée(s)"
+    )
+    return report
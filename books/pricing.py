@@ -0,0 +1,83 @@
+# ============================================
+# BOOKS - Prix programmés (promotions, changements de prix)
+# ============================================
+#
+# `Book.prix` est le prix de référence saisi par l'équipe ; un PriceSchedule
+# le remplace sur une période. Le prix en vigueur est recopié dans la colonne
+# indexée `Book.prix_courant`, seule lue par le catalogue, les filtres
+# min_price / max_price et la création de commande : aucune règle n'est
+# évaluée pendant une requête.
+#
+# `manage.py apply_price_schedules` (cron, chaque minute) recalcule la colonne
+# en un seul UPDATE, limité aux livres ayant une programmation en cours ou à
+# venir et à ceux dont le prix courant diffère encore du prix de référence
+# (promotion terminée). Chaque ajout, modification ou suppression d'un
+# PriceSchedule, et chaque changement de `prix`, recalcule aussitôt les livres
+# concernés.
+
+import logging
+
+from django.db.models import Exists, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def current_price_expression(at=None):
+    """Prix en vigueur d'un livre : prix programmé actif, sinon `prix`"""
+    from .models import PriceSchedule
+
+    scheduled = (
+        PriceSchedule.objects.active(at)
+        .filter(book=OuterRef('pk'))
+        .order_by('-starts_at', '-id')
+        .values('price')[:1]
+    )
+    return Coalesce(Subquery(scheduled), F('prix'))
+
+
+def refresh_current_prices(book_ids=None, at=None):
+    """
+    Recopie le prix en vigueur dans `Book.prix_courant`. Seules les lignes
+    dont le prix change sont écrites.
+
+    Args:
+        book_ids (iterable): livres à recalculer (défaut: tous les livres
+            concernés par une programmation, voir en tête de module)
+        at (datetime): date d'évaluation (défaut: maintenant)
+
+    Returns:
+        int: nombre de livres dont le prix courant a changé
+    """
+    from .models import Book, PriceSchedule
+
+    at = at or timezone.now()
+    books = Book.objects.all()
+    if book_ids is not None:
+        book_ids = list(book_ids)
+        if not book_ids:
+            return 0
+        books = books.filter(pk__in=book_ids)
+    else:
+        pending = PriceSchedule.objects.filter(book=OuterRef('pk')).filter(
+            Q(ends_at__isnull=True) | Q(ends_at__gt=at)
+        )
+        books = books.filter(Exists(pending) | ~Q(prix_courant=F('prix')))
+
+    price = current_price_expression(at)
+    return (
+        books.alias(target_price=price)
+        .exclude(prix_courant=F('target_price'))
+        .update(prix_courant=price)
+    )
+
+
+def next_price_boundary(at=None):
+    """Prochain début ou fin de période programmée (None s'il n'y en a pas)"""
+    from .models import PriceSchedule
+
+    at = at or timezone.now()
+    starts = PriceSchedule.objects.filter(starts_at__gt=at).order_by('starts_at').values_list('starts_at', flat=True).first()
+    ends = PriceSchedule.objects.filter(ends_at__gt=at).order_by('ends_at').values_list('ends_at', flat=True).first()
+    return min(filter(None, [starts, ends]), default=None)
@@ -3,8 +3,13 @@
 # 2. APP BOOKS - Serializers Catalogue
 # ============================================
 
+from decimal import Decimal, InvalidOperation
+
+from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Cast, Round
 from rest_framework import serializers
-from .models import Book
+from .models import Book, BookDailyStats, InventoryMovement, RestockSuggestion, StockSubscription
 
 
 class BookListSerializer(serializers.ModelSerializer):
@@ -15,7 +20,15 @@ class BookListSerializer(serializers.ModelSerializer):
         decimal_places=2,
         read_only=True
     )
+    prix_courant_euros = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        read_only=True
+    )
+    en_promotion = serializers.BooleanField(read_only=True)
+    quantites = serializers.IntegerField(source='stock_quantity', read_only=True)
     in_stock = serializers.BooleanField(read_only=True)
+    available_quantity = serializers.IntegerField(read_only=True)
     main_image = serializers.SerializerMethodField()
     videos = serializers.SerializerMethodField()
     
@@ -23,7 +36,8 @@ class BookListSerializer(serializers.ModelSerializer):
         model = Book
         fields = [
             'id', 'titre', 'nom', 'legende', 'slug',
-            'prix', 'prix_euros', 'quantites', 'in_stock',
+            'prix', 'prix_euros', 'prix_courant', 'prix_courant_euros', 'en_promotion',
+            'quantites', 'available_quantity', 'in_stock',
             'main_image', 'is_featured', 'views_count', 'sales_count', 'videos'
         ]
     
@@ -54,7 +68,15 @@ class BookDetailSerializer(serializers.ModelSerializer):
         decimal_places=2,
         read_only=True
     )
+    prix_courant_euros = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        read_only=True
+    )
+    en_promotion = serializers.BooleanField(read_only=True)
+    quantites = serializers.IntegerField(source='stock_quantity', read_only=True)
     in_stock = serializers.BooleanField(read_only=True)
+    available_quantity = serializers.IntegerField(read_only=True)
     dimensions = serializers.CharField(read_only=True)
     images = serializers.SerializerMethodField()
     videos = serializers.SerializerMethodField()
@@ -63,17 +85,17 @@ class BookDetailSerializer(serializers.ModelSerializer):
         model = Book
         fields = [
             'id', 'titre', 'nom', 'description', 'legende',
-            'prix', 'prix_euros', 'code_bare', 'nombre_pages',
-            'largeur_cm', 'hauteur_cm', 'epaisseur_cm',
+            'prix', 'prix_euros', 'prix_courant', 'prix_courant_euros', 'en_promotion',
+            'code_bare', 'nombre_pages', 'largeur_cm', 'hauteur_cm', 'epaisseur_cm',
             'poids_grammes', 'dimensions', 'date_publication',
-            'editeur', 'langue', 'quantites', 'in_stock',
+            'editeur', 'langue', 'quantites', 'available_quantity', 'in_stock',
             'slug', 'seo_title', 'seo_description',
             'views_count', 'sales_count', 'is_active',
             'is_featured', 'images', 'videos',
             'created_at', 'updated_at'
         ]
         read_only_fields = [
-            'id', 'slug', 'prix_euros', 'in_stock', 'dimensions',
+            'id', 'slug', 'prix_euros', 'prix_courant', 'prix_courant_euros', 'in_stock', 'dimensions',
             'views_count', 'sales_count', 'created_at', 'updated_at'
         ]
     
@@ -122,7 +144,128 @@ class BookCreateUpdateSerializer(serializers.ModelSerializer):
 class BookStockSerializer(serializers.ModelSerializer):
     """Serializer pour mise à jour du stock uniquement"""
     
+    # Stock effectif ; l'écriture passe par un mouvement d'inventaire (books/inventory.py)
+    quantites = serializers.IntegerField(source='stock_quantity', min_value=0)
+    # Note du mouvement d'ajustement
+    note = serializers.CharField(max_length=255, required=False, allow_blank=True, write_only=True)
+    
     class Meta:
         model = Book
-        fields = ['id', 'titre', 'quantites', 'in_stock']
-        read_only_fields = ['id', 'titre', 'in_stock']
\ No newline at end of file
+        fields = ['id', 'titre', 'quantites', 'reserved_quantity', 'available_quantity', 'in_stock', 'note']
+        read_only_fields = ['id', 'titre', 'reserved_quantity', 'available_quantity', 'in_stock']
+
+
+class BookBulkUpdateSerializer(serializers.Serializer):
+    """Serializer pour modification en masse du catalogue (une seule requête UPDATE)"""
+    
+    OPERATION_CHOICES = [
+        ('activate', 'Activer'),
+        ('deactivate', 'Désactiver'),
+        ('feature', 'Mettre en avant'),
+        ('unfeature', 'Retirer de la mise en avant'),
+        ('set_price', 'Fixer le prix (centimes)'),
+        ('adjust_price', 'Ajuster le prix (pourcentage)'),
+        ('set_language', 'Fixer la langue'),
+    ]
+    
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=1000
+    )
+    operation = serializers.ChoiceField(choices=OPERATION_CHOICES)
+    value = serializers.JSONField(
+        required=False,
+        help_text="Prix en centimes (set_price), pourcentage (adjust_price) ou langue (set_language)"
+    )
+    
+    def validate(self, attrs):
+        operation = attrs['operation']
+        value = attrs.get('value')
+        
+        if operation == 'set_price':
+            if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+                raise serializers.ValidationError({'value': "Prix en centimes (entier positif) requis"})
+        elif operation == 'adjust_price':
+            try:
+                percent = Decimal(str(value))
+            except (InvalidOperation, TypeError):
+                raise serializers.ValidationError({'value': "Pourcentage requis (ex: -10 pour -10%)"})
+            if not percent.is_finite() or percent <= -100:
+                raise serializers.ValidationError({'value': "Le pourcentage doit être supérieur à -100"})
+            attrs['value'] = percent
+        elif operation == 'set_language':
+            if not isinstance(value, str) or not value.strip() or len(value) > 50:
+                raise serializers.ValidationError({'value': "Langue requise (50 caractères max)"})
+            attrs['value'] = value.strip()
+        
+        attrs['ids'] = sorted(set(attrs['ids']))
+        return attrs
+    
+    def updates(self):
+        """Colonnes à modifier, en expressions SQL (aucun livre chargé en mémoire)"""
+        operation = self.validated_data['operation']
+        value = self.validated_data.get('value')
+        
+        if operation in ('activate', 'deactivate'):
+            return {'is_active': operation == 'activate'}
+        if operation in ('feature', 'unfeature'):
+            return {'is_featured': operation == 'feature'}
+        if operation == 'set_price':
+            return {'prix': value}
+        if operation == 'adjust_price':
+            factor = 1 + value / 100
+            return {'prix': Cast(Round(F('prix') * Value(factor)), output_field=models.PositiveIntegerField())}
+        return {'langue': value}
+
+
+class StockSubscriptionSerializer(serializers.ModelSerializer):
+    """Serializer pour demande d'alerte de retour en stock"""
+    
+    class Meta:
+        model = StockSubscription
+        fields = ['email', 'book', 'status', 'created_at']
+        read_only_fields = ['book', 'status', 'created_at']
+
+
+class BookDailyStatsSerializer(serializers.ModelSerializer):
+    """Serializer pour les statistiques journalières d'un livre"""
+    
+    revenue_euros = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        read_only=True
+    )
+    
+    class Meta:
+        model = BookDailyStats
+        fields = ['date', 'views', 'units_sold', 'revenue', 'revenue_euros']
+
+
+class InventoryMovementSerializer(serializers.ModelSerializer):
+    """Serializer pour l'historique de stock d'un livre"""
+    
+    reason_display = serializers.CharField(source='get_reason_display', read_only=True)
+    balance_after = serializers.IntegerField(read_only=True)
+    
+    class Meta:
+        model = InventoryMovement
+        fields = [
+            'id', 'delta', 'reason', 'reason_display', 'order',
+            'note', 'applied', 'balance_after', 'created_at'
+        ]
+
+
+class RestockSuggestionSerializer(serializers.ModelSerializer):
+    """Serializer pour le rapport de réassort"""
+    
+    book_titre = serializers.CharField(source='book.titre', read_only=True, default=None)
+    method_display = serializers.CharField(source='get_method_display', read_only=True)
+    
+    class Meta:
+        model = RestockSuggestion
+        fields = [
+            'book', 'book_titre', 'method', 'method_display',
+            'stock', 'daily_forecast', 'days_of_cover',
+            'suggested_quantity', 'computed_at'
+        ]
@@ -0,0 +1,137 @@
+# books/stats.py
+
+# ============================================
+# BOOKS - Agrégation des statistiques journalières
+# ============================================
+
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Sum, F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from zoonova.buffers import BatchBuffer, BufferFull
+from zoonova.utils import iter_chunks, upsert_counters
+
+logger = logging.getLogger(__name__)
+
+
+def _write_events(events):
+    """
+    Agrège un lot d'événements (book_id, jour, vues, ventes, CA) et les
+    ajoute aux lignes de BookDailyStats en une seule requête.
+    """
+    from .models import BookDailyStats
+
+    totals = defaultdict(lambda: [0, 0, 0])
+    for book_id, day, views, units_sold, revenue in events:
+        counters = totals[(book_id, day)]
+        counters[0] += views
+        counters[1] += units_sold
+        counters[2] += revenue
+
+    upsert_counters(BookDailyStats, ['book', 'date'], [
+        {
+            'book': book_id,
+            'date': day,
+            'views': views,
+            'units_sold': units_sold,
+            'revenue': revenue,
+        }
+        for (book_id, day), (views, units_sold, revenue) in totals.items()
+    ])
+
+
+_buffer = BatchBuffer(
+    _write_events,
+    max_size=settings.BOOK_STATS_FLUSH_SIZE,
+    max_age=settings.BOOK_STATS_FLUSH_INTERVAL,
+    max_pending=settings.BOOK_STATS_MAX_PENDING,
+)
+
+
+def _add(*events):
+    try:
+        _buffer.add(*events)
+    except BufferFull:
+        logger.warning(f"Tampon des statistiques livres plein, {len(events)} événement(s) ignoré(s)")
+
+
+def record_book_view(book_id):
+    """Comptabilise une vue de fiche livre pour aujourd'hui"""
+    _add((book_id, timezone.localdate(), 1, 0, 0))
+
+
+def record_book_sales(lines):
+    """
+    Comptabilise des ventes pour aujourd'hui.
+    
+    Args:
+        lines (iterable): tuples (book_id, quantité, prix unitaire en centimes)
+    """
+    today = timezone.localdate()
+    _add(*[
+        (book_id, today, 0, quantity, quantity * unit_price)
+        for book_id, quantity, unit_price in lines
+    ])
+
+
+def flush_book_stats():
+    """Écrit immédiatement les événements en attente dans ce processus"""
+    return _buffer.flush()
+
+
+def rebuild_book_sales(start, end):
+    """
+    Recalcule ventes et chiffre d'affaires de BookDailyStats entre deux dates
+    (incluses) à partir des articles de commande. Les vues sont conservées.
+    
+    Returns:
+        int: nombre de lignes (livre, jour) réécrites
+    """
+    from orders.models import OrderItem
+    from .models import BookDailyStats
+
+    # Lecture par lots des articles de commande (base principale)
+    totals = defaultdict(lambda: [0, 0])
+    # Ventes comptabilisées au paiement : commandes payées seulement
+    items = OrderItem.objects.filter(
+        order__is_paid=True,
+        order__created_at__date__gte=start,
+        order__created_at__date__lte=end
+    )
+    for chunk in iter_chunks(items):
+        sales = (
+            chunk
+            .annotate(day=TruncDate('order__created_at'))
+            .values('book_id', 'day')
+            .annotate(units=Sum('quantity'), amount=Sum(F('quantity') * F('unit_price')))
+        )
+        for row in sales:
+            total = totals[(row['book_id'], row['day'])]
+            total[0] += row['units']
+            total[1] += row['amount']
+
+    rows = [
+        {
+            'book': book_id,
+            'date': day,
+            'views': 0,
+            'units_sold': units,
+            'revenue': amount,
+        }
+        for (book_id, day), (units, amount) in totals.items()
+    ]
+
+    # Remise à zéro des jours recalculés, puis réécriture des ventes réelles
+    # (base analytics)
+    with transaction.atomic(using=router.db_for_write(BookDailyStats)):
+        BookDailyStats.objects.filter(date__gte=start, date__lte=end).update(units_sold=0, revenue=0)
+        upsert_counters(
+            BookDailyStats, ['book', 'date'], rows,
+            increment=False, update_fields=['units_sold', 'revenue']
+        )
+    return len(rows)
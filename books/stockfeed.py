@@ -0,0 +1,190 @@
+# ============================================
+# BOOKS - Synchronisation du flux de stock fournisseur
+# ============================================
+#
+# Le distributeur envoie chaque jour un CSV « ISBN ; quantité » pour tout le
+# catalogue. Le fichier est lu ligne à ligne (jamais chargé en entier) et
+# comparé au stock effectif préchargé en une seule requête (ISBN -> livre).
+# Seules les lignes qui changent le stock sont écrites, par paquets de
+# STOCK_FEED_BATCH_SIZE : un mouvement d'inventaire `adjustment` par livre,
+# inséré en bulk_create (le stock n'est jamais modifié en place, voir
+# books/inventory.py).
+#
+# L'encodage est vérifié avant la lecture (check_encoding, une passe sur le
+# fichier brut) : un octet invalide au milieu du fichier ne doit pas laisser
+# les premiers paquets écrits et le reste ignoré.
+
+import codecs
+import csv
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_isbn(value):
+    """ISBN sans tirets ni espaces, tel que stocké dans Book.code_bare"""
+    return value.replace('-', '').replace(' ', '').strip().upper()
+
+
+def check_encoding(chunks, encoding='utf-8-sig'):
+    """
+    Décode les blocs d'octets `chunks` sans rien conserver.
+    Lève UnicodeDecodeError si le fichier n'est pas valide dans `encoding`.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    for chunk in chunks:
+        decoder.decode(chunk)
+    decoder.decode(b'', final=True)
+
+
+def _stock_map():
+    """
+    ({ISBN: [id, stock effectif]}, ISBN partagés par plusieurs livres) pour
+    tout le catalogue, en une requête. `code_bare` est normalisé comme le flux.
+    """
+    from .models import Book
+
+    stock = {}
+    ambiguous = set()
+    for code, book_id, stock_quantity in (
+        Book.objects.with_stock()
+        .exclude(code_bare__isnull=True).exclude(code_bare='')
+        .values_list('code_bare', 'id', 'effective_stock')
+    ):
+        isbn = normalize_isbn(code)
+        if not isbn:
+            continue
+        if isbn in stock:
+            ambiguous.add(isbn)
+        stock[isbn] = [book_id, stock_quantity]
+    return stock, ambiguous
+
+
+def _read_feed(lines):
+    """
+    Parcourt le flux : tuples (numéro de ligne, ISBN, quantité ou None).
+    Séparateur `;` ou `,` détecté sur la première ligne, en-tête ignoré.
+    """
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return
+    delimiter = ';' if ';' in first else ','
+
+    def rows():
+        yield first
+        yield from lines
+
+    for number, row in enumerate(csv.reader(rows(), delimiter=delimiter), start=1):
+        if not row or not any(cell.strip() for cell in row):
+            continue
+        isbn = normalize_isbn(row[0])
+        raw = row[1].strip() if len(row) > 1 else ''
+        try:
+            quantity = int(raw)
+        except ValueError:
+            if number == 1:
+                continue  # en-tête
+            quantity = None
+        yield number, isbn, quantity
+
+
+def _apply_changes(changes, note):
+    """
+    Écrit un paquet de changements. Le stock effectif est relu sous verrou :
+    une vente passée depuis le préchargement n'est pas écrasée par un écart
+    calculé sur l'ancienne valeur.
+
+    Returns:
+        int: nombre de mouvements insérés
+    """
+    from .inventory import record_movements
+    from .models import Book, InventoryMovement
+
+    targets = {change['book_id']: change['new'] for change in changes}
+    with transaction.atomic():
+        list(Book.objects.select_for_update().filter(pk__in=targets).order_by('pk').values_list('pk'))
+        current = dict(
+            Book.objects.with_stock().filter(pk__in=targets).values_list('pk', 'effective_stock')
+        )
+        movements = [
+            InventoryMovement(book_id=book_id, delta=quantity - current[book_id], reason='adjustment', note=note)
+            for book_id, quantity in targets.items()
+            if book_id in current and quantity != current[book_id]
+        ]
+        record_movements(movements)
+    return len(movements)
+
+
+def sync_stock_feed(lines, dry_run=False, batch_size=None, note=''):
+    """
+    Aligne le stock du catalogue sur un flux fournisseur.
+
+    Args:
+        lines (iterable): lignes de texte du CSV (fichier ouvert, upload décodé),
+            dont l'encodage a été vérifié par check_encoding
+        dry_run (bool): calculer le diff sans rien écrire
+        batch_size (int): changements écrits par transaction (défaut: STOCK_FEED_BATCH_SIZE)
+        note (str): note des mouvements d'inventaire
+
+    Returns:
+        dict: compte rendu (lignes lues, inchangées, changements, ISBN inconnus, erreurs)
+    """
+    batch_size = batch_size or settings.STOCK_FEED_BATCH_SIZE
+    note = note or "Flux de stock fournisseur"
+    stock, ambiguous = _stock_map()
+
+    report = {
+        'dry_run': dry_run,
+        'rows': 0,
+        'unchanged': 0,
+        'updated': 0,
+        'changes': [],
+        'unknown': [],
+        'errors': [],
+    }
+    seen = set()
+    pending = []
+
+    for number, isbn, quantity in _read_feed(lines):
+        report['rows'] += 1
+        if quantity is None or quantity < 0:
+            report['errors'].append({'line': number, 'isbn': isbn, 'error': "Quantité invalide"})
+            continue
+        if isbn in seen:
+            report['errors'].append({'line': number, 'isbn': isbn, 'error': "ISBN en double dans le fichier"})
+            continue
+        seen.add(isbn)
+        if isbn in ambiguous:
+            report['errors'].append({'line': number, 'isbn': isbn, 'error': "ISBN partagé par plusieurs livres"})
+            continue
+
+        entry = stock.get(isbn)
+        if entry is None:
+            report['unknown'].append({'line': number, 'isbn': isbn})
+            continue
+        book_id, current = entry
+        if quantity == current:
+            report['unchanged'] += 1
+            continue
+
+        change = {'line': number, 'isbn': isbn, 'book_id': book_id, 'old': current, 'new': quantity}
+        report['changes'].append(change)
+        if not dry_run:
+            pending.append(change)
+            if len(pending) >= batch_size:
+                report['updated'] += _apply_changes(pending, note)
+                pending = []
+
+    if pending:
+        report['updated'] += _apply_changes(pending, note)
+
+    logger.info(
+        f"Flux de stock{' (dry-run)' if dry_run else ''} : {report['rows']} ligne(s), "
+        f"{len(report['changes'])} changement(s), {report['updated']} mouvement(s), "
+        f"{len(report['unknown'])} ISBN inconnu(s), {len(report['errors'])} erreur(s)"
+    )
+    return report
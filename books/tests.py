@@ -1,3 +1,555 @@
-from django.test import TestCase
+# ============================================
+# BOOKS - Tests
+# ============================================
 
-# Create your tests here.
+import io
+import xml.etree.ElementTree as ET
+from datetime import timedelta
+from smtplib import SMTPException
+from unittest import mock
+
+import numpy as np
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import Admin
+from .forecasting import compute_restock_suggestions, exponential_smoothing
+from .inventory import compact_movements, record_initial_stock, record_movements, set_stock
+from .models import Book, BookDailyStats, InventoryMovement, PriceSchedule, RestockSuggestion, StockSubscription
+from .notifications import queue_stock_notifications, send_stock_notifications, subscribe
+from .onix import import_onix
+from .pricing import next_price_boundary, refresh_current_prices
+from .stats import flush_book_stats, record_book_sales
+from .trending import current_scale, decayed_score, invalidate_scale, rebase_scores, record_view
+
+
+def create_book(**fields):
+    defaults = {'titre': 'Le Loup', 'nom': 'Auteur', 'description': 'Album', 'prix': 1500, 'quantites': 5}
+    book = Book.objects.create(**{**defaults, **fields})
+    record_initial_stock(book)
+    return book
+
+
+class AdminAPITestCase(TestCase):
+    """Base des tests d'API réservés à l'admin"""
+
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(Admin.objects.create_superuser('admin@example.com', 'motdepasse'))
+
+
+# --- 1. Journal d'inventaire ---
+class InventoryLedgerTests(TestCase):
+
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        self.book = create_book()
+
+    def effective_stock(self):
+        return Book.objects.with_stock().get(pk=self.book.pk).stock_quantity
+
+    def applied_total(self):
+        return InventoryMovement.objects.filter(book=self.book, applied=True).aggregate(total=Sum('delta'))['total']
+
+    def test_set_stock_records_the_difference_with_pending_movements(self):
+        record_movements([InventoryMovement(book=self.book, delta=-2, reason='sale')])
+
+        movement = set_stock(self.book, 10, note='Inventaire')
+
+        self.assertEqual(movement.delta, 7)
+        self.assertEqual(self.effective_stock(), 10)
+        self.assertIsNone(set_stock(self.book, 10))
+
+    def test_compaction_applies_all_movements_in_one_pass(self):
+        other = create_book(titre='Le Renard', quantites=2)
+        record_movements([
+            InventoryMovement(book=self.book, delta=-2, reason='sale'),
+            InventoryMovement(book=self.book, delta=4, reason='adjustment'),
+            InventoryMovement(book=other, delta=-1, reason='sale'),
+        ])
+
+        with CaptureQueriesContext(connection) as queries:
+            applied, books = compact_movements()
+
+        self.assertEqual((applied, books), (3, 2))
+        book_updates = [query for query in queries if query['sql'].startswith('UPDATE "books"')]
+        self.assertEqual(len(book_updates), 1)
+        self.book.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.book.quantites, other.quantites), (7, 1))
+        self.assertFalse(InventoryMovement.objects.filter(applied=False).exists())
+        self.assertEqual(self.applied_total(), 7)
+        self.assertEqual(compact_movements(), (0, 0))
+
+    def test_negative_balance_is_corrected_by_a_movement(self):
+        record_movements([InventoryMovement(book=self.book, delta=-8, reason='sale')])
+
+        compact_movements()
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.quantites, 0)
+        correction = InventoryMovement.objects.get(reason='correction')
+        self.assertEqual((correction.delta, correction.applied), (3, True))
+        # L'instantané reste la somme des mouvements appliqués
+        self.assertEqual(self.applied_total(), 0)
+
+
+class StockAPITests(AdminAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.book = create_book()
+
+    def test_update_stock_records_an_adjustment(self):
+        response = self.client.patch(
+            f'/api/v1/books/{self.book.id}/update_stock/', {'quantites': 8, 'note': 'Réception'}, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['book']['quantites'], 8)
+        movement = InventoryMovement.objects.get(reason='adjustment')
+        self.assertEqual((movement.delta, movement.note), (3, 'Réception'))
+
+    def test_update_stock_rejects_an_invalid_note(self):
+        for note in [None, ['liste'], {'a': 1}, 'x' * 256]:
+            with self.subTest(note=note):
+                response = self.client.patch(
+                    f'/api/v1/books/{self.book.id}/update_stock/', {'quantites': 8, 'note': note}, format='json'
+                )
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('note', response.data['details'])
+
+        self.assertFalse(InventoryMovement.objects.filter(reason='adjustment').exists())
+
+    def test_stock_history_balances_follow_the_ledger(self):
+        record_movements([InventoryMovement(book=self.book, delta=-7, reason='sale')])
+        compact_movements()
+
+        response = self.client.get(f'/api/v1/books/{self.book.id}/stock_history/')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['reason'], row['delta'], row['balance_after']) for row in response.data['results']],
+            [('correction', 2, 0), ('sale', -7, -2), ('initial', 5, 5)]
+        )
+        self.assertEqual(response.data['stock']['effective'], 0)
+
+
+# --- 2. Flux de stock fournisseur ---
+@override_settings(STOCK_FEED_BATCH_SIZE=1)
+class StockFeedTests(AdminAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.book = create_book(code_bare='2-1234-5678-x')
+        self.other = create_book(titre='Le Renard', code_bare='9782987654321')
+
+    def post_feed(self, content, **params):
+        upload = SimpleUploadedFile('stock.csv', content, content_type='text/csv')
+        return self.client.post('/api/v1/books/stock-feed/', {'file': upload, **params}, format='multipart')
+
+    def effective_stock(self, book):
+        return Book.objects.with_stock().get(pk=book.pk).stock_quantity
+
+    def test_feed_matches_normalized_isbns(self):
+        response = self.post_feed('ISBN;Quantité\n212345678X;9\n978-2-98-765432-1;5\n9780000000000;1\n'.encode())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(change['book_id'], change['old'], change['new']) for change in response.data['changes']],
+            [(self.book.id, 5, 9)]
+        )
+        self.assertEqual((response.data['updated'], response.data['unchanged']), (1, 1))
+        self.assertEqual(response.data['unknown'], [{'line': 4, 'isbn': '9780000000000'}])
+        self.assertEqual(self.effective_stock(self.book), 9)
+
+    def test_dry_run_writes_nothing(self):
+        response = self.post_feed(b'212345678X;9\n', dry_run='true')
+
+        self.assertEqual(len(response.data['changes']), 1)
+        self.assertEqual(response.data['updated'], 0)
+        self.assertFalse(InventoryMovement.objects.filter(reason='adjustment').exists())
+
+    def test_invalid_rows_are_reported(self):
+        response = self.post_feed(b'isbn;stock\n212345678X;abc\n9782987654321;-1\n9782987654321;3\n9782987654321;4\n')
+
+        self.assertEqual(
+            [(error['line'], error['error']) for error in response.data['errors']],
+            [(2, 'Quantité invalide'), (3, 'Quantité invalide'), (5, 'ISBN en double dans le fichier')]
+        )
+        self.assertEqual((self.effective_stock(self.book), self.effective_stock(self.other)), (5, 3))
+
+    def test_invalid_encoding_is_rejected_before_any_write(self):
+        # Octet invalide après deux paquets (STOCK_FEED_BATCH_SIZE=1)
+        response = self.post_feed(b'212345678X;9\n9782987654321;7\n\xff\xfe;1\n')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(InventoryMovement.objects.filter(reason='adjustment').exists())
+        self.assertEqual((self.effective_stock(self.book), self.effective_stock(self.other)), (5, 5))
+
+    def test_isbn_shared_by_two_books_is_not_updated(self):
+        twin = create_book(titre='Le Loup (poche)', code_bare='212345678x')
+
+        response = self.post_feed(b'212345678X;9\n')
+
+        self.assertEqual(response.data['errors'][0]['error'], 'ISBN partagé par plusieurs livres')
+        self.assertEqual((self.effective_stock(self.book), self.effective_stock(twin)), (5, 5))
+
+
+# --- 3. Score de tendance ---
+class TrendingScoreTests(TestCase):
+
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        invalidate_scale()
+        self.addCleanup(invalidate_scale)
+        self.book = create_book()
+
+    def test_view_costs_a_single_update_once_the_scale_is_loaded(self):
+        record_view(self.book.pk)
+
+        with self.assertNumQueries(1):
+            record_view(self.book.pk)
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.views_count, 2)
+        self.assertGreater(self.book.trending_score, 0)
+
+    def test_rebase_keeps_decayed_scores_and_reloads_the_scale(self):
+        record_view(self.book.pk)
+        self.book.refresh_from_db()
+        at = timezone.now()
+        expected = decayed_score(self.book.trending_score, at)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(rebase_scores(at), 1)
+
+        self.assertEqual(current_scale().epoch, at)
+        self.book.refresh_from_db()
+        self.assertAlmostEqual(self.book.trending_score, expected)
+        self.assertAlmostEqual(decayed_score(self.book.trending_score, at), expected)
+
+
+# --- 4. Alertes de retour en stock ---
+class StockNotificationTests(TestCase):
+
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        self.book = create_book()
+        self.other = create_book(titre='Le Renard')
+        for book, email in [(self.book, 'a@example.com'), (self.other, 'A@example.com'), (self.book, 'b@example.com')]:
+            subscribe(book, email)
+        queue_stock_notifications([self.book.id, self.other.id])
+
+    def test_emails_are_sent_after_the_batch_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            report = send_stock_notifications()
+
+        # Demandes marquées dans la transaction, rien n'est encore parti
+        self.assertEqual(set(StockSubscription.objects.values_list('status', flat=True)), {'sent'})
+        self.assertEqual(mail.outbox, [])
+
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['a@example.com', 'b@example.com'])
+        self.assertEqual((report['emails'], report['notified']), (2, 3))
+
+    def test_book_sold_out_again_goes_back_to_waiting(self):
+        Book.objects.filter(pk=self.other.pk).update(quantites=0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            report = send_stock_notifications()
+
+        self.assertEqual(report['requeued'], 1)
+        self.assertEqual(StockSubscription.objects.get(book=self.other).status, 'waiting')
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(STOCK_NOTIFICATION_MAX_ATTEMPTS=2)
+    def test_failed_sends_are_requeued_then_abandoned(self):
+        with mock.patch('books.notifications.EmailMultiAlternatives.send', side_effect=SMTPException('indisponible')):
+            for expected_status, expected_dead in [('queued', 0), ('failed', 3)]:
+                with self.assertLogs('books.notifications', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+                    report = send_stock_notifications()
+                self.assertEqual(report['dead'], expected_dead)
+                self.assertEqual(set(StockSubscription.objects.values_list('status', flat=True)), {expected_status})
+
+        self.assertEqual(set(StockSubscription.objects.values_list('attempts', flat=True)), {2})
+        self.assertIsNone(StockSubscription.objects.filter(notified_at__isnull=False).first())
+
+
+# --- 5. Import ONIX ---
+ONIX_PRODUCT = """
+<Product>
+  <ProductIdentifier><ProductIDType>15</ProductIDType><IDValue>{isbn}</IDValue></ProductIdentifier>
+  <DescriptiveDetail>
+    <TitleDetail><TitleElement><TitleText>{titre}</TitleText></TitleElement></TitleDetail>
+    <Contributor><ContributorRole>A01</ContributorRole><PersonName>Claire Dubois</PersonName></Contributor>
+    <Language><LanguageCode>fre</LanguageCode></Language>
+    <Extent><ExtentType>00</ExtentType><ExtentValue>32</ExtentValue></Extent>
+    <Measure><MeasureType>08</MeasureType><Measurement>0.45</Measurement><MeasureUnitCode>kg</MeasureUnitCode></Measure>
+  </DescriptiveDetail>
+  <PublishingDetail>
+    <PublishingDate><PublishingDateRole>01</PublishingDateRole><Date>20250315</Date></PublishingDate>
+  </PublishingDetail>
+  <ProductSupply><SupplyDetail>
+    <Price><PriceType>04</PriceType><PriceAmount>{prix}</PriceAmount><CurrencyCode>EUR</CurrencyCode></Price>
+  </SupplyDetail></ProductSupply>
+</Product>"""
+
+
+def onix_file(*products):
+    return io.BytesIO(
+        f'<ONIXMessage xmlns="http://ns.editeur.org/onix/3.0/reference">{"".join(products)}</ONIXMessage>'.encode()
+    )
+
+
+class OnixImportTests(TestCase):
+
+    databases = {'default', 'analytics'}
+
+    def test_new_products_are_created_with_their_fields(self):
+        report = import_onix(onix_file(
+            ONIX_PRODUCT.format(isbn='978-2-12-345678-9', titre='Le Loup', prix='14,90'),
+            ONIX_PRODUCT.format(isbn='9782987654321', titre='Le Loup', prix='9.50'),
+        ), activate=True)
+
+        self.assertEqual((report['products'], report['created'], report['skipped']), (2, 2, []))
+        book = Book.objects.get(code_bare='9782123456789')
+        self.assertEqual(
+            (book.titre, book.nom, book.langue, book.nombre_pages, book.poids_grammes, book.prix, book.prix_courant),
+            ('Le Loup', 'Claire Dubois', 'Français', 32, 450, 1490, 1490)
+        )
+        self.assertEqual(str(book.date_publication), '2025-03-15')
+        self.assertTrue(book.is_active)
+        # Slugs uniques calculés en mémoire
+        self.assertEqual(
+            sorted(Book.objects.values_list('slug', flat=True)), ['le-loup', 'le-loup-2']
+        )
+
+    def test_existing_books_are_updated_only_when_changed(self):
+        book = create_book(code_bare='9782123456789', prix=1200, prix_courant=1200)
+        product = ONIX_PRODUCT.format(isbn='9782123456789', titre='Le Loup', prix='14.90')
+
+        report = import_onix(onix_file(product))
+
+        self.assertEqual((report['created'], report['updated']), (0, 1))
+        book.refresh_from_db()
+        self.assertEqual((book.prix, book.prix_courant, book.nombre_pages), (1490, 1490, 32))
+        self.assertEqual(import_onix(onix_file(product))['unchanged'], 1)
+
+    def test_invalid_products_are_skipped(self):
+        report = import_onix(onix_file(
+            ONIX_PRODUCT.format(isbn='123', titre='Sans ISBN', prix='5'),
+            ONIX_PRODUCT.format(isbn='9782123456789', titre='', prix='5'),
+        ))
+
+        self.assertEqual(
+            [(skipped['isbn'], skipped['reason']) for skipped in report['skipped']],
+            [('123', 'ISBN-13 absent ou invalide'), ('9782123456789', 'Titre absent')]
+        )
+        self.assertFalse(Book.objects.exists())
+
+    def test_malformed_file_raises_a_parse_error(self):
+        with self.assertRaises(ET.ParseError):
+            import_onix(io.BytesIO(b'<ONIXMessage><Product>'))
+
+
+# --- 6. Prix programmés ---
+class PriceScheduleTests(TestCase):
+
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        self.book = create_book(prix=2000)
+        self.now = timezone.now()
+
+    def current_price(self):
+        self.book.refresh_from_db()
+        return self.book.prix_courant
+
+    def test_active_schedule_is_applied_on_save_and_removed_on_delete(self):
+        schedule = PriceSchedule.objects.create(book=self.book, price=1500, starts_at=self.now - timedelta(hours=1))
+        self.assertEqual(self.current_price(), 1500)
+
+        # Un changement du prix de référence ne met pas fin à la promotion
+        self.book.prix = 2200
+        self.book.save(update_fields=['prix'])
+        self.assertEqual(self.current_price(), 1500)
+
+        schedule.delete()
+        self.assertEqual(self.current_price(), 2200)
+
+    def test_job_applies_period_boundaries(self):
+        starts_at = self.now + timedelta(days=1)
+        ends_at = self.now + timedelta(days=2)
+        PriceSchedule.objects.create(book=self.book, price=1500, starts_at=starts_at, ends_at=ends_at)
+        self.assertEqual(self.current_price(), 2000)
+        self.assertEqual(next_price_boundary(self.now), starts_at)
+
+        self.assertEqual(refresh_current_prices(at=starts_at), 1)
+        self.assertEqual(self.current_price(), 1500)
+        self.assertEqual(refresh_current_prices(at=starts_at), 0)
+
+        self.assertEqual(refresh_current_prices(at=ends_at), 1)
+        self.assertEqual(self.current_price(), 2000)
+        self.assertIsNone(next_price_boundary(ends_at))
+
+    def test_most_recent_overlapping_schedule_wins(self):
+        PriceSchedule.objects.create(book=self.book, price=1800, starts_at=self.now - timedelta(days=2))
+        PriceSchedule.objects.create(
+            book=self.book, price=1200, starts_at=self.now - timedelta(days=1), ends_at=self.now + timedelta(days=1)
+        )
+
+        self.assertEqual(self.current_price(), 1200)
+        refresh_current_prices(at=self.now + timedelta(days=1))
+        self.assertEqual(self.current_price(), 1800)
+
+    def test_period_ending_before_it_starts_is_rejected(self):
+        with self.assertRaises(IntegrityError):
+            PriceSchedule.objects.create(
+                book=self.book, price=1500, starts_at=self.now, ends_at=self.now - timedelta(hours=1)
+            )
+
+
+# --- 7. Modifications en masse ---
+class BulkUpdateTests(AdminAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.book = create_book(prix=2000)
+        self.other = create_book(titre='Le Renard', prix=1000)
+
+    def bulk_update(self, payload):
+        return self.client.post('/api/v1/books/bulk_update/', payload, format='json')
+
+    def test_price_adjustment_updates_reference_and_current_prices(self):
+        PriceSchedule.objects.create(book=self.other, price=800, starts_at=timezone.now() - timedelta(hours=1))
+
+        response = self.bulk_update({
+            'ids': [self.book.id, self.other.id, self.other.id, 999], 'operation': 'adjust_price', 'value': -10
+        })
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((response.data['updated'], response.data['not_found']), (2, [999]))
+        self.assertEqual(
+            list(Book.objects.order_by('pk').values_list('prix', 'prix_courant')),
+            [(1800, 1800), (900, 800)]
+        )
+
+    def test_flags_are_updated_in_a_single_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.bulk_update({'ids': [self.book.id, self.other.id], 'operation': 'deactivate'})
+
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE "books"')]), 1)
+        self.assertFalse(Book.objects.filter(is_active=True).exists())
+
+    def test_invalid_requests_are_rejected(self):
+        invalid = [
+            {'ids': [], 'operation': 'activate'},
+            {'ids': [self.book.id], 'operation': 'delete'},
+            {'ids': [self.book.id], 'operation': 'set_price', 'value': -1},
+            {'ids': [self.book.id], 'operation': 'set_price', 'value': True},
+            {'ids': [self.book.id], 'operation': 'adjust_price', 'value': -100},
+            {'ids': [self.book.id], 'operation': 'adjust_price', 'value': 'dix'},
+            {'ids': [self.book.id], 'operation': 'set_language', 'value': '  '},
+        ]
+        for payload in invalid:
+            with self.subTest(payload=payload):
+                self.assertEqual(self.bulk_update(payload).status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.assertEqual(list(Book.objects.order_by('pk').values_list('prix', flat=True)), [2000, 1000])
+
+    def test_anonymous_user_is_rejected(self):
+        self.client.force_authenticate(None)
+
+        response = self.bulk_update({'ids': [self.book.id], 'operation': 'deactivate'})
+
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+        self.assertTrue(Book.objects.get(pk=self.book.pk).is_active)
+
+
+# --- 8. Statistiques journalières ---
+class BookStatsTests(AdminAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        flush_book_stats()
+        BookDailyStats.objects.all().delete()
+        self.book = create_book()
+
+    def stats(self, **params):
+        return self.client.get(f'/api/v1/books/{self.book.id}/stats/', params)
+
+    def test_views_and_sales_are_rolled_up_per_day(self):
+        visitor = APIClient()
+        for _ in range(2):
+            visitor.get(f'/api/v1/books/{self.book.id}/')
+        record_book_sales([(self.book.id, 2, 1500), (self.book.id, 1, 1200)])
+        flush_book_stats()
+
+        today = timezone.localdate().isoformat()
+        response = self.stats(**{'from': today, 'to': today})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data['totals'], {'views': 2, 'units_sold': 3, 'revenue': 4200, 'revenue_euros': 42.0}
+        )
+        self.assertEqual(BookDailyStats.objects.get().views, 2)
+
+    def test_invalid_ranges_return_400(self):
+        for params in [{'from': 'hier'}, {'to': '2024-02-30'}, {'from': '2024-03-02', 'to': '2024-03-01'}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.stats(**params).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+# --- 9. Prévision des ventes et réassort ---
+class RestockForecastTests(AdminAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.selling = create_book()
+        self.idle = create_book(titre='Le Renard')
+        today = timezone.localdate()
+        BookDailyStats.objects.bulk_create(
+            BookDailyStats(book_id=self.selling.id, date=today - timedelta(days=day), units_sold=2)
+            for day in range(1, 15)
+        )
+
+    def test_suggestions_cover_lead_time_and_cover_days(self):
+        self.assertEqual(
+            compute_restock_suggestions(method='sma', history_days=14, window=7, lead_time=3, cover_days=7), 2
+        )
+
+        suggestions = {suggestion.book_id: suggestion for suggestion in RestockSuggestion.objects.all()}
+        selling, idle = suggestions[self.selling.id], suggestions[self.idle.id]
+        self.assertEqual((selling.daily_forecast, selling.days_of_cover, selling.suggested_quantity), (2, 2.5, 15))
+        self.assertEqual((idle.daily_forecast, idle.days_of_cover, idle.suggested_quantity), (0, None, 0))
+
+    def test_exponential_smoothing_weights_recent_days(self):
+        self.assertEqual(list(exponential_smoothing(np.array([[0., 10.], [4., 4.]]), 0.5)), [5., 4.])
+
+    def test_report_ordering(self):
+        compute_restock_suggestions(method='sma', history_days=14, window=7, lead_time=3, cover_days=7)
+
+        response = self.client.get('/api/v1/books/restock/', {'ordering': '-suggested_quantity'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['book'] for row in response.data['results']], [self.selling.id, self.idle.id])
+        self.assertEqual(
+            self.client.get('/api/v1/books/restock/', {'ordering': 'titre'}).status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
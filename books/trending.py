@@ -0,0 +1,141 @@
+# books/trending.py
+
+# ============================================
+# BOOKS - Score de tendance (décroissance exponentielle)
+# ============================================
+
+import logging
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# Origine des temps du score. Chaque événement est pondéré par
+# 2 ** ((t - origine) / demi-vie) : un événement récent pèse donc
+# exponentiellement plus qu'un ancien, et comme tous les scores partagent
+# la même origine, trier sur la colonne stockée revient à trier sur le score
+# décru à l'instant présent, sans aucun recalcul à la lecture.
+#
+# L'origine et la demi-vie en vigueur sont stockées dans TrendingScale
+# (TRENDING_EPOCH n'est que l'origine initiale). Le poids croît sans limite :
+# avec une demi-vie de 7 jours il dépasse la capacité d'un float après
+# environ 19 ans, avec 24 heures après moins de 3 ans.
+# `manage.py rebase_trending_scores` (cron, chaque semaine) ramène tous les
+# scores à leur valeur décrue, déplace l'origine à maintenant et applique
+# TRENDING_HALF_LIFE_HOURS : un changement de demi-vie ne prend effet qu'à
+# ce moment, pour que tous les scores restent sur la même échelle.
+#
+# L'échelle est gardée en mémoire par chaque processus (aucune requête en plus
+# par vue) : rechargée après un rebase fait dans le processus, et au plus tard
+# après TRENDING_SCALE_TTL_SECONDS pour un rebase lancé ailleurs (cron).
+TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+
+# Exposant maximal (2 ** 960 ~ 1e289) : laisse de la marge pour cumuler les
+# incréments sans atteindre l'infini si le rebase n'a pas été lancé
+MAX_EXPONENT = 960
+
+
+def _load_scale():
+    """Origine et demi-vie en base (TrendingScale, créée au premier appel)"""
+    from .models import TrendingScale
+
+    scale, _ = TrendingScale.objects.get_or_create(
+        pk=1,
+        defaults={'epoch': TRENDING_EPOCH, 'half_life_hours': settings.TRENDING_HALF_LIFE_HOURS}
+    )
+    return scale
+
+
+_scale = None
+_scale_loaded_at = 0.0
+
+
+def current_scale():
+    """Origine et demi-vie en vigueur du processus, rechargées si invalidées ou expirées"""
+    global _scale, _scale_loaded_at
+
+    if _scale is None or time.monotonic() - _scale_loaded_at > settings.TRENDING_SCALE_TTL_SECONDS:
+        _scale = _load_scale()
+        _scale_loaded_at = time.monotonic()
+    return _scale
+
+
+def invalidate_scale():
+    global _scale
+    _scale = None
+
+
+def _exponent(at, scale):
+    return (at - scale.epoch).total_seconds() / (scale.half_life_hours * 3600)
+
+
+def trending_increment(weight, at=None, scale=None):
+    """
+    Retourne l'incrément à ajouter à `Book.trending_score` pour un événement
+    de poids `weight` survenu à `at` (maintenant par défaut).
+    """
+    at = at or timezone.now()
+    scale = scale or current_scale()
+    exponent = _exponent(at, scale)
+    if exponent > MAX_EXPONENT:
+        logger.warning("Score de tendance plafonné : lancer manage.py rebase_trending_scores")
+        exponent = MAX_EXPONENT
+    return weight * 2 ** exponent
+
+
+def decayed_score(trending_score, at=None, scale=None):
+    """
+    Ramène un score stocké à sa valeur décrue à l'instant `at`
+    (utile pour l'affichage, inutile pour le tri).
+    """
+    at = at or timezone.now()
+    scale = scale or current_scale()
+    return trending_score * 2 ** -_exponent(at, scale)
+
+
+def record_view(book_id):
+    """Incrémente atomiquement les vues et le score de tendance d'un livre"""
+    from .models import Book
+
+    Book.objects.filter(pk=book_id).update(
+        views_count=F('views_count') + 1,
+        trending_score=F('trending_score') + trending_increment(settings.TRENDING_VIEW_WEIGHT)
+    )
+
+
+def sale_increment(quantity, at=None, scale=None):
+    """Incrément de score pour la vente de `quantity` exemplaires"""
+    return trending_increment(settings.TRENDING_SALE_WEIGHT * quantity, at, scale)
+
+
+def rebase_scores(at=None):
+    """
+    Ramène tous les scores à leur valeur décrue à `at` (maintenant par défaut)
+    et en fait la nouvelle origine, avec la demi-vie TRENDING_HALF_LIFE_HOURS.
+    Un seul UPDATE, dans la même transaction que le changement d'échelle ;
+    l'échelle du processus est rechargée après le commit.
+
+    Returns:
+        int: nombre de livres dont le score a été recalculé
+    """
+    from .models import Book, TrendingScale
+
+    at = at or timezone.now()
+    with transaction.atomic():
+        _load_scale()
+        scale = TrendingScale.objects.select_for_update().get(pk=1)
+        factor = 2 ** -_exponent(at, scale)
+        updated = Book.objects.exclude(trending_score=0).update(
+            trending_score=F('trending_score') * factor
+        )
+        scale.epoch = at
+        scale.half_life_hours = settings.TRENDING_HALF_LIFE_HOURS
+        scale.save()
+        transaction.on_commit(invalidate_scale)
+    return updated
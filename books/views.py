@@ -3,18 +3,34 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q
-from django.db import IntegrityError
+from django.db.models import Q, Sum, F, prefetch_related_objects
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import timedelta
+import codecs
 
-from .models import Book
+from .models import Book, BookDailyStats, InventoryMovement, RestockSuggestion
+from .inventory import record_initial_stock, set_stock
+from .pricing import refresh_current_prices
+from .stockfeed import check_encoding, sync_stock_feed
+from .notifications import subscribe
+from .filters import BookOrderingFilter
+from .trending import record_view
+from .stats import record_book_view
 from media.models import BookImage, BookVideo
 from .serializers import (
     BookListSerializer,
     BookDetailSerializer,
     BookCreateUpdateSerializer,
-    BookStockSerializer
+    BookStockSerializer,
+    BookBulkUpdateSerializer,
+    StockSubscriptionSerializer,
+    BookDailyStatsSerializer,
+    InventoryMovementSerializer,
+    RestockSuggestionSerializer
 )
 from media.serializers import (
     BookImageSerializer,
@@ -30,15 +46,17 @@ class BookViewSet(viewsets.ModelViewSet):
     POST/PUT/PATCH/DELETE: Admin seulement
     """
     queryset = Book.objects.filter(is_active=True)
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, BookOrderingFilter]
     filterset_fields = ['is_featured', 'langue', 'editeur']
     search_fields = ['titre', 'nom', 'description', 'legende']
-    ordering_fields = ['created_at', 'prix', 'views_count', 'sales_count']
+    ordering_fields = ['created_at', 'prix', 'prix_courant', 'views_count', 'sales_count', 'trending_score']
     ordering = ['-created_at']
     
     def get_permissions(self):
         if self.action in ['list', 'retrieve']:
             permission_classes = [IsAuthenticatedOrReadOnly]
+        elif self.action == 'notify_me':
+            permission_classes = [AllowAny]
         else:
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
@@ -50,27 +68,32 @@ class BookViewSet(viewsets.ModelViewSet):
             return BookCreateUpdateSerializer
         elif self.action == 'update_stock':
             return BookStockSerializer
+        elif self.action == 'bulk_update':
+            return BookBulkUpdateSerializer
+        elif self.action == 'notify_me':
+            return StockSubscriptionSerializer
         return BookDetailSerializer
     
     def get_queryset(self):
-        queryset = Book.objects.all()
+        # Stock effectif : instantané + mouvements d'inventaire pas encore compactés
+        queryset = Book.objects.with_stock()
         
         # Les non-admins ne voient que les livres actifs
         if not self.request.user.is_authenticated:
             queryset = queryset.filter(is_active=True)
         
-        # Filtres additionnels
+        # Filtres additionnels (prix courant matérialisé, promotions comprises)
         min_price = self.request.query_params.get('min_price')
         if min_price:
-            queryset = queryset.filter(prix__gte=int(min_price))
+            queryset = queryset.filter(prix_courant__gte=int(min_price))
         
         max_price = self.request.query_params.get('max_price')
         if max_price:
-            queryset = queryset.filter(prix__lte=int(max_price))
+            queryset = queryset.filter(prix_courant__lte=int(max_price))
         
         in_stock = self.request.query_params.get('in_stock')
         if in_stock and in_stock.lower() == 'true':
-            queryset = queryset.filter(quantites__gt=0)
+            queryset = queryset.filter(effective_stock__gt=F('reserved_quantity'))
         
         return queryset
     
@@ -80,29 +103,100 @@ class BookViewSet(viewsets.ModelViewSet):
         """
         instance = self.get_object()
         
-        # Incrémenter les vues (seulement pour les non-admins)
+        # Incrémenter les vues et le score de tendance (seulement pour les non-admins)
         if not request.user.is_authenticated or not request.user.is_staff:
+            record_view(instance.pk)
+            record_book_view(instance.pk)
             instance.views_count += 1
-            instance.save(update_fields=['views_count'])
         
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
+    def perform_create(self, serializer):
+        book = serializer.save()
+        record_initial_stock(book, note=f"Création par {self.request.user}")
+    
+    def perform_update(self, serializer):
+        # Le stock ne se modifie que par un mouvement d'inventaire
+        quantity = serializer.validated_data.pop('quantites', None)
+        book = serializer.save()
+        if quantity is not None:
+            set_stock(book, quantity, note=f"Modification par {self.request.user}")
+            book.quantites, book.pending_quantity = quantity, 0
+    
     @action(detail=True, methods=['patch'])
     def update_stock(self, request, pk=None):
         """
-        Mettre à jour uniquement le stock
+        Mettre à jour uniquement le stock (par un mouvement d'ajustement)
         """
         book = self.get_object()
         serializer = BookStockSerializer(book, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        
+        if 'stock_quantity' in serializer.validated_data:
+            set_stock(
+                book,
+                serializer.validated_data['stock_quantity'],
+                note=serializer.validated_data.get('note') or f"Ajustement par {request.user}"
+            )
+            book = self.get_queryset().get(pk=book.pk)
         
         return Response({
             'message': 'Stock mis à jour',
-            'book': serializer.data
+            'book': BookStockSerializer(book).data
         })
     
+    @action(detail=True, methods=['post'])
+    def notify_me(self, request, pk=None):
+        """
+        S'abonner à l'alerte de retour en stock d'un livre épuisé (public)
+        """
+        book = self.get_object()
+        if book.in_stock:
+            return Response({
+                'error': 'Ce livre est disponible'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        subscription, created = subscribe(book, serializer.validated_data['email'])
+        
+        return Response({
+            'message': 'Vous serez prévenu par email dès le retour en stock',
+            'subscription': StockSubscriptionSerializer(subscription).data
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+    
+    @action(detail=True, methods=['get'])
+    def stock_history(self, request, pk=None):
+        """
+        Historique des mouvements de stock d'un livre (admin uniquement)
+        Du plus récent au plus ancien, avec le stock après chaque mouvement
+        """
+        book = self.get_object()
+        
+        movements = InventoryMovement.objects.filter(book=book).order_by('-id')
+        page = self.paginate_queryset(movements)
+        
+        # Stock après chaque mouvement : on remonte depuis le stock effectif,
+        # en retirant les mouvements plus récents que la page
+        balance = book.stock_quantity
+        if page:
+            newer = movements.filter(id__gt=page[0].id).aggregate(total=Sum('delta'))['total']
+            balance -= newer or 0
+        for movement in page:
+            movement.balance_after = balance
+            balance -= movement.delta
+        
+        response = self.get_paginated_response(InventoryMovementSerializer(page, many=True).data)
+        response.data['stock'] = {
+            'snapshot': book.quantites,
+            'pending': book.pending_quantity,
+            'effective': book.stock_quantity,
+            'reserved': book.reserved_quantity,
+            'available': book.available_quantity,
+        }
+        return response
+    
     @action(detail=True, methods=['post'])
     def toggle_featured(self, request, pk=None):
         """
@@ -131,6 +225,143 @@ class BookViewSet(viewsets.ModelViewSet):
             'is_active': book.is_active
         })
     
+    @action(detail=False, methods=['post'])
+    def bulk_update(self, request):
+        """
+        Modifier plusieurs livres en une opération (admin uniquement)
+        Activation, mise en avant, prix ou langue : un seul UPDATE, sans
+        charger ni enregistrer les livres un par un
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        
+        with transaction.atomic():
+            books = Book.objects.filter(pk__in=ids)
+            found = set(books.values_list('pk', flat=True))
+            updates = serializer.updates()
+            updated = books.update(**updates, updated_at=timezone.now())
+            if 'prix' in updates:
+                refresh_current_prices(found)
+        
+        return Response({
+            'message': f'{updated} livre(s) modifié(s)',
+            'operation': serializer.validated_data['operation'],
+            'updated': updated,
+            'not_found': [book_id for book_id in ids if book_id not in found]
+        })
+    
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Statistiques journalières d'un livre (admin uniquement)
+        Lit uniquement la table d'agrégats BookDailyStats
+        """
+        book = self.get_object()
+        
+        date_from = request.query_params.get('from')
+        date_to = request.query_params.get('to')
+        try:
+            date_to = parse_date(date_to) if date_to else timezone.localdate()
+            if date_from:
+                date_from = parse_date(date_from)
+            elif date_to:
+                date_from = date_to - timedelta(days=29)
+        except ValueError:
+            date_from = date_to = None
+        
+        if not date_from or not date_to:
+            return Response({
+                'error': 'Dates invalides, format attendu: AAAA-MM-JJ'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if date_from > date_to:
+            return Response({
+                'error': 'La date de début doit précéder la date de fin'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        daily_stats = BookDailyStats.objects.filter(
+            book=book,
+            date__gte=date_from,
+            date__lte=date_to
+        )
+        totals = daily_stats.aggregate(
+            views=Sum('views'),
+            units_sold=Sum('units_sold'),
+            revenue=Sum('revenue')
+        )
+        
+        return Response({
+            'book_id': book.id,
+            'from': date_from,
+            'to': date_to,
+            'totals': {
+                'views': totals['views'] or 0,
+                'units_sold': totals['units_sold'] or 0,
+                'revenue': totals['revenue'] or 0,
+                'revenue_euros': (totals['revenue'] or 0) / 100,
+            },
+            'days': BookDailyStatsSerializer(daily_stats, many=True).data
+        })
+    
+    @action(detail=False, methods=['get'])
+    def restock(self, request):
+        """
+        Rapport de réassort (admin uniquement)
+        Tri via ?ordering=days_of_cover (défaut), -suggested_quantity, -daily_forecast...
+        """
+        allowed = {'days_of_cover', 'suggested_quantity', 'daily_forecast', 'stock'}
+        ordering = request.query_params.get('ordering', 'days_of_cover')
+        field = ordering.lstrip('-')
+        if field not in allowed:
+            return Response({
+                'error': f'Tri invalide, valeurs possibles: {", ".join(sorted(allowed))}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Les livres sans vente prévue (couverture infinie) sont toujours en fin de liste
+        order_by = F(field).desc(nulls_last=True) if ordering.startswith('-') else F(field).asc(nulls_last=True)
+        queryset = RestockSuggestion.objects.order_by(order_by, 'book_id')
+        
+        only_needed = request.query_params.get('to_order')
+        if only_needed and only_needed.lower() == 'true':
+            queryset = queryset.filter(suggested_quantity__gt=0)
+        
+        # Livres chargés par une requête séparée : les suggestions sont dans la base analytics
+        page = self.paginate_queryset(queryset)
+        prefetch_related_objects(page, 'book')
+        serializer = RestockSuggestionSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=False, methods=['post'], url_path='stock-feed')
+    def stock_feed(self, request):
+        """
+        Synchronise le stock avec le flux CSV du distributeur (admin uniquement)
+        Fichier `file` (ISBN ; quantité), ?dry_run=true pour le diff sans écriture
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'error': 'Fichier CSV requis (champ file)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        dry_run = str(request.query_params.get('dry_run', request.data.get('dry_run', ''))).lower() == 'true'
+        # Encodage vérifié avant toute écriture (sinon des paquets déjà
+        # écrits resteraient derrière une réponse 400)
+        try:
+            check_encoding(upload.chunks())
+        except UnicodeDecodeError:
+            return Response({
+                'error': 'Le fichier doit être encodé en UTF-8'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        upload.seek(0)
+        
+        report = sync_stock_feed(
+            codecs.iterdecode(upload, 'utf-8-sig'),
+            dry_run=dry_run,
+            note=f"Flux fournisseur {upload.name} par {request.user}"[:255]
+        )
+        return Response(report)
+    
     @action(detail=True, methods=['get'])
     def order_status(self, request, pk=None):
         """
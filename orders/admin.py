@@ -4,7 +4,9 @@ from django.utils.html import format_html
 from django.utils import timezone
 from django.db.models import Sum
 from django.core.exceptions import ValidationError
-from .models import Order, OrderItem, Country
+from .models import Order, OrderItem, Country, CustomerSummary, IdempotencyKey, ShippingRate, StockReservation
+from .stats import is_paid, paid_condition, record_status_change, record_orders_removed
+from .reservations import release_order_reservations
 
 # --- INLINE : Articles de la commande ---
 class OrderItemInline(admin.TabularInline):
@@ -69,7 +71,7 @@ class OrderItemInline(admin.TabularInline):
                 '<small>Prix: {:.2f}€ | Stock: {}</small>',
                 obj.book.titre,
                 obj.book.nom,
-                obj.book.prix / 100,
+                obj.book.prix_courant / 100,
                 obj.book.quantites
             )
         return "Aucun livre sélectionné"
@@ -102,6 +104,7 @@ class OrderAdmin(admin.ModelAdmin):
         'full_name', 
         'email', 
         'display_total_euros', 
+        'is_paid', 
         'status', 
         'tracking_number', 
         'created_at'
@@ -110,7 +113,7 @@ class OrderAdmin(admin.ModelAdmin):
     list_display_links = ('id', 'full_name')
     
     # 2. Filtres
-    list_filter = ('status', 'country', 'created_at')
+    list_filter = ('is_paid', 'status', 'channel', 'country', 'created_at')
     
     # 3. Barre de recherche (Nom, Email, Tracking)
     search_fields = (
@@ -119,7 +122,8 @@ class OrderAdmin(admin.ModelAdmin):
         'email', 
         'code_postal', 
         'ville', 
-        'tracking_number'
+        'tracking_number',
+        'external_reference'
     )
     
     # 4. Inlines (Articles)
@@ -175,6 +179,7 @@ class OrderAdmin(admin.ModelAdmin):
         ('Détails Financiers & Paiement', {
             'fields': (
                 ('subtotal', 'shipping_cost', 'total'), 
+                ('is_paid', 'paid_at'), 
                 'stripe_payment_intent_id', 
                 'stripe_checkout_session_id'
             ),
@@ -189,6 +194,7 @@ class OrderAdmin(admin.ModelAdmin):
         'code_postal', 'ville',
         'subtotal', 'shipping_cost', 'total', 
         'stripe_payment_intent_id', 'stripe_checkout_session_id',
+        'is_paid', 'paid_at',
         'created_at', 'updated_at',
         'full_address_hint', # Custom field
     ]
@@ -205,6 +211,23 @@ class OrderAdmin(admin.ModelAdmin):
         """Sauvegarde la commande et recalcule les totaux si nécessaire"""
         super().save_model(request, obj, form, change)
         # Les totaux seront recalculés automatiquement si nécessaire
+        
+        # Tenir à jour les statistiques si le statut d'une commande payée change
+        if change and 'status' in form.changed_data and is_paid(obj):
+            record_status_change([obj], form.initial.get('status'), obj.status)
+    
+    def delete_model(self, request, obj):
+        """Retire la commande des statistiques et libère son stock réservé avant suppression"""
+        if is_paid(obj):
+            record_orders_removed([obj])
+        release_order_reservations([obj])
+        super().delete_model(request, obj)
+    
+    def delete_queryset(self, request, queryset):
+        """Retire les commandes payées des statistiques avant suppression de masse"""
+        record_orders_removed(list(queryset.filter(paid_condition())))
+        release_order_reservations(queryset)
+        super().delete_queryset(request, queryset)
     
     def save_formset(self, request, form, formset, change):
         """Sauvegarde les articles et recalcule le total de la commande"""
@@ -240,10 +263,13 @@ class OrderAdmin(admin.ModelAdmin):
     @admin.action(description='Marquer les commandes sélectionnées comme Livrées')
     def mark_as_delivered(self, request, queryset):
         # Filtre uniquement les commandes en attente
-        updated_count = queryset.filter(status='pending').update(
+        pending = queryset.filter(status='pending')
+        paid_orders = list(pending.filter(paid_condition()))
+        updated_count = pending.update(
             status='delivered', 
             delivered_at=timezone.now()
         )
+        record_status_change(paid_orders, 'pending', 'delivered')
         self.message_user(
             request, 
             f"{updated_count} commandes ont été marquées comme Livrées."
@@ -257,6 +283,7 @@ class CountryAdmin(admin.ModelAdmin):
     list_display = (
         'name', 
         'code', 
+        'shipping_zone',
         'display_shipping_cost_euros', 
         'is_active'
     )
@@ -264,13 +291,13 @@ class CountryAdmin(admin.ModelAdmin):
     list_display_links = ('name', 'code')
     
     # 2. Filtres
-    list_filter = ('is_active',)
+    list_filter = ('is_active', 'shipping_zone')
     
     # 3. Barre de recherche
     search_fields = ('name', 'code')
     
     # 4. Champs affichés
-    fields = ('name', 'code', 'shipping_cost', 'is_active', 'shipping_cost_hint')
+    fields = ('name', 'code', 'shipping_zone', 'shipping_cost', 'is_active', 'shipping_cost_hint')
     
     # 5. Lecture seule
     readonly_fields = ('shipping_cost_hint',)
@@ -284,4 +311,101 @@ class CountryAdmin(admin.ModelAdmin):
     @admin.display(description="Aperçu frais de port")
     def shipping_cost_hint(self, obj):
         """Affiche le coût en euros à côté du champ en centimes dans le formulaire"""
-        return f"Soit {obj.shipping_cost_euros:.2f} €"
\ No newline at end of file
+        return f"Soit {obj.shipping_cost_euros:.2f} €"
+
+
+# --- ADMIN : Grille des frais de port (ShippingRate) ---
+@admin.register(ShippingRate)
+class ShippingRateAdmin(admin.ModelAdmin):
+    """Paliers de frais de port par pays ou par zone (voir orders/shipping.py)"""
+    list_display = ('display_scope', 'metric', 'max_value', 'price', 'display_price_euros')
+    list_editable = ('price',)
+    list_filter = ('zone', 'metric', 'country')
+    list_select_related = ('country',)
+    ordering = ('zone', 'country__name', 'metric', 'max_value')
+    fields = ('country', 'zone', 'metric', 'max_value', 'price')
+
+    @admin.display(description="Pays / zone")
+    def display_scope(self, obj):
+        return obj.country or obj.get_zone_display()
+
+    @admin.display(description="Prix (€)")
+    def display_price_euros(self, obj):
+        return f"{obj.price_euros:.2f} €"
+
+
+# --- ADMIN : Agrégat clients (CustomerSummary) ---
+@admin.register(CustomerSummary)
+class CustomerSummaryAdmin(admin.ModelAdmin):
+    """Liste des clients, alimentée à chaque commande payée (lecture seule)"""
+    # 1. Colonnes (toutes triables sur des colonnes indexées)
+    list_display = (
+        'email',
+        'order_count',
+        'display_total_spent_euros',
+        'first_order_at',
+        'last_order_at',
+        'display_country'
+    )
+    
+    # 2. Filtres et recherche
+    list_filter = ('country',)
+    search_fields = ('email',)
+    
+    # 3. Pagination sans COUNT(*) complet sur les recherches
+    list_per_page = 50
+    show_full_result_count = False
+    ordering = ('-last_order_at',)
+
+    def get_queryset(self, request):
+        # Pays chargés par une requête séparée (agrégat dans la base analytics)
+        return super().get_queryset(request).prefetch_related('country')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Pays")
+    def display_country(self, obj):
+        # Pas de champ FK dans list_display : l'admin ajouterait un select_related
+        # impossible entre les deux bases
+        return obj.country
+
+    @admin.display(description="Total dépensé (€)", ordering='total_spent')
+    def display_total_spent_euros(self, obj):
+        return f"{obj.total_spent_euros:.2f} €"
+
+
+# --- ADMIN : Réservations de stock (StockReservation) ---
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    """Réservations des commandes en attente de paiement (lecture seule)"""
+    list_display = ('order', 'book', 'quantity', 'status', 'expires_at', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('order__email', 'book__titre')
+    list_select_related = ('order', 'book')
+    ordering = ('-created_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+# --- ADMIN : Clés d'idempotence (IdempotencyKey) ---
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    """Réponses enregistrées des requêtes Idempotency-Key (lecture seule)"""
+    list_display = ('key', 'scope', 'status', 'response_status', 'created_at', 'expires_at')
+    list_filter = ('scope', 'status')
+    search_fields = ('key',)
+    ordering = ('-created_at',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
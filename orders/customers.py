@@ -0,0 +1,97 @@
+# ============================================
+# ORDERS - Agrégat clients (CustomerSummary)
+# ============================================
+
+from django.db import router, transaction
+from django.db.models import F
+
+from zoonova.utils import iter_chunks
+
+
+def normalize_email(email):
+    """Clé d'agrégation d'un client"""
+    return email.strip().lower()
+
+
+def record_paid_order(order):
+    """
+    Ajoute une commande qui vient d'être payée à l'agrégat de son client.
+    À appeler une seule fois par commande, au passage à l'état payé.
+    """
+    from .models import CustomerSummary
+
+    with transaction.atomic(using=router.db_for_write(CustomerSummary)):
+        summary, created = CustomerSummary.objects.select_for_update().get_or_create(
+            email=normalize_email(order.email),
+            defaults={
+                'country_id': order.country_id,
+                'order_count': 1,
+                'total_spent': order.total,
+                'first_order_at': order.created_at,
+                'last_order_at': order.created_at,
+            }
+        )
+        if created:
+            return summary
+
+        updates = {
+            'order_count': F('order_count') + 1,
+            'total_spent': F('total_spent') + order.total,
+        }
+        if order.created_at < summary.first_order_at:
+            updates['first_order_at'] = order.created_at
+        if order.created_at >= summary.last_order_at:
+            updates['last_order_at'] = order.created_at
+            updates['country_id'] = order.country_id
+
+        CustomerSummary.objects.filter(pk=summary.pk).update(**updates)
+
+    return summary
+
+
+def rebuild_customer_summaries(orders, batch_size=1000):
+    """
+    Reconstruit CustomerSummary à partir d'un queryset de commandes payées,
+    en un seul parcours par lots (les valeurs existantes sont remplacées).
+    
+    Returns:
+        int: nombre de clients écrits
+    """
+    from .models import CustomerSummary
+
+    # Lecture par lots des commandes (base principale), dans l'ordre des
+    # clés primaires : les dates extrêmes sont donc comparées explicitement
+    customers = {}
+    for chunk in iter_chunks(orders, batch_size):
+        rows = chunk.order_by('id').values_list('email', 'total', 'created_at', 'country_id')
+        for email, total, created_at, country_id in rows:
+            key = normalize_email(email)
+            customer = customers.get(key)
+            if customer is None:
+                customers[key] = CustomerSummary(
+                    email=key,
+                    country_id=country_id,
+                    order_count=1,
+                    total_spent=total,
+                    first_order_at=created_at,
+                    last_order_at=created_at,
+                )
+                continue
+
+            customer.order_count += 1
+            customer.total_spent += total
+            if created_at < customer.first_order_at:
+                customer.first_order_at = created_at
+            if created_at >= customer.last_order_at:
+                customer.last_order_at = created_at
+                customer.country_id = country_id
+
+    # Écriture dans la base analytics
+    CustomerSummary.objects.bulk_create(
+        customers.values(),
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['email'],
+        update_fields=['country', 'order_count', 'total_spent', 'first_order_at', 'last_order_at'],
+    )
+    return len(customers)
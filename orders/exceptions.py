@@ -0,0 +1,16 @@
+# ============================================
+# ORDERS - Exceptions API
+# ============================================
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class StockConflict(APIException):
+    """
+    Le stock d'un livre a été épuisé par une autre commande entre la
+    validation du panier et la décrémentation (409 Conflict).
+    """
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Stock insuffisant, le panier doit être mis à jour"
+    default_code = 'stock_conflict'
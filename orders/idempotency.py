@@ -0,0 +1,165 @@
+# ============================================
+# ORDERS - Requêtes idempotentes (en-tête Idempotency-Key)
+# ============================================
+#
+# Un client qui répète une requête POST (réseau instable) envoie la même
+# `Idempotency-Key`. La première requête réserve la clé (ligne IdempotencyKey
+# `processing`, contrainte unique), s'exécute puis enregistre sa réponse :
+# - répétition après la fin   -> réponse enregistrée rejouée (Idempotent-Replayed: true)
+# - répétition pendant        -> attend la fin de la première (IDEMPOTENCY_WAIT_SECONDS)
+# - même clé, autre corps     -> 422
+# Une requête terminée par une exception, une erreur 5xx ou un conflit (409)
+# libère la clé : le client peut réessayer. Une requête interrompue sans
+# réponse (worker tué, timeout) garde la clé `processing` : son bail
+# (`locked_until`, IDEMPOTENCY_LEASE_SECONDS) expiré, une répétition la reprend.
+
+import hashlib
+import json
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+POLL_INTERVAL = 0.1
+
+
+def _fingerprint(request):
+    """Empreinte du corps de la requête (ordre des clés indifférent)"""
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _claim(scope, key, fingerprint):
+    """
+    Réserve la clé pour cette requête.
+
+    Returns:
+        tuple: (bail obtenu ou None, ligne existante si la clé est déjà prise)
+    """
+    from .models import IdempotencyKey
+
+    now = timezone.now()
+    lease = now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+    expires_at = now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.create(
+                scope=scope, key=key, fingerprint=fingerprint,
+                expires_at=expires_at, locked_until=lease
+            )
+        return lease, None
+    except IntegrityError:
+        existing = IdempotencyKey.objects.filter(scope=scope, key=key).first()
+        if existing is None:
+            return _claim(scope, key, fingerprint)
+        if existing.expires_at <= now:
+            existing.delete()
+            return _claim(scope, key, fingerprint)
+        if (
+            existing.status == 'processing'
+            and existing.fingerprint == fingerprint
+            and (existing.locked_until is None or existing.locked_until <= now)
+        ):
+            # Requête abandonnée sans réponse (ou clé antérieure aux baux) :
+            # reprise du bail, une seule répétition l'obtient (UPDATE conditionnel)
+            held = (
+                Q(locked_until__isnull=True) if existing.locked_until is None
+                else Q(locked_until=existing.locked_until)
+            )
+            taken = IdempotencyKey.objects.filter(
+                held, pk=existing.pk, status='processing'
+            ).update(locked_until=lease, expires_at=expires_at)
+            if taken:
+                return lease, None
+        return None, existing
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(scope):
+    """
+    Décorateur d'une vue POST (fonction ou méthode de ViewSet) rendant la
+    requête idempotente quand le client envoie l'en-tête Idempotency-Key.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            from .models import IdempotencyKey
+
+            request = next(arg for arg in args if isinstance(arg, Request))
+            key = request.headers.get(HEADER)
+            if not key:
+                return view(*args, **kwargs)
+            if len(key) > 255:
+                return Response({
+                    'error': f'{HEADER} trop longue (255 caractères maximum)'
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            fingerprint = _fingerprint(request)
+            deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+            while True:
+                lease, existing = _claim(scope, key, fingerprint)
+                if lease is not None:
+                    break
+                if existing.fingerprint != fingerprint:
+                    return Response({
+                        'error': f'{HEADER} déjà utilisée pour une autre requête'
+                    }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                if existing.status == 'completed':
+                    return _replay(existing)
+                if time.monotonic() >= deadline:
+                    return Response({
+                        'error': 'Une requête identique est en cours de traitement, réessayez plus tard'
+                    }, status=status.HTTP_409_CONFLICT)
+                # La première requête est en cours : attendre sa réponse
+                time.sleep(POLL_INTERVAL)
+
+            # Écritures limitées à notre bail : une requête reprise après
+            # expiration du bail n'est pas écrasée par la requête d'origine
+            claimed = IdempotencyKey.objects.filter(
+                scope=scope, key=key, status='processing', locked_until=lease
+            )
+            try:
+                response = view(*args, **kwargs)
+            except Exception:
+                claimed.delete()
+                raise
+
+            # Erreur serveur ou conflit de stock : passagers, une répétition sera réexécutée
+            if response.status_code >= 500 or response.status_code == status.HTTP_409_CONFLICT:
+                claimed.delete()
+            else:
+                claimed.update(
+                    status='completed',
+                    response_status=response.status_code,
+                    response_body=response.data
+                )
+            return response
+        return wrapper
+    return decorator
+
+
+def purge_expired_keys(now=None):
+    """
+    Supprime les clés expirées.
+
+    Returns:
+        int: nombre de clés supprimées
+    """
+    from .models import IdempotencyKey
+
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
@@ -0,0 +1,317 @@
+# ============================================
+# ORDERS - Import de commandes en masse (marketplaces, B2B)
+# ============================================
+#
+# Les commandes importées sont déjà payées chez le partenaire : pas de
+# réservation ni de paiement Stripe, le stock sort immédiatement (mouvements
+# d'inventaire `sale`). Déroulement :
+# 1. validation de toutes les lignes en mémoire (pays et livres chargés une
+#    seule fois pour tout le lot, références déjà importées en une requête)
+# 2. création par paquets de ORDER_IMPORT_CHUNK_SIZE commandes, chacun dans sa
+#    transaction : verrou des livres, contrôle du stock vendable, puis
+#    bulk_create des commandes, articles et mouvements de stock
+# Une ligne invalide, sans stock ou dont un livre est désactivé est rapportée
+# sans interrompre le lot. Un paquet en conflit (import concurrent du même
+# fichier) est rejoué commande par commande : seules les commandes en conflit
+# sont rejetées, chacune une seule fois.
+
+import logging
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, FloatField, IntegerField, Q, Value, When
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def _load_books(rows):
+    """Livres référencés par le lot, indexés par identifiant et par code-barres (une requête)"""
+    from books.models import Book
+
+    book_ids = set()
+    codes = set()
+    for row in rows:
+        for item in row['items']:
+            if 'book_id' in item:
+                book_ids.add(item['book_id'])
+            else:
+                codes.add(item['code_bare'])
+
+    books = Book.objects.filter(Q(pk__in=book_ids) | Q(code_bare__in=codes)).only(
+        'id', 'titre', 'prix_courant', 'code_bare', 'poids_grammes', 'epaisseur_cm', 'is_active'
+    )
+    by_id = {}
+    by_code = {}
+    for book in books:
+        by_id[book.id] = book
+        if book.code_bare:
+            by_code[book.code_bare] = book
+    return by_id, by_code
+
+
+def _prepare(index, row, countries, by_id, by_code):
+    """
+    Résout pays et livres d'une ligne validée.
+
+    Returns:
+        tuple: (ligne préparée, None) ou (None, erreurs)
+    """
+    from .shipping import calculate_shipping_cost, parcel_metrics
+
+    country_id = countries.get(row['country'].upper())
+    if country_id is None:
+        return None, {'country': [f"Pays {row['country']} inconnu ou inactif"]}
+
+    lines = []
+    quantities = Counter()
+    missing = []
+    inactive = []
+    for item in row['items']:
+        book = by_id.get(item['book_id']) if 'book_id' in item else by_code.get(item['code_bare'])
+        if book is None:
+            missing.append(str(item.get('book_id', item.get('code_bare'))))
+            continue
+        if not book.is_active:
+            inactive.append(book.titre)
+            continue
+        unit_price = item.get('unit_price', book.prix_courant)
+        lines.append((book, item['quantity'], unit_price))
+        quantities[book.id] += item['quantity']
+    errors = []
+    if missing:
+        errors.append(f"Livre {', '.join(missing)} introuvable")
+    if inactive:
+        errors.append(f"Livre {', '.join(inactive)} indisponible")
+    if errors:
+        return None, {'items': errors}
+
+    subtotal = sum(quantity * unit_price for _, quantity, unit_price in lines)
+    shipping_cost = row.get('shipping_cost')
+    if shipping_cost is None:
+        shipping_cost = calculate_shipping_cost(
+            country_id,
+            *parcel_metrics((by_id[book_id], quantity) for book_id, quantity in quantities.items())
+        )
+
+    fields = {
+        name: row[name] for name in (
+            'external_reference', 'email', 'first_name', 'last_name', 'phone',
+            'voie', 'numero_voie', 'complement_adresse', 'code_postal', 'ville'
+        )
+    }
+    return {
+        'row': index,
+        'fields': dict(
+            fields,
+            country_id=country_id,
+            subtotal=subtotal,
+            shipping_cost=shipping_cost,
+            total=subtotal + shipping_cost,
+        ),
+        'lines': lines,
+        'quantities': quantities,
+    }, None
+
+
+def _record_customers(orders):
+    """Ajoute les commandes importées à l'agrégat clients"""
+    from .customers import record_paid_order
+
+    for order in orders:
+        try:
+            record_paid_order(order)
+        except Exception as e:
+            logger.error(f"Erreur mise à jour du client pour order {order.id}: {str(e)}", exc_info=True)
+
+
+def _create_chunk(channel, prepared, report):
+    """
+    Crée un paquet de commandes préparées dans une seule transaction.
+    Le compte rendu n'est complété qu'après le commit : un paquet annulé
+    (IntegrityError) n'y laisse aucune trace.
+    """
+    from books.inventory import record_movements
+    from books.models import Book, InventoryMovement
+    from books.stats import record_book_sales
+    from books.trending import current_scale, sale_increment
+    from .models import Order, OrderItem
+    from .stats import record_orders_paid
+
+    book_ids = sorted({book_id for entry in prepared for book_id in entry['quantities']})
+
+    with transaction.atomic():
+        # Verrouiller les livres dans l'ordre des identifiants (même ordre que
+        # la création de commande), puis lire leur stock vendable
+        list(Book.objects.select_for_update().filter(pk__in=book_ids).order_by('pk').values_list('pk'))
+        available = dict(
+            Book.objects.with_stock().filter(pk__in=book_ids)
+            .annotate(available=F('effective_stock') - F('reserved_quantity'))
+            .values_list('pk', 'available')
+        )
+
+        rejected = []
+        accepted = []
+        for entry in prepared:
+            short = [
+                book_id for book_id, quantity in entry['quantities'].items()
+                if available[book_id] < quantity
+            ]
+            if short:
+                books = {book.id: book for book, _, _ in entry['lines']}
+                titles = ', '.join(books[book_id].titre for book_id in short)
+                rejected.append({
+                    'row': entry['row'],
+                    'external_reference': entry['fields']['external_reference'],
+                    'errors': {'items': [f"Stock insuffisant pour {titles}"]},
+                })
+                continue
+            for book_id, quantity in entry['quantities'].items():
+                available[book_id] -= quantity
+            accepted.append(entry)
+
+        if not accepted:
+            report['errors'].extend(rejected)
+            return
+
+        # Payées chez le partenaire
+        paid_at = timezone.now()
+        orders = Order.objects.bulk_create([
+            Order(channel=channel, is_paid=True, paid_at=paid_at, **entry['fields'])
+            for entry in accepted
+        ])
+
+        items = []
+        movements = []
+        sold = Counter()
+        for order, entry in zip(orders, accepted):
+            for book, quantity, unit_price in entry['lines']:
+                items.append(OrderItem(
+                    order=order,
+                    book=book,
+                    book_title=book.titre,
+                    unit_price=unit_price,
+                    quantity=quantity
+                ))
+            for book_id, quantity in entry['quantities'].items():
+                movements.append(InventoryMovement(
+                    book_id=book_id,
+                    delta=-quantity,
+                    reason='sale',
+                    order=order
+                ))
+                sold[book_id] += quantity
+        OrderItem.objects.bulk_create(items, batch_size=1000)
+        record_movements(movements)
+
+        # Compteurs de ventes et de tendance de tous les livres en un seul UPDATE
+        sold_ids = sorted(sold)
+        scale = current_scale()
+        Book.objects.filter(pk__in=sold_ids).update(
+            sales_count=F('sales_count') + Case(
+                *[When(pk=book_id, then=Value(sold[book_id])) for book_id in sold_ids],
+                output_field=IntegerField()
+            ),
+            trending_score=F('trending_score') + Case(
+                *[When(pk=book_id, then=Value(sale_increment(sold[book_id], scale=scale))) for book_id in sold_ids],
+                output_field=FloatField()
+            )
+        )
+
+        sales = [(item.book_id, item.quantity, item.unit_price) for item in items]
+        transaction.on_commit(lambda: record_book_sales(sales))
+        transaction.on_commit(lambda: record_orders_paid(orders))
+        transaction.on_commit(lambda: _record_customers(orders))
+
+    report['errors'].extend(rejected)
+    report['created'] += len(orders)
+    report['orders'].extend(
+        {'row': entry['row'], 'external_reference': order.external_reference, 'id': order.id}
+        for order, entry in zip(orders, accepted)
+    )
+
+
+def import_orders(rows, channel, chunk_size=None):
+    """
+    Importe un lot de commandes déjà payées chez un partenaire.
+
+    Args:
+        rows (list): commandes au format ImportedOrderSerializer
+        channel (str): canal de vente ('marketplace' ou 'b2b')
+        chunk_size (int): commandes par transaction (défaut: ORDER_IMPORT_CHUNK_SIZE)
+
+    Returns:
+        dict: compte rendu (commandes créées, doublons ignorés, erreurs par ligne)
+    """
+    from .models import Order
+    from .quotes import active_countries
+    from .serializers import ImportedOrderSerializer
+
+    chunk_size = chunk_size or settings.ORDER_IMPORT_CHUNK_SIZE
+    report = {'received': len(rows), 'created': 0, 'duplicates': [], 'errors': [], 'orders': []}
+
+    def reject(index, reference, errors):
+        report['errors'].append({'row': index, 'external_reference': reference, 'errors': errors})
+
+    # 1. Validation du format, sans accès à la base
+    valid = []
+    for index, row in enumerate(rows):
+        serializer = ImportedOrderSerializer(data=row)
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            reference = row.get('external_reference') if isinstance(row, dict) else None
+            reject(index, reference, serializer.errors)
+
+    # 2. Doublons : références déjà importées (une requête) ou répétées dans le lot
+    existing = set(
+        Order.objects.filter(
+            channel=channel,
+            external_reference__in=[row['external_reference'] for _, row in valid]
+        ).values_list('external_reference', flat=True)
+    )
+    seen = set()
+    unique = []
+    for index, row in valid:
+        reference = row['external_reference']
+        if reference in existing or reference in seen:
+            report['duplicates'].append({'row': index, 'external_reference': reference})
+            continue
+        seen.add(reference)
+        unique.append((index, row))
+
+    # 3. Résolution des pays (cache) et des livres (une requête pour tout le lot)
+    countries = {country['code'].upper(): country_id for country_id, country in active_countries().items()}
+    by_id, by_code = _load_books([row for _, row in unique])
+    prepared = []
+    for index, row in unique:
+        entry, errors = _prepare(index, row, countries, by_id, by_code)
+        if errors:
+            reject(index, row['external_reference'], errors)
+        else:
+            prepared.append(entry)
+
+    # 4. Création par paquets, une transaction par paquet
+    for start in range(0, len(prepared), chunk_size):
+        chunk = prepared[start:start + chunk_size]
+        try:
+            _create_chunk(channel, chunk, report)
+        except IntegrityError as e:
+            # Import concurrent du même fichier : le paquet entier est annulé,
+            # puis rejoué commande par commande
+            logger.warning(f"Import {channel}: paquet de {len(chunk)} commande(s) annulé, rejoué ligne à ligne: {str(e)}")
+            for entry in chunk:
+                try:
+                    _create_chunk(channel, [entry], report)
+                except IntegrityError:
+                    reject(entry['row'], entry['fields']['external_reference'], {
+                        'non_field_errors': ["Commande déjà importée ou conflit d'écriture, réessayer"]
+                    })
+
+    report['errors'].sort(key=lambda error: error['row'])
+    logger.info(
+        f"Import {channel}: {report['created']}/{report['received']} commande(s) créée(s), "
+        f"{len(report['duplicates'])} doublon(s), {len(report['errors'])} erreur(s)"
+    )
+    return report
@@ -0,0 +1,21 @@
+# orders/management/commands/backfill_customers.py
+
+from django.core.management.base import BaseCommand
+
+from orders.customers import rebuild_customer_summaries
+from orders.models import Order
+from orders.stats import paid_condition
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'agrégat clients (CustomerSummary) à partir des commandes payées"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        paid_orders = Order.objects.filter(paid_condition())
+
+        count = rebuild_customer_summaries(paid_orders, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'{count} client(s) reconstruit(s)'))
@@ -0,0 +1,60 @@
+# orders/management/commands/import_orders.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.imports import import_orders
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = (
+        "Importe un fichier de commandes marketplace / B2B déjà payées "
+        "(tableau JSON ou JSON Lines, une commande par ligne)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Fichier .json ou .jsonl')
+        parser.add_argument(
+            '--channel',
+            required=True,
+            choices=[value for value, _ in Order.CHANNEL_CHOICES if value != 'web']
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Commandes créées par transaction (défaut: ORDER_IMPORT_CHUNK_SIZE)'
+        )
+        parser.add_argument(
+            '--errors',
+            default=None,
+            help='Fichier JSON où écrire le détail des lignes rejetées'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], encoding='utf-8') as source:
+                if options['path'].endswith('.jsonl'):
+                    rows = [json.loads(line) for line in source if line.strip()]
+                else:
+                    rows = json.load(source)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Lecture de {options['path']} impossible: {e}")
+        if not isinstance(rows, list):
+            raise CommandError("Le fichier doit contenir une liste de commandes")
+
+        report = import_orders(rows, options['channel'], chunk_size=options['chunk_size'])
+
+        if options['errors'] and report['errors']:
+            with open(options['errors'], 'w', encoding='utf-8') as output:
+                json.dump(report['errors'], output, ensure_ascii=False, indent=2)
+        else:
+            for error in report['errors']:
+                self.stderr.write(f"Ligne {error['row']} ({error['external_reference']}): {error['errors']}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']}/{report['received']} commande(s) importée(s), "
+            f"{len(report['duplicates'])} doublon(s) ignoré(s), {len(report['errors'])} erreur(s)"
+        ))
@@ -0,0 +1,13 @@
+# orders/management/commands/purge_idempotency_keys.py
+
+from django.core.management.base import BaseCommand
+
+from orders.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Supprime les clés Idempotency-Key expirées (à planifier quotidiennement)"
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} clé(s) expirée(s) supprimée(s)'))
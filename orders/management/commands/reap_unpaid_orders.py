@@ -0,0 +1,50 @@
+# orders/management/commands/reap_unpaid_orders.py
+
+from django.core.management.base import BaseCommand
+
+from orders.reaper import reap_unpaid_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Rend à la vente le stock des commandes jamais payées puis les supprime, par lots. "
+        "À planifier quotidiennement (cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=None,
+            help='Âge minimal des commandes en heures (défaut: UNPAID_ORDER_MAX_AGE_HOURS)'
+        )
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--archive',
+            default=None,
+            help='Fichier JSON Lines auquel ajouter les commandes supprimées (avec leurs articles)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Afficher ce qui serait récupéré sans rien modifier'
+        )
+
+    def handle(self, *args, **options):
+        kwargs = {
+            'max_age_hours': options['older_than'],
+            'batch_size': options['batch_size'],
+            'dry_run': options['dry_run'],
+        }
+        if options['archive'] and not options['dry_run']:
+            with open(options['archive'], 'a', encoding='utf-8') as archive:
+                report = reap_unpaid_orders(archive=archive, **kwargs)
+        else:
+            report = reap_unpaid_orders(**kwargs)
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{report['orders']} commande(s) non payée(s), {report['items']} article(s) : "
+            f"{report['units_released']} exemplaire(s) réservé(s) libéré(s), "
+            f"{report['units_restocked']} exemplaire(s) remis en stock"
+        ))
@@ -0,0 +1,15 @@
+# orders/management/commands/rebuild_order_stats.py
+
+from django.core.management.base import BaseCommand
+
+from orders.models import Order
+from orders.stats import paid_condition, rebuild_order_stats
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'agrégat journalier des commandes payées (OrderDailyStats)"
+
+    def handle(self, *args, **options):
+        rows = rebuild_order_stats(Order.objects.filter(paid_condition()))
+
+        self.stdout.write(self.style.SUCCESS(f'{rows} ligne(s) de statistiques reconstruite(s)'))
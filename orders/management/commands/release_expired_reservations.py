@@ -0,0 +1,28 @@
+# orders/management/commands/release_expired_reservations.py
+
+from django.core.management.base import BaseCommand
+
+from orders.reservations import recount_reserved_quantities, release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        "Libère par lots les réservations de stock expirées (commandes non payées). "
+        "À planifier toutes les quelques minutes (cron)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument(
+            '--recount',
+            action='store_true',
+            help='Recalculer ensuite Book.reserved_quantity à partir des réservations actives'
+        )
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{released} réservation(s) expirée(s) libérée(s)'))
+
+        if options['recount']:
+            fixed = recount_reserved_quantities()
+            self.stdout.write(self.style.SUCCESS(f'{fixed} livre(s) corrigé(s)'))
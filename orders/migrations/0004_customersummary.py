@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0003_alter_order_stripe_checkout_session_id_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "email",
+                    models.EmailField(
+                        max_length=254, unique=True, verbose_name="Email"
+                    ),
+                ),
+                (
+                    "order_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Commandes"),
+                ),
+                (
+                    "total_spent",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Total dépensé en centimes",
+                        verbose_name="Total dépensé",
+                    ),
+                ),
+                (
+                    "first_order_at",
+                    models.DateTimeField(verbose_name="Première commande"),
+                ),
+                (
+                    "last_order_at",
+                    models.DateTimeField(verbose_name="Dernière commande"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Modifié le"),
+                ),
+                (
+                    "country",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="orders.country",
+                        verbose_name="Pays (dernière commande)",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Client",
+                "verbose_name_plural": "Clients",
+                "db_table": "customer_summaries",
+                "ordering": ["-last_order_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["-last_order_at"], name="customer_last_order_idx"
+                    ),
+                    models.Index(
+                        fields=["-total_spent"], name="customer_total_spent_idx"
+                    ),
+                    models.Index(
+                        fields=["-order_count"], name="customer_order_count_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0004_customersummary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Jour")),
+                (
+                    "orders_count",
+                    models.IntegerField(default=0, verbose_name="Commandes"),
+                ),
+                (
+                    "revenue",
+                    models.IntegerField(
+                        default=0,
+                        help_text="Chiffre d'affaires en centimes",
+                        verbose_name="Chiffre d'affaires",
+                    ),
+                ),
+                (
+                    "pending_count",
+                    models.IntegerField(default=0, verbose_name="En attente"),
+                ),
+                (
+                    "delivered_count",
+                    models.IntegerField(default=0, verbose_name="Livrées"),
+                ),
+                (
+                    "country",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="orders.country",
+                        verbose_name="Pays",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Statistique journalière des commandes",
+                "verbose_name_plural": "Statistiques journalières des commandes",
+                "db_table": "order_daily_stats",
+                "ordering": ["date"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "country"), name="unique_order_daily_stats"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0005_orderdailystats"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="customersummary",
+            name="country",
+            field=models.ForeignKey(
+                blank=True,
+                db_constraint=False,
+                null=True,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="orders.country",
+                verbose_name="Pays (dernière commande)",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="orderdailystats",
+            name="country",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="orders.country",
+                verbose_name="Pays",
+            ),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("books", "0006_book_reserved_quantity"),
+        ("orders", "0006_analytics_database"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockReservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("quantity", models.PositiveIntegerField(verbose_name="Quantité")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("active", "Active"),
+                            ("converted", "Convertie (payée)"),
+                            ("released", "Libérée"),
+                        ],
+                        default="active",
+                        max_length=10,
+                        verbose_name="Statut",
+                    ),
+                ),
+                ("expires_at", models.DateTimeField(verbose_name="Expire le")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Créé le"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Modifié le"),
+                ),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="books.book",
+                        verbose_name="Livre",
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="orders.order",
+                        verbose_name="Commande",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Réservation de stock",
+                "verbose_name_plural": "Réservations de stock",
+                "db_table": "stock_reservations",
+                "ordering": ["expires_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "expires_at"], name="reservation_expiry_idx"
+                    )
+                ],
+            },
+        ),
+    ]
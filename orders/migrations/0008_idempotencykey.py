@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:09
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0007_stockreservation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IdempotencyKey",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("scope", models.CharField(max_length=50, verbose_name="Endpoint")),
+                ("key", models.CharField(max_length=255, verbose_name="Clé")),
+                (
+                    "fingerprint",
+                    models.CharField(
+                        help_text="Empreinte SHA-256 du corps de la requête",
+                        max_length=64,
+                        verbose_name="Empreinte",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("processing", "En cours"), ("completed", "Terminée")],
+                        default="processing",
+                        max_length=10,
+                        verbose_name="Statut",
+                    ),
+                ),
+                (
+                    "response_status",
+                    models.PositiveSmallIntegerField(
+                        blank=True, null=True, verbose_name="Code HTTP"
+                    ),
+                ),
+                (
+                    "response_body",
+                    models.JSONField(
+                        blank=True,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        null=True,
+                        verbose_name="Réponse",
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(db_index=True, verbose_name="Expire le"),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Créé le"),
+                ),
+            ],
+            options={
+                "verbose_name": "Clé d'idempotence",
+                "verbose_name_plural": "Clés d'idempotence",
+                "db_table": "idempotency_keys",
+                "ordering": ["-created_at"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("scope", "key"), name="idempotency_scope_key_unique"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,126 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0008_idempotencykey"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="country",
+            name="shipping_zone",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("france", "France"),
+                    ("europe", "Europe"),
+                    ("world", "Monde"),
+                ],
+                help_text="Grille de frais de port (ShippingRate) utilisée si le pays n'a pas sa propre grille",
+                max_length=20,
+                verbose_name="Zone de livraison",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="country",
+            name="shipping_cost",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Frais de port forfaitaires en centimes, si aucune grille ne s'applique",
+                verbose_name="Frais de port",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ShippingRate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "zone",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("france", "France"),
+                            ("europe", "Europe"),
+                            ("world", "Monde"),
+                        ],
+                        max_length=20,
+                        verbose_name="Zone",
+                    ),
+                ),
+                (
+                    "metric",
+                    models.CharField(
+                        choices=[
+                            ("books", "Nombre de livres"),
+                            ("weight", "Poids total (g)"),
+                            ("thickness", "Épaisseur totale (mm)"),
+                        ],
+                        max_length=10,
+                        verbose_name="Critère",
+                    ),
+                ),
+                (
+                    "max_value",
+                    models.PositiveIntegerField(verbose_name="Jusqu'à (inclus)"),
+                ),
+                (
+                    "price",
+                    models.PositiveIntegerField(
+                        help_text="Prix en centimes", verbose_name="Prix"
+                    ),
+                ),
+                (
+                    "country",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shipping_rates",
+                        to="orders.country",
+                        verbose_name="Pays",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tarif de livraison",
+                "verbose_name_plural": "Tarifs de livraison",
+                "db_table": "shipping_rates",
+                "ordering": ["zone", "country", "metric", "max_value"],
+                "constraints": [
+                    models.CheckConstraint(
+                        condition=models.Q(
+                            models.Q(("country__isnull", False), ("zone", "")),
+                            models.Q(
+                                ("country__isnull", True),
+                                models.Q(("zone", ""), _negated=True),
+                            ),
+                            _connector="OR",
+                        ),
+                        name="shipping_rate_country_xor_zone",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("country__isnull", False)),
+                        fields=("country", "metric", "max_value"),
+                        name="shipping_rate_country_tier_unique",
+                    ),
+                    models.UniqueConstraint(
+                        condition=models.Q(("country__isnull", True)),
+                        fields=("zone", "metric", "max_value"),
+                        name="shipping_rate_zone_tier_unique",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Grilles de frais de port France / Europe (anciennes constantes de
+# orders/shipping.py) et rattachement des pays existants à leur zone
+
+from django.db import migrations
+
+# Tarifs par nombre de livres, en centimes (8 = 8 livres et plus)
+FRANCE_SHIPPING_RATES = {1: 471, 2: 471, 3: 677, 4: 513, 5: 894, 6: 840, 7: 842, 8: 842}
+EUROPE_SHIPPING_RATES = {1: 1048, 2: 1048, 3: 1524, 4: 1524, 5: 2862, 6: 2862, 7: 2862, 8: 2862}
+
+
+def seed_shipping_rates(apps, schema_editor):
+    Country = apps.get_model("orders", "Country")
+    ShippingRate = apps.get_model("orders", "ShippingRate")
+    db_alias = schema_editor.connection.alias
+
+    ShippingRate.objects.using(db_alias).bulk_create([
+        ShippingRate(zone=zone, metric="books", max_value=books, price=price)
+        for zone, rates in (("france", FRANCE_SHIPPING_RATES), ("europe", EUROPE_SHIPPING_RATES))
+        for books, price in rates.items()
+    ])
+    Country.objects.using(db_alias).filter(name="France").update(shipping_zone="france")
+    Country.objects.using(db_alias).filter(name="Europe").update(shipping_zone="europe")
+
+
+def unseed_shipping_rates(apps, schema_editor):
+    ShippingRate = apps.get_model("orders", "ShippingRate")
+    ShippingRate.objects.using(schema_editor.connection.alias).filter(country__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0009_shippingrate"),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_shipping_rates, unseed_shipping_rates),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0010_seed_shipping_rates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="channel",
+            field=models.CharField(
+                choices=[
+                    ("web", "Site web"),
+                    ("marketplace", "Marketplace"),
+                    ("b2b", "B2B"),
+                ],
+                db_index=True,
+                default="web",
+                max_length=20,
+                verbose_name="Canal",
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="external_reference",
+            field=models.CharField(
+                blank=True,
+                help_text="Référence de la commande chez le partenaire (import)",
+                max_length=100,
+                verbose_name="Référence externe",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="order",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("external_reference", ""), _negated=True),
+                fields=("channel", "external_reference"),
+                name="order_channel_reference_unique",
+            ),
+        ),
+    ]
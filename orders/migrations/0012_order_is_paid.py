@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:35
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_paid(apps, schema_editor):
+    """
+    Paiement Stripe réussi : payée à la réception du premier webhook réussi
+    (date de création du paiement à défaut). Import partenaire : payée à la
+    création.
+    """
+    Order = apps.get_model('orders', 'Order')
+    StripePayment = apps.get_model('payments', 'StripePayment')
+
+    succeeded = StripePayment.objects.filter(order=OuterRef('pk'), status='succeeded')
+    first_paid_at = (
+        succeeded.annotate(paid_at=Coalesce('webhook_received_at', 'created_at'))
+        .order_by('paid_at')
+        .values('paid_at')[:1]
+    )
+    Order.objects.filter(Exists(succeeded)).update(is_paid=True, paid_at=Subquery(first_paid_at))
+    Order.objects.filter(~Q(channel='web'), is_paid=False).update(
+        is_paid=True, paid_at=models.F('created_at')
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0011_order_channel"),
+        ("payments", "0004_stripepayment_order_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="is_paid",
+            field=models.BooleanField(default=False, verbose_name="Payée"),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="paid_at",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Payée le"),
+        ),
+        migrations.RunPython(backfill_paid, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["is_paid", "status", "-created_at"],
+                name="order_paid_status_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(fields=["email"], name="order_email_idx"),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0012_order_is_paid"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idempotencykey",
+            name="locked_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Fin du bail de la requête en cours : passé ce délai, une répétition reprend la clé",
+                null=True,
+                verbose_name="Verrouillée jusqu'au",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0013_idempotencykey_locked_until"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="stock_decremented",
+            field=models.BooleanField(
+                default=False,
+                help_text="Stock sorti à la création de la commande, sans réservation",
+                verbose_name="Stock décrémenté",
+            ),
+        ),
+    ]
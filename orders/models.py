@@ -5,15 +5,30 @@
 from django.db import models
 from django.core.validators import EmailValidator
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+
+SHIPPING_ZONE_CHOICES = [
+    ('france', 'France'),
+    ('europe', 'Europe'),
+    ('world', 'Monde'),
+]
+
 
 class Country(models.Model):
     """Pays de livraison"""
     
     name = models.CharField(max_length=255, verbose_name="Nom")
     code = models.CharField(max_length=2, unique=True, verbose_name="Code ISO")
+    shipping_zone = models.CharField(
+        max_length=20,
+        choices=SHIPPING_ZONE_CHOICES,
+        blank=True,
+        help_text="Grille de frais de port (ShippingRate) utilisée si le pays n'a pas sa propre grille",
+        verbose_name="Zone de livraison"
+    )
     shipping_cost = models.PositiveIntegerField(
         default=0, 
-        help_text="Frais de port en centimes",
+        help_text="Frais de port forfaitaires en centimes, si aucune grille ne s'applique",
         verbose_name="Frais de port"
     )
     is_active = models.BooleanField(default=True, verbose_name="Actif")
@@ -32,14 +47,106 @@ class Country(models.Model):
         return self.shipping_cost / 100
 
 
+class ShippingRate(models.Model):
+    """
+    Palier de frais de port d'un pays ou d'une zone : jusqu'à `max_value`
+    (nombre de livres, poids total en grammes ou épaisseur totale en mm), le
+    colis coûte `price`. Le prix retenu est le plus élevé des critères
+    configurés (voir orders/shipping.py).
+    """
+    
+    METRIC_CHOICES = [
+        ('books', 'Nombre de livres'),
+        ('weight', 'Poids total (g)'),
+        ('thickness', 'Épaisseur totale (mm)'),
+    ]
+    
+    country = models.ForeignKey(
+        Country,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='shipping_rates',
+        verbose_name="Pays"
+    )
+    zone = models.CharField(
+        max_length=20,
+        choices=SHIPPING_ZONE_CHOICES,
+        blank=True,
+        verbose_name="Zone"
+    )
+    metric = models.CharField(max_length=10, choices=METRIC_CHOICES, verbose_name="Critère")
+    max_value = models.PositiveIntegerField(verbose_name="Jusqu'à (inclus)")
+    price = models.PositiveIntegerField(help_text="Prix en centimes", verbose_name="Prix")
+    
+    class Meta:
+        db_table = 'shipping_rates'
+        ordering = ['zone', 'country', 'metric', 'max_value']
+        verbose_name = 'Tarif de livraison'
+        verbose_name_plural = 'Tarifs de livraison'
+        constraints = [
+            models.CheckConstraint(
+                condition=(
+                    models.Q(country__isnull=False, zone='')
+                    | (models.Q(country__isnull=True) & ~models.Q(zone=''))
+                ),
+                name='shipping_rate_country_xor_zone'
+            ),
+            models.UniqueConstraint(
+                fields=['country', 'metric', 'max_value'],
+                condition=models.Q(country__isnull=False),
+                name='shipping_rate_country_tier_unique'
+            ),
+            models.UniqueConstraint(
+                fields=['zone', 'metric', 'max_value'],
+                condition=models.Q(country__isnull=True),
+                name='shipping_rate_zone_tier_unique'
+            ),
+        ]
+    
+    def __str__(self):
+        scope = self.country or self.get_zone_display()
+        return f"{scope} - {self.get_metric_display()} ≤ {self.max_value} : {self.price / 100:.2f} €"
+    
+    @property
+    def price_euros(self):
+        return self.price / 100
+
+
 class Order(models.Model):
     """Commande client (sans authentification)"""
     
+    # Colonnes écrites uniquement par un UPDATE conditionnel (orders.stats.mark_paid) :
+    # save() ne les réécrit jamais sur une commande existante, pour ne pas
+    # écraser un paiement reçu entre-temps par webhook
+    ATOMIC_FIELDS = ('is_paid', 'paid_at')
+    
     STATUS_CHOICES = [
         ('pending', 'En attente de livraison'),
         ('delivered', 'Livrée'),
     ]
     
+    CHANNEL_CHOICES = [
+        ('web', 'Site web'),
+        ('marketplace', 'Marketplace'),
+        ('b2b', 'B2B'),
+    ]
+    
+    # Canal de vente (commandes importées : voir orders/imports.py)
+    channel = models.CharField(
+        max_length=20,
+        choices=CHANNEL_CHOICES,
+        default='web',
+        db_index=True,
+        verbose_name="Canal"
+    )
+    external_reference = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="Référence de la commande chez le partenaire (import)",
+        verbose_name="Référence externe"
+    )
+    
     # Informations client (pas de User lié)
     email = models.EmailField(
         validators=[EmailValidator()],
@@ -79,6 +186,18 @@ class Order(models.Model):
         blank=True,
         verbose_name="Stripe Checkout Session ID"
     )
+    # Paiement réussi (webhook Stripe) ou commande importée d'un canal
+    # partenaire : dénormalisé pour filtrer les commandes payées sans
+    # sous-requête sur stripe_payments
+    is_paid = models.BooleanField(default=False, verbose_name="Payée")
+    paid_at = models.DateTimeField(null=True, blank=True, verbose_name="Payée le")
+    # Commandes antérieures aux réservations : stock décrémenté à la création,
+    # rendu par le reaper si elles ne sont jamais payées (voir orders/reaper.py)
+    stock_decremented = models.BooleanField(
+        default=False,
+        help_text="Stock sorti à la création de la commande, sans réservation",
+        verbose_name="Stock décrémenté"
+    )
     
     # Montants en centimes
     subtotal = models.PositiveIntegerField(default=0, verbose_name="Sous-total")
@@ -118,10 +237,31 @@ class Order(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Commande'
         verbose_name_plural = 'Commandes'
+        constraints = [
+            # Un même fichier importé deux fois ne crée pas de doublons
+            models.UniqueConstraint(
+                fields=['channel', 'external_reference'],
+                condition=~models.Q(external_reference=''),
+                name='order_channel_reference_unique'
+            ),
+        ]
+        indexes = [
+            # Liste admin : commandes payées, filtrées par statut, triées par date
+            models.Index(fields=['is_paid', 'status', '-created_at'], name='order_paid_status_created_idx'),
+            models.Index(fields=['email'], name='order_email_idx'),
+        ]
     
     def __str__(self):
         return f"Commande #{self.id} - {self.email}"
     
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.ATOMIC_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
     @property
     def total_euros(self):
         return self.total / 100
@@ -184,7 +324,7 @@ class OrderItem(models.Model):
         if self.book:
             self.book_title = self.book.titre
             if not self.unit_price:
-                self.unit_price = self.book.prix
+                self.unit_price = self.book.prix_courant
         super().save(*args, **kwargs)
     
     @property
@@ -195,3 +335,194 @@ class OrderItem(models.Model):
     def subtotal_euros(self):
         return self.subtotal / 100
 
+
+
+class StockReservation(models.Model):
+    """
+    Réservation temporaire de stock pour une commande en attente de paiement.
+    Convertie en décrémentation définitive par le webhook de paiement, ou
+    libérée à expiration (manage.py release_expired_reservations).
+    """
+    
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('converted', 'Convertie (payée)'),
+        ('released', 'Libérée'),
+    ]
+    
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name='reservations',
+        verbose_name="Commande"
+    )
+    book = models.ForeignKey(
+        'books.Book',
+        on_delete=models.CASCADE,
+        related_name='reservations',
+        verbose_name="Livre"
+    )
+    quantity = models.PositiveIntegerField(verbose_name="Quantité")
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='active',
+        verbose_name="Statut"
+    )
+    expires_at = models.DateTimeField(verbose_name="Expire le")
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
+    
+    class Meta:
+        db_table = 'stock_reservations'
+        ordering = ['expires_at']
+        verbose_name = 'Réservation de stock'
+        verbose_name_plural = 'Réservations de stock'
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='reservation_expiry_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.quantity}x livre {self.book_id} - commande #{self.order_id} ({self.status})"
+
+
+
+class IdempotencyKey(models.Model):
+    """
+    Clé `Idempotency-Key` envoyée par un client sur une requête POST
+    (création de commande, session de paiement) et réponse enregistrée,
+    rejouée pour les répétitions de la même requête (voir orders/idempotency.py)
+    """
+    
+    STATUS_CHOICES = [
+        ('processing', 'En cours'),
+        ('completed', 'Terminée'),
+    ]
+    
+    scope = models.CharField(max_length=50, verbose_name="Endpoint")
+    key = models.CharField(max_length=255, verbose_name="Clé")
+    fingerprint = models.CharField(
+        max_length=64,
+        help_text="Empreinte SHA-256 du corps de la requête",
+        verbose_name="Empreinte"
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default='processing',
+        verbose_name="Statut"
+    )
+    response_status = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Code HTTP")
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder, verbose_name="Réponse")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Expire le")
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Fin du bail de la requête en cours : passé ce délai, une répétition reprend la clé",
+        verbose_name="Verrouillée jusqu'au"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+    
+    class Meta:
+        db_table = 'idempotency_keys'
+        ordering = ['-created_at']
+        verbose_name = "Clé d'idempotence"
+        verbose_name_plural = "Clés d'idempotence"
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='idempotency_scope_key_unique'),
+        ]
+    
+    def __str__(self):
+        return f"{self.scope} {self.key} ({self.status})"
+
+
+class CustomerSummary(models.Model):
+    """Agrégat par client (email) des commandes payées"""
+    
+    email = models.EmailField(unique=True, verbose_name="Email")
+    country = models.ForeignKey(
+        Country,
+        # Table de la base analytics : pas de contrainte SQL ni de cascade
+        # vers la base principale (voir zoonova/db_routers.py)
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Pays (dernière commande)"
+    )
+    
+    order_count = models.PositiveIntegerField(default=0, verbose_name="Commandes")
+    total_spent = models.PositiveIntegerField(
+        default=0,
+        help_text="Total dépensé en centimes",
+        verbose_name="Total dépensé"
+    )
+    first_order_at = models.DateTimeField(verbose_name="Première commande")
+    last_order_at = models.DateTimeField(verbose_name="Dernière commande")
+    
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
+    
+    class Meta:
+        db_table = 'customer_summaries'
+        ordering = ['-last_order_at']
+        verbose_name = 'Client'
+        verbose_name_plural = 'Clients'
+        indexes = [
+            models.Index(fields=['-last_order_at'], name='customer_last_order_idx'),
+            models.Index(fields=['-total_spent'], name='customer_total_spent_idx'),
+            models.Index(fields=['-order_count'], name='customer_order_count_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.email} - {self.order_count} commande(s)"
+    
+    @property
+    def total_spent_euros(self):
+        return self.total_spent / 100
+    
+    @property
+    def is_repeat(self):
+        return self.order_count > 1
+
+
+class OrderDailyStats(models.Model):
+    """
+    Agrégat journalier des commandes payées, par pays.
+    Les compteurs sont alimentés par deltas (+/-) : ils sont signés pour que
+    l'upsert d'un delta négatif ne soit pas rejeté par une contrainte CHECK.
+    """
+    
+    date = models.DateField(verbose_name="Jour")
+    country = models.ForeignKey(
+        Country,
+        # Table de la base analytics : pas de contrainte SQL ni de cascade
+        # vers la base principale (voir zoonova/db_routers.py)
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name="Pays"
+    )
+    
+    orders_count = models.IntegerField(default=0, verbose_name="Commandes")
+    revenue = models.IntegerField(
+        default=0,
+        help_text="Chiffre d'affaires en centimes",
+        verbose_name="Chiffre d'affaires"
+    )
+    pending_count = models.IntegerField(default=0, verbose_name="En attente")
+    delivered_count = models.IntegerField(default=0, verbose_name="Livrées")
+    
+    class Meta:
+        db_table = 'order_daily_stats'
+        ordering = ['date']
+        verbose_name = 'Statistique journalière des commandes'
+        verbose_name_plural = 'Statistiques journalières des commandes'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'country'], name='unique_order_daily_stats'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} - {self.country_id}: {self.orders_count} commande(s)"
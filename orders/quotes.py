@@ -0,0 +1,96 @@
+# ============================================
+# ORDERS - Devis de panier (prix, frais de port, disponibilité)
+# ============================================
+#
+# Appelé à chaque modification du panier : aucune écriture, une seule requête
+# pour les livres, les pays actifs viennent du cache (données de référence).
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .shipping import calculate_shipping_cost, parcel_metrics
+
+COUNTRIES_CACHE_KEY = 'orders:active_countries'
+
+
+def active_countries():
+    """
+    Pays de livraison actifs {id: {'id', 'name', 'code'}}, mis en cache
+    REFERENCE_DATA_CACHE_SECONDS. Le cache est invalidé à chaque
+    enregistrement d'un pays (orders/signals.py).
+    """
+    from .models import Country
+
+    countries = cache.get(COUNTRIES_CACHE_KEY)
+    if countries is None:
+        countries = {
+            country['id']: country
+            for country in Country.objects.filter(is_active=True).values('id', 'name', 'code')
+        }
+        cache.set(COUNTRIES_CACHE_KEY, countries, settings.REFERENCE_DATA_CACHE_SECONDS)
+    return countries
+
+
+def invalidate_countries():
+    cache.delete(COUNTRIES_CACHE_KEY)
+
+
+def quote_books(book_ids):
+    """Charge en une requête les livres d'un panier, avec leur stock effectif"""
+    from books.models import Book
+
+    return (
+        Book.objects.with_stock()
+        .only('id', 'titre', 'prix_courant', 'quantites', 'reserved_quantity', 'poids_grammes', 'epaisseur_cm')
+        .in_bulk(book_ids)
+    )
+
+
+def build_quote(items, country, books):
+    """
+    Calcule le devis d'un panier sans rien créer.
+
+    Args:
+        items (list): [{'book_id': int, 'quantity': int}], livres déjà validés
+        country (dict): pays issu de active_countries()
+        books (dict): {id: Book} issu de quote_books()
+
+    Returns:
+        dict: lignes, sous-total, frais de port et total (centimes), disponibilité
+    """
+    requested = {}
+    for item in items:
+        requested[item['book_id']] = requested.get(item['book_id'], 0) + item['quantity']
+
+    lines = []
+    subtotal = 0
+    for item in items:
+        book = books[item['book_id']]
+        line_total = book.prix_courant * item['quantity']
+        subtotal += line_total
+        lines.append({
+            'book_id': book.id,
+            'titre': book.titre,
+            'unit_price': book.prix_courant,
+            'quantity': item['quantity'],
+            'subtotal': line_total,
+            'available_quantity': book.available_quantity,
+            'available': requested[book.id] <= book.available_quantity,
+        })
+
+    book_count, weight, thickness = parcel_metrics(
+        (books[book_id], quantity) for book_id, quantity in requested.items()
+    )
+    shipping_cost = calculate_shipping_cost(country['id'], book_count, weight, thickness)
+    total = subtotal + shipping_cost
+
+    return {
+        'country': country,
+        'items': lines,
+        'book_count': book_count,
+        'subtotal': subtotal,
+        'shipping_cost': shipping_cost,
+        'total': total,
+        'total_euros': total / 100,
+        'available': all(line['available'] for line in lines),
+    }
@@ -0,0 +1,161 @@
+# ============================================
+# ORDERS - Purge des commandes jamais payées
+# ============================================
+#
+# Une commande toujours non payée (`Order.is_paid`) après UNPAID_ORDER_MAX_AGE_HOURS
+# est abandonnée : son stock est rendu à la vente puis elle est supprimée (et
+# éventuellement archivée en JSON Lines), par lots.
+# - réservations actives        -> libérées (un seul UPDATE par lot)
+# - stock décrémenté à la création (`Order.stock_decremented`, commandes
+#   antérieures aux réservations, marquées explicitement) -> mouvement
+#   d'inventaire `cancellation`
+#   (books/inventory.py)
+# Les commandes sans réservation ni stock décrémenté (ex: saisies dans
+# l'admin) sont supprimées sans toucher au stock. L'archive n'est écrite
+# qu'après le commit de la suppression.
+
+import json
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def unpaid_orders(max_age_hours=None, now=None):
+    """Commandes en attente, sans paiement réussi, créées il y a plus de max_age_hours"""
+    from .models import Order
+    from .stats import paid_condition
+
+    max_age_hours = settings.UNPAID_ORDER_MAX_AGE_HOURS if max_age_hours is None else max_age_hours
+    cutoff = (now or timezone.now()) - timedelta(hours=max_age_hours)
+    return Order.objects.filter(status='pending', created_at__lt=cutoff).exclude(paid_condition())
+
+
+def _archive_lines(orders, items):
+    """Une ligne JSON par commande, avec ses articles"""
+    items_by_order = {}
+    for item in items:
+        items_by_order.setdefault(item['order_id'], []).append(item)
+    lines = []
+    for order in orders:
+        order['items'] = items_by_order.get(order['id'], [])
+        lines.append(json.dumps(order, cls=DjangoJSONEncoder) + '\n')
+    return lines
+
+
+def _reap_batch(order_ids, report, dry_run=False, archive=None):
+    """Rend le stock d'un lot de commandes puis les supprime (dans une transaction)"""
+    from books.inventory import record_movements
+    from books.models import InventoryMovement
+    from .models import Order, OrderItem, StockReservation
+    from .reservations import release_reservations
+
+    with transaction.atomic():
+        # Verrouiller les commandes et revérifier qu'elles sont toujours impayées
+        # (un webhook a pu arriver depuis la sélection du lot)
+        orders = unpaid_orders(max_age_hours=0).filter(id__in=order_ids)
+        order_ids = list(orders.select_for_update(skip_locked=True).values_list('id', flat=True))
+        if not order_ids:
+            return
+
+        items = list(
+            OrderItem.objects.filter(order_id__in=order_ids)
+            .values('order_id', 'book_id', 'book_title', 'unit_price', 'quantity')
+        )
+        reservations = StockReservation.objects.filter(order_id__in=order_ids)
+        decremented = set(orders.filter(stock_decremented=True).values_list('id', flat=True))
+
+        # Seul le stock réellement sorti à la création est rendu
+        restocked = Counter()
+        for item in items:
+            if item['order_id'] in decremented:
+                restocked[(item['order_id'], item['book_id'])] += item['quantity']
+
+        report['orders'] += len(order_ids)
+        report['items'] += len(items)
+        report['units_restocked'] += sum(restocked.values())
+        active_units = sum(reservations.filter(status='active').values_list('quantity', flat=True))
+        if dry_run:
+            report['units_released'] += active_units
+            return
+
+        report['reservations_released'] += release_reservations(reservations)
+        # Réservations verrouillées par un autre traitement (webhook en cours) :
+        # ignorées par release_reservations, leurs commandes sont gardées pour
+        # le prochain passage (la suppression effacerait les réservations sans
+        # rendre le stock)
+        still_active = list(
+            StockReservation.objects.filter(order_id__in=order_ids, status='active')
+            .values_list('order_id', 'quantity')
+        )
+        report['units_released'] += active_units - sum(quantity for _, quantity in still_active)
+        locked = {order_id for order_id, _ in still_active}
+        if locked:
+            kept_items = [item for item in items if item['order_id'] in locked]
+            order_ids = [order_id for order_id in order_ids if order_id not in locked]
+            items = [item for item in items if item['order_id'] not in locked]
+            report['orders'] -= len(locked)
+            report['items'] -= len(kept_items)
+            report['units_restocked'] -= sum(
+                quantity for (order_id, _), quantity in restocked.items() if order_id in locked
+            )
+            restocked = Counter({
+                (order_id, book_id): quantity
+                for (order_id, book_id), quantity in restocked.items() if order_id not in locked
+            })
+            logger.info(f"{len(locked)} commande(s) aux réservations verrouillées reportée(s) au prochain passage")
+
+        record_movements([
+            InventoryMovement(
+                book_id=book_id,
+                delta=quantity,
+                reason='cancellation',
+                note=f"Commande #{order_id} non payée"
+            )
+            for (order_id, book_id), quantity in restocked.items()
+        ])
+
+        if archive is not None:
+            lines = _archive_lines(Order.objects.filter(id__in=order_ids).order_by('id').values(), items)
+            transaction.on_commit(lambda: archive.writelines(lines))
+
+        Order.objects.filter(id__in=order_ids).delete()
+
+
+def reap_unpaid_orders(max_age_hours=None, batch_size=None, dry_run=False, archive=None):
+    """
+    Rend le stock des commandes abandonnées puis les supprime, par lots.
+
+    Args:
+        archive: fichier texte ouvert, reçoit une ligne JSON par commande supprimée
+        dry_run: compte seulement ce qui serait récupéré, sans rien modifier
+
+    Returns:
+        dict: orders, items, units_released, units_restocked, reservations_released
+    """
+    batch_size = batch_size or settings.UNPAID_ORDER_REAP_BATCH_SIZE
+    candidates = unpaid_orders(max_age_hours)
+    report = Counter(orders=0, items=0, units_released=0, units_restocked=0, reservations_released=0)
+
+    last_id = 0
+    while True:
+        order_ids = list(
+            candidates.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not order_ids:
+            break
+        _reap_batch(order_ids, report, dry_run=dry_run, archive=archive)
+        last_id = order_ids[-1]
+
+    if not dry_run and report['orders']:
+        logger.info(
+            f"{report['orders']} commande(s) non payée(s) supprimée(s), "
+            f"{report['units_released'] + report['units_restocked']} exemplaire(s) rendu(s) à la vente"
+        )
+    return dict(report)
@@ -0,0 +1,286 @@
+# ============================================
+# ORDERS - Réservations de stock (commandes en attente de paiement)
+# ============================================
+#
+# Une commande réserve son stock à la création (Book.reserved_quantity) au
+# lieu de le décrémenter. Le stock vendable est le stock effectif (voir
+# books/inventory.py) moins `reserved_quantity`.
+# - paiement reçu   -> convert_reservations : mouvement de sortie de stock,
+#                      compteurs de ventes et de tendance des livres
+# - délai dépassé   -> release_expired_reservations : stock rendu à la vente
+#
+# Book.reserved_quantity est la somme des réservations actives, tenue à jour
+# dans la même transaction que chaque changement de statut d'une réservation
+# (recount_reserved_quantities la recalcule en cas de doute).
+
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, FloatField, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def reservation_expiry(minutes=None):
+    """Date d'expiration d'une réservation créée ou prolongée maintenant"""
+    minutes = settings.STOCK_RESERVATION_TTL_MINUTES if minutes is None else minutes
+    return timezone.now() + timedelta(minutes=minutes)
+
+
+def create_reservations(order, quantities, expires_at=None):
+    """
+    Enregistre les réservations d'une commande ({book_id: quantité}).
+    Book.reserved_quantity doit avoir été incrémenté par l'appelant, dans la
+    même transaction (UPDATE conditionnel sur le stock vendable).
+    """
+    from .models import StockReservation
+
+    expires_at = expires_at or reservation_expiry()
+    StockReservation.objects.bulk_create([
+        StockReservation(order=order, book_id=book_id, quantity=quantity, expires_at=expires_at)
+        for book_id, quantity in sorted(quantities.items())
+    ])
+
+
+def _unreserve(quantities):
+    """
+    Retire des quantités ({book_id: quantité}) de Book.reserved_quantity en un
+    seul UPDATE, après avoir verrouillé les livres dans l'ordre des identifiants
+    (même ordre que la création de commande : pas d'interblocage)
+    """
+    from books.models import Book
+
+    book_ids = sorted(book_id for book_id, quantity in quantities.items() if quantity)
+    if not book_ids:
+        return
+    released = Case(
+        *[When(pk=book_id, then=Value(quantities[book_id])) for book_id in book_ids],
+        output_field=IntegerField()
+    )
+    list(Book.objects.select_for_update().filter(pk__in=book_ids).order_by('pk').values_list('pk'))
+    Book.objects.filter(pk__in=book_ids).update(
+        reserved_quantity=Greatest(F('reserved_quantity') - released, 0)
+    )
+
+
+def release_reservations(reservations):
+    """
+    Libère les réservations actives d'un queryset et rend le stock à la vente.
+    Les lignes verrouillées par un autre traitement (webhook en cours) sont
+    ignorées : elles seront reprises au prochain passage.
+
+    Returns:
+        int: nombre de réservations libérées
+    """
+    from books.notifications import queue_stock_notifications
+    from .models import StockReservation
+
+    with transaction.atomic():
+        rows = list(
+            reservations
+            .filter(status='active')
+            .select_for_update(skip_locked=True)
+            .values_list('id', 'book_id', 'quantity')
+        )
+        if not rows:
+            return 0
+
+        StockReservation.objects.filter(
+            id__in=[reservation_id for reservation_id, _, _ in rows],
+            status='active'
+        ).update(status='released', updated_at=timezone.now())
+
+        quantities = Counter()
+        for _, book_id, quantity in rows:
+            quantities[book_id] += quantity
+        _unreserve(quantities)
+        # Stock rendu à la vente : alertes de retour en stock
+        queue_stock_notifications(quantities)
+
+    return len(rows)
+
+
+def release_order_reservations(orders):
+    """Libère les réservations actives de commandes (ex: avant suppression)"""
+    from .models import StockReservation
+
+    return release_reservations(StockReservation.objects.filter(order__in=orders))
+
+
+def release_expired_reservations(batch_size=None, now=None):
+    """
+    Libère par lots toutes les réservations actives expirées.
+
+    Returns:
+        int: nombre de réservations libérées
+    """
+    from .models import StockReservation
+
+    batch_size = batch_size or settings.STOCK_RESERVATION_SWEEP_BATCH_SIZE
+    now = now or timezone.now()
+    # Commande payée : ses réservations sont converties par le webhook, jamais libérées
+    expired = StockReservation.objects.filter(status='active', expires_at__lte=now).exclude(order__is_paid=True)
+
+    released = 0
+    last_id = 0
+    while True:
+        ids = list(
+            expired.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return released
+        released += release_reservations(StockReservation.objects.filter(id__in=ids))
+        last_id = ids[-1]
+
+
+def renew_reservations(order, expires_at=None):
+    """
+    Prolonge les réservations d'une commande (ex: ouverture d'une session de
+    paiement). Si elles ont déjà expiré, le stock est réservé à nouveau.
+
+    Raises:
+        StockConflict: le stock n'est plus disponible
+    """
+    from books.models import Book
+    from .exceptions import StockConflict
+    from .models import StockReservation
+
+    expires_at = expires_at or reservation_expiry()
+
+    with transaction.atomic():
+        reservations = list(
+            StockReservation.objects.select_for_update().filter(order=order).exclude(status='converted')
+        )
+        for reservation in sorted(reservations, key=lambda r: r.book_id):
+            if reservation.status == 'released':
+                updated = Book.objects.with_stock().filter(
+                    pk=reservation.book_id,
+                    effective_stock__gte=F('reserved_quantity') + reservation.quantity
+                ).update(reserved_quantity=F('reserved_quantity') + reservation.quantity)
+                if not updated:
+                    raise StockConflict(
+                        f"Stock insuffisant pour le livre {reservation.book_id}, la commande doit être refaite"
+                    )
+
+        StockReservation.objects.filter(
+            id__in=[reservation.id for reservation in reservations]
+        ).update(status='active', expires_at=expires_at, updated_at=timezone.now())
+
+    return expires_at
+
+
+def _record_sales(order, quantities):
+    """
+    Comptabilise les ventes d'une commande payée : compteurs de ventes et de
+    tendance des livres en un seul UPDATE, statistiques journalières après commit
+    """
+    from books.models import Book
+    from books.stats import record_book_sales
+    from books.trending import current_scale, sale_increment
+
+    book_ids = sorted(quantities)
+    scale = current_scale()
+    Book.objects.filter(pk__in=book_ids).update(
+        sales_count=F('sales_count') + Case(
+            *[When(pk=book_id, then=Value(quantities[book_id])) for book_id in book_ids],
+            output_field=IntegerField()
+        ),
+        trending_score=F('trending_score') + Case(
+            *[When(pk=book_id, then=Value(sale_increment(quantities[book_id], scale=scale))) for book_id in book_ids],
+            output_field=FloatField()
+        )
+    )
+    sales = list(order.items.values_list('book_id', 'quantity', 'unit_price'))
+    transaction.on_commit(lambda: record_book_sales(sales))
+
+
+def convert_reservations(order):
+    """
+    Transforme les réservations d'une commande payée en mouvements de sortie
+    de stock (journal d'inventaire) et comptabilise ses ventes. Une réservation
+    déjà libérée (paiement reçu après expiration) est d'abord réservée à
+    nouveau, sous condition de stock vendable.
+
+    Raises:
+        StockConflict: stock revendu entre-temps, rien n'est converti (la
+            commande payée doit être traitée à la main : réassort ou remboursement)
+    """
+    from books.models import Book, InventoryMovement
+    from books.inventory import record_movements
+    from .exceptions import StockConflict
+    from .models import StockReservation
+
+    with transaction.atomic():
+        reservations = list(
+            StockReservation.objects.select_for_update().filter(order=order).exclude(status='converted')
+        )
+        if not reservations:
+            return 0
+
+        active = Counter()
+        for reservation in sorted(reservations, key=lambda r: r.book_id):
+            if reservation.status == 'released':
+                updated = Book.objects.with_stock().filter(
+                    pk=reservation.book_id,
+                    effective_stock__gte=F('reserved_quantity') + reservation.quantity
+                ).update(reserved_quantity=F('reserved_quantity') + reservation.quantity)
+                if not updated:
+                    raise StockConflict(
+                        f"Paiement reçu après expiration de la réservation {reservation.id} "
+                        f"(commande #{order.id}) : stock insuffisant pour le livre {reservation.book_id}"
+                    )
+            active[reservation.book_id] += reservation.quantity
+
+        record_movements([
+            InventoryMovement(
+                book_id=reservation.book_id,
+                delta=-reservation.quantity,
+                reason='sale',
+                order=order
+            )
+            for reservation in sorted(reservations, key=lambda r: r.book_id)
+        ])
+        _unreserve(active)
+
+        StockReservation.objects.filter(
+            id__in=[reservation.id for reservation in reservations]
+        ).update(status='converted', updated_at=timezone.now())
+
+        sold = Counter()
+        for reservation in reservations:
+            sold[reservation.book_id] += reservation.quantity
+        _record_sales(order, sold)
+
+    return len(reservations)
+
+
+def recount_reserved_quantities():
+    """
+    Recalcule Book.reserved_quantity à partir des réservations actives
+    (réparation du cache).
+
+    Returns:
+        int: nombre de livres corrigés
+    """
+    from books.models import Book
+    from .models import StockReservation
+
+    fixed = 0
+    with transaction.atomic():
+        reserved = dict(
+            StockReservation.objects.filter(status='active')
+            .values('book_id').annotate(total=Sum('quantity'))
+            .values_list('book_id', 'total')
+        )
+        books = Book.objects.filter(reserved_quantity__gt=0) | Book.objects.filter(pk__in=reserved)
+        for book_id, current in books.values_list('id', 'reserved_quantity'):
+            expected = reserved.get(book_id, 0)
+            if current != expected:
+                Book.objects.filter(pk=book_id).update(reserved_quantity=expected)
+                fixed += 1
+    return fixed
@@ -2,8 +2,13 @@
 # 4. APP ORDERS - Serializers Commandes
 # ============================================
 
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
 from rest_framework import serializers
-from .models import Order, OrderItem, Country
+from .models import Order, OrderItem, Country, CustomerSummary
+from .exceptions import StockConflict
 
 
 class CountrySerializer(serializers.ModelSerializer):
@@ -18,7 +23,7 @@ class CountrySerializer(serializers.ModelSerializer):
     class Meta:
         model = Country
         fields = [
-            'id', 'name', 'code',
+            'id', 'name', 'code', 'shipping_zone',
             'shipping_cost', 'shipping_cost_euros',
             'is_active'
         ]
@@ -59,7 +64,8 @@ class OrderListSerializer(serializers.ModelSerializer):
     )
     full_name = serializers.CharField(read_only=True)
     country_name = serializers.CharField(source='country.name', read_only=True)
-    items_count = serializers.SerializerMethodField()
+    # Annoté par OrderViewSet.get_queryset (Count('items'))
+    items_count = serializers.IntegerField(read_only=True)
     status_display = serializers.CharField(
         source='get_status_display',
         read_only=True
@@ -71,12 +77,8 @@ class OrderListSerializer(serializers.ModelSerializer):
             'id', 'email', 'full_name', 'first_name', 'last_name',
             'country_name', 'total', 'total_euros',
             'status', 'status_display', 'items_count',
-            'tracking_number', 'created_at'
+            'channel', 'tracking_number', 'created_at'
         ]
-    
-    def get_items_count(self, obj):
-        """Nombre d'articles dans la commande"""
-        return obj.items.count()
 
 
 class OrderDetailSerializer(serializers.ModelSerializer):
@@ -102,7 +104,8 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             'id', 'email', 'first_name', 'last_name', 'full_name',
             'phone', 'voie', 'numero_voie', 'complement_adresse',
             'code_postal', 'ville', 'country', 'full_address',
-            'stripe_payment_intent_id', 'stripe_checkout_session_id',
+            'channel', 'external_reference',
+            'stripe_payment_intent_id', 'stripe_checkout_session_id', 'paid_at',
             'subtotal', 'shipping_cost', 'total', 'total_euros',
             'status', 'status_display', 'tracking_number',
             'delivered_at', 'notes', 'items',
@@ -110,17 +113,22 @@ class OrderDetailSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = [
             'id', 'full_name', 'full_address', 'total_euros',
+            'channel', 'external_reference', 'paid_at',
             'created_at', 'updated_at'
         ]
 
 
+class OrderCreateItemSerializer(serializers.Serializer):
+    """Article d'une commande à créer"""
+    
+    book_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
 class OrderCreateSerializer(serializers.ModelSerializer):
     """Serializer pour création de commande"""
     
-    items = serializers.ListField(
-        child=serializers.DictField(),
-        write_only=True
-    )
+    items = OrderCreateItemSerializer(many=True, write_only=True)
     
     class Meta:
         model = Order
@@ -132,83 +140,167 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         ]
     
     def validate_items(self, value):
-        """Valide les articles de la commande"""
+        """
+        Valide les articles de la commande.
+        Les livres sont chargés en une seule requête et conservés pour create().
+        """
         if not value:
             raise serializers.ValidationError("La commande doit contenir au moins un article")
         
         from books.models import Book
         
+        self._books = Book.objects.with_stock().in_bulk([item['book_id'] for item in value])
+        
+        quantities = Counter()
         for item in value:
-            if 'book_id' not in item or 'quantity' not in item:
+            book = self._books.get(item['book_id'])
+            if book is None:
                 raise serializers.ValidationError(
-                    "Chaque article doit avoir book_id et quantity"
+                    f"Livre {item['book_id']} introuvable"
                 )
-            
-            try:
-                book = Book.objects.get(id=item['book_id'])
-                if item['quantity'] > book.quantites:
-                    raise serializers.ValidationError(
-                        f"Stock insuffisant pour {book.titre}"
-                    )
-            except Book.DoesNotExist:
+            quantities[book.id] += item['quantity']
+            if quantities[book.id] > book.available_quantity:
                 raise serializers.ValidationError(
-                    f"Livre {item['book_id']} introuvable"
+                    f"Stock insuffisant pour {book.titre}"
                 )
         
         return value
     
     def create(self, validated_data):
-        """Crée la commande avec ses articles"""
+        """
+        Crée la commande avec ses articles, en un nombre de requêtes
+        indépendant de la taille du panier
+        """
         from books.models import Book
-        from orders.shipping import calculate_shipping_cost, count_total_books
+        from orders.shipping import calculate_shipping_cost, parcel_metrics
+        from orders.reservations import create_reservations
         
         items_data = validated_data.pop('items')
         country = validated_data['country']
         
+        books = getattr(self, '_books', None)
+        if books is None:
+            books = Book.objects.in_bulk([item_data['book_id'] for item_data in items_data])
+        
         # Calculer les montants
         subtotal = 0
         order_items = []
+        quantities = Counter()
         
         for item_data in items_data:
-            book = Book.objects.get(id=item_data['book_id'])
+            book = books[item_data['book_id']]
             quantity = item_data['quantity']
-            unit_price = book.prix
+            unit_price = book.prix_courant
             subtotal += unit_price * quantity
+            quantities[book.id] += quantity
             
-            order_items.append({
-                'book': book,
-                'book_title': book.titre,
-                'unit_price': unit_price,
-                'quantity': quantity
-            })
-        
-        # Calculer les frais de port basés sur le nombre de livres et le pays
-        total_books = count_total_books(order_items)
-        shipping_cost = calculate_shipping_cost(country.name, total_books)
+            order_items.append(OrderItem(
+                book=book,
+                book_title=book.titre,
+                unit_price=unit_price,
+                quantity=quantity
+            ))
+        
+        # Calculer les frais de port (nombre de livres, poids et épaisseur du colis)
+        shipping_cost = calculate_shipping_cost(
+            country.id,
+            *parcel_metrics((books[book_id], quantity) for book_id, quantity in quantities.items())
+        )
         total = subtotal + shipping_cost
         
-        # Créer la commande
-        order = Order.objects.create(
-            **validated_data,
-            subtotal=subtotal,
-            shipping_cost=shipping_cost,
-            total=total
+        book_ids = sorted(quantities)
+        reserved = Case(
+            *[When(pk=book_id, then=Value(quantities[book_id])) for book_id in book_ids],
+            output_field=PositiveIntegerField()
         )
         
-        # Créer les articles
-        for item_data in order_items:
-            OrderItem.objects.create(order=order, **item_data)
+        with transaction.atomic():
+            # Verrouiller les livres dans l'ordre des identifiants (évite les
+            # interblocages entre commandes concurrentes), puis réserver le
+            # stock de tous les livres en un seul UPDATE conditionnel sur le
+            # stock vendable. La sortie de stock et les compteurs de ventes
+            # sont enregistrés au paiement (convert_reservations).
+            list(Book.objects.select_for_update().filter(pk__in=book_ids).order_by('pk').values_list('pk'))
+            updated = Book.objects.with_stock().filter(
+                pk__in=book_ids,
+                effective_stock__gte=F('reserved_quantity') + reserved
+            ).update(
+                reserved_quantity=F('reserved_quantity') + reserved
+            )
+            if updated != len(book_ids):
+                # Un livre a été épuisé par une autre commande : tout est annulé
+                available = dict(
+                    Book.objects.with_stock().filter(pk__in=book_ids)
+                    .annotate(available=F('effective_stock') - F('reserved_quantity'))
+                    .values_list('pk', 'available')
+                )
+                book_id = next(
+                    book_id for book_id in book_ids
+                    if available.get(book_id, 0) < quantities[book_id]
+                )
+                raise StockConflict(f"Stock insuffisant pour {books[book_id].titre}")
+            
+            # Créer la commande
+            order = Order.objects.create(
+                **validated_data,
+                subtotal=subtotal,
+                shipping_cost=shipping_cost,
+                total=total
+            )
+            
+            # Créer les articles et les réservations de stock
+            for item in order_items:
+                item.order = order
+            OrderItem.objects.bulk_create(order_items)
+            create_reservations(order, quantities)
         
-        # Décrémenter le stock
-        for item_data in order_items:
-            book = item_data['book']
-            book.quantites -= item_data['quantity']
-            book.sales_count += item_data['quantity']
-            book.save()
+        # Articles déjà en mémoire : la réponse et les emails ne les relisent pas
+        order._prefetched_objects_cache = {'items': order_items}
         
         return order
 
 
+class QuoteItemSerializer(serializers.Serializer):
+    """Ligne de panier d'un devis"""
+    
+    book_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class OrderQuoteSerializer(serializers.Serializer):
+    """
+    Serializer pour devis de panier (rien n'est créé).
+    Pays lu dans le cache des données de référence, livres chargés en une seule requête.
+    """
+    
+    country = serializers.IntegerField()
+    items = QuoteItemSerializer(many=True, allow_empty=False)
+    
+    def validate_country(self, value):
+        from .quotes import active_countries
+        
+        country = active_countries().get(value)
+        if country is None:
+            raise serializers.ValidationError("Pays de livraison introuvable")
+        return country
+    
+    def validate_items(self, value):
+        from .quotes import quote_books
+        
+        self._books = quote_books({item['book_id'] for item in value})
+        missing = sorted({item['book_id'] for item in value} - set(self._books))
+        if missing:
+            raise serializers.ValidationError(
+                f"Livre {', '.join(map(str, missing))} introuvable"
+            )
+        return value
+    
+    def quote(self):
+        from .quotes import build_quote
+        
+        return build_quote(self.validated_data['items'], self.validated_data['country'], self._books)
+
+
 class OrderUpdateStatusSerializer(serializers.ModelSerializer):
     """Serializer pour mise à jour du statut"""
     
@@ -219,3 +311,75 @@ class OrderUpdateStatusSerializer(serializers.ModelSerializer):
     def validate_status(self, value):
         """Valide le changement de statut"""
         return value
+
+
+class ImportedOrderItemSerializer(serializers.Serializer):
+    """Article d'une commande importée : livre par identifiant ou par code-barres (EAN)"""
+    
+    book_id = serializers.IntegerField(required=False)
+    code_bare = serializers.CharField(required=False, max_length=13)
+    quantity = serializers.IntegerField(min_value=1)
+    unit_price = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        help_text="Prix unitaire en centimes (défaut: prix courant du livre)"
+    )
+    
+    def validate(self, attrs):
+        if 'book_id' not in attrs and 'code_bare' not in attrs:
+            raise serializers.ValidationError("book_id ou code_bare requis")
+        return attrs
+
+
+class ImportedOrderSerializer(serializers.Serializer):
+    """
+    Ligne d'un import de commandes (validation sans accès à la base : pays et
+    livres sont résolus ensuite pour tout le lot, voir orders/imports.py)
+    """
+    
+    external_reference = serializers.CharField(max_length=100)
+    email = serializers.EmailField()
+    first_name = serializers.CharField(max_length=255)
+    last_name = serializers.CharField(max_length=255)
+    phone = serializers.CharField(max_length=20, required=False, allow_blank=True, default='')
+    voie = serializers.CharField(max_length=255)
+    numero_voie = serializers.CharField(max_length=20)
+    complement_adresse = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+    code_postal = serializers.CharField(max_length=20)
+    ville = serializers.CharField(max_length=255)
+    country = serializers.CharField(max_length=2, help_text="Code ISO du pays")
+    shipping_cost = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        help_text="Frais de port facturés en centimes (défaut: grille de frais de port)"
+    )
+    items = ImportedOrderItemSerializer(many=True, allow_empty=False)
+
+
+class OrderImportSerializer(serializers.Serializer):
+    """Serializer pour import de commandes en masse (le détail des lignes est validé par ligne)"""
+    
+    channel = serializers.ChoiceField(
+        choices=[choice for choice in Order.CHANNEL_CHOICES if choice[0] != 'web']
+    )
+    orders = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+
+
+class CustomerSummarySerializer(serializers.ModelSerializer):
+    """Serializer pour l'agrégat clients"""
+    
+    total_spent_euros = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        read_only=True
+    )
+    country_name = serializers.CharField(source='country.name', read_only=True, default=None)
+    is_repeat = serializers.BooleanField(read_only=True)
+    
+    class Meta:
+        model = CustomerSummary
+        fields = [
+            'id', 'email', 'country', 'country_name',
+            'order_count', 'is_repeat', 'total_spent', 'total_spent_euros',
+            'first_order_at', 'last_order_at'
+        ]
@@ -1,67 +1,137 @@
 # ============================================
 # ORDERS - Calcul des frais de port
 # ============================================
+#
+# Les tarifs sont des paliers ShippingRate (par pays, sinon par zone du pays)
+# sur le nombre de livres, le poids total et l'épaisseur totale du colis.
+# La grille complète est chargée une fois par processus dans une table en
+# mémoire (bornes triées, recherche par bisection) : aucun accès à la base
+# pendant le calcul. Elle est rechargée après une modification d'un tarif ou
+# d'un pays (orders/signals.py) et au plus tard après SHIPPING_RATES_TTL_SECONDS
+# (modifications faites depuis un autre processus).
 
-# Tarifs de port par nombre de livres (en euros)
-FRANCE_SHIPPING_RATES = {
-    1: 4.71,
-    2: 4.71,
-    3: 6.77,
-    4: 5.13,
-    5: 8.94,
-    6: 8.40,
-    7: 8.42,
-    8: 8.42,
-}
-
-EUROPE_SHIPPING_RATES = {
-    1: 10.48,
-    2: 10.48,
-    3: 15.24,
-    4: 15.24,
-    5: 28.62,
-    6: 28.62,
-    7: 28.62,
-    8: 28.62,
-}
-
-
-def calculate_shipping_cost(country_name, book_count):
+import math
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+
+class RateTable:
+    """Grille de frais de port en mémoire"""
+
+    def __init__(self, countries, rates):
+        # {country_id: (zone, forfait)}
+        self.countries = {
+            country['id']: (country['shipping_zone'], country['shipping_cost'])
+            for country in countries
+        }
+        # {('country', id) | ('zone', zone): {critère: (bornes triées, prix)}}
+        tiers = defaultdict(lambda: defaultdict(list))
+        for rate in sorted(rates, key=lambda rate: rate['max_value']):
+            scope = ('country', rate['country_id']) if rate['country_id'] else ('zone', rate['zone'])
+            tiers[scope][rate['metric']].append((rate['max_value'], rate['price']))
+        self.tiers = {
+            scope: {
+                metric: ([bound for bound, _ in rows], [price for _, price in rows])
+                for metric, rows in metrics.items()
+            }
+            for scope, metrics in tiers.items()
+        }
+
+    @classmethod
+    def load(cls):
+        from .models import Country, ShippingRate
+
+        return cls(
+            Country.objects.values('id', 'shipping_zone', 'shipping_cost'),
+            ShippingRate.objects.values('country_id', 'zone', 'metric', 'max_value', 'price'),
+        )
+
+    def cost(self, country_id, book_count, weight_grams=0, thickness_mm=0):
+        zone, flat_cost = self.countries.get(country_id, ('', 0))
+        tiers = self.tiers.get(('country', country_id)) or self.tiers.get(('zone', zone))
+        if not tiers:
+            return flat_cost
+
+        values = {'books': book_count, 'weight': weight_grams, 'thickness': thickness_mm}
+        price = 0
+        for metric, (bounds, prices) in tiers.items():
+            # Premier palier dont la borne couvre la valeur ; au-delà du
+            # dernier palier, le tarif du dernier palier s'applique
+            index = min(bisect_left(bounds, values[metric]), len(bounds) - 1)
+            price = max(price, prices[index])
+        return price
+
+
+_rate_table = None
+_loaded_at = 0.0
+
+
+def rate_table():
+    """Grille de frais de port du processus, rechargée si invalidée ou expirée"""
+    global _rate_table, _loaded_at
+
+    if _rate_table is None or time.monotonic() - _loaded_at > settings.SHIPPING_RATES_TTL_SECONDS:
+        _rate_table = RateTable.load()
+        _loaded_at = time.monotonic()
+    return _rate_table
+
+
+def invalidate_rate_table():
+    global _rate_table
+    _rate_table = None
+
+
+def calculate_shipping_cost(country_id, book_count, weight_grams=0, thickness_mm=0):
     """
-    Calcule les frais de port basés sur le pays et le nombre de livres.
-    
+    Calcule les frais de port d'un colis.
+
     Args:
-        country_name (str): "France" ou "Europe"
+        country_id (int): Pays de livraison
         book_count (int): Nombre total de livres commandés
-    
+        weight_grams (int): Poids total du colis
+        thickness_mm (int): Épaisseur totale des livres empilés
+
     Returns:
         int: Frais de port en centimes
     """
-    
-    if country_name == "France":
-        # Pour 8+ livres, utiliser le tarif de 8
-        quantity = min(book_count, 8) if book_count >= 8 else book_count
-        rate = FRANCE_SHIPPING_RATES.get(quantity, FRANCE_SHIPPING_RATES[8])
-        return int(rate * 100)  # Convertir en centimes
-    
-    elif country_name == "Europe":
-        # Pour 8+ livres, utiliser le tarif de 8
-        quantity = min(book_count, 8) if book_count >= 8 else book_count
-        rate = EUROPE_SHIPPING_RATES.get(quantity, EUROPE_SHIPPING_RATES[8])
-        return int(rate * 100)  # Convertir en centimes
-    
-    else:
-        # Pays non supporté
-        return 0
+    table = rate_table()
+    if country_id not in table.countries:
+        # Pays créé depuis un autre processus après le chargement de la grille
+        invalidate_rate_table()
+        table = rate_table()
+    return table.cost(country_id, book_count, weight_grams, thickness_mm)
+
+
+def parcel_metrics(lines):
+    """
+    Calcule les dimensions d'un colis.
+
+    Args:
+        lines (iterable): Couples (Book, quantité)
+
+    Returns:
+        tuple: (nombre de livres, poids total en grammes, épaisseur totale en mm)
+    """
+    book_count = 0
+    weight = 0
+    thickness = 0
+    for book, quantity in lines:
+        book_count += quantity
+        weight += (book.poids_grammes or 0) * quantity
+        thickness += (book.epaisseur_cm or 0) * 10 * quantity
+    return book_count, weight, math.ceil(thickness)
 
 
 def count_total_books(order_items):
     """
     Compte le nombre total de livres dans la commande.
-    
+
     Args:
         order_items (list): Liste des items avec leurs quantités
-        
+
     Returns:
         int: Nombre total de livres
     """
@@ -0,0 +1,22 @@
+# ============================================
+# ORDERS - Invalidation des données de référence en mémoire
+# ============================================
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Country, ShippingRate
+from .quotes import invalidate_countries
+from .shipping import invalidate_rate_table
+
+
+@receiver([post_save, post_delete], sender=Country)
+def country_changed(sender, **kwargs):
+    """Pays actifs des devis et grille de frais de port"""
+    invalidate_countries()
+    invalidate_rate_table()
+
+
+@receiver([post_save, post_delete], sender=ShippingRate)
+def shipping_rate_changed(sender, **kwargs):
+    invalidate_rate_table()
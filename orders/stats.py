@@ -0,0 +1,152 @@
+# ============================================
+# ORDERS - Agrégat journalier des commandes payées
+# ============================================
+
+import logging
+from collections import defaultdict
+
+from django.db import router, transaction
+from django.db.models import Count, Sum, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from zoonova.utils import iter_chunks, upsert_counters
+
+logger = logging.getLogger(__name__)
+
+STATUS_COUNTERS = {
+    'pending': 'pending_count',
+    'delivered': 'delivered_count',
+}
+
+COUNTERS = ['orders_count', 'revenue'] + list(STATUS_COUNTERS.values())
+
+
+def paid_condition():
+    """
+    Condition « commande payée » pour filtrer un queryset de commandes :
+    paiement Stripe réussi, ou commande importée d'un canal partenaire
+    (payée chez le partenaire, voir orders/imports.py). Lit la colonne
+    indexée `Order.is_paid`, posée par `mark_paid`.
+    """
+    return Q(is_paid=True)
+
+
+def is_paid(order):
+    """Vérifie si la commande a un paiement réussi (ou a été importée)"""
+    return order.is_paid
+
+
+def mark_paid(order, paid_at=None):
+    """
+    Passe la commande à l'état payé par un UPDATE conditionnel : parmi
+    plusieurs webhooks simultanés, un seul obtient True.
+
+    Returns:
+        bool: True si la commande vient de passer à l'état payé
+    """
+    from .models import Order
+
+    paid_at = paid_at or timezone.now()
+    updated = Order.objects.filter(pk=order.pk, is_paid=False).update(is_paid=True, paid_at=paid_at)
+    if updated:
+        order.is_paid = True
+        order.paid_at = paid_at
+    return bool(updated)
+
+
+def _apply(orders, sign=1, old_status=None, new_status=None):
+    """
+    Regroupe les commandes par (jour de création, pays) et ajoute les deltas
+    correspondants à OrderDailyStats en une seule requête.
+    
+    - sans statut : ajoute (sign=1) ou retire (sign=-1) les commandes
+    - avec old_status/new_status : déplace les commandes d'un statut à l'autre
+    """
+    from .models import OrderDailyStats
+
+    deltas = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for order in orders:
+        row = deltas[(timezone.localdate(order.created_at), order.country_id)]
+        if old_status is None:
+            row['orders_count'] += sign
+            row['revenue'] += sign * order.total
+            if order.status in STATUS_COUNTERS:
+                row[STATUS_COUNTERS[order.status]] += sign
+        else:
+            if old_status in STATUS_COUNTERS:
+                row[STATUS_COUNTERS[old_status]] -= 1
+            if new_status in STATUS_COUNTERS:
+                row[STATUS_COUNTERS[new_status]] += 1
+
+    try:
+        upsert_counters(OrderDailyStats, ['date', 'country'], [
+            dict(row, date=day, country=country_id)
+            for (day, country_id), row in deltas.items()
+        ])
+    except Exception as e:
+        logger.error(f"Erreur mise à jour des statistiques de commandes: {str(e)}", exc_info=True)
+
+
+def record_order_paid(order):
+    """Ajoute une commande qui vient d'être payée"""
+    _apply([order])
+
+
+def record_orders_paid(orders):
+    """Ajoute un lot de commandes payées (import) en une seule requête"""
+    _apply(orders)
+
+
+def record_orders_removed(orders):
+    """Retire des commandes payées qui vont être supprimées"""
+    _apply(orders, sign=-1)
+
+
+def record_status_change(orders, old_status, new_status):
+    """Déplace des commandes payées d'un statut à un autre"""
+    if old_status != new_status:
+        _apply(orders, old_status=old_status, new_status=new_status)
+
+
+def rebuild_order_stats(paid_orders):
+    """
+    Reconstruit entièrement OrderDailyStats à partir d'un queryset de
+    commandes payées.
+    
+    Returns:
+        int: nombre de lignes (jour, pays) écrites
+    """
+    from .models import OrderDailyStats
+
+    aggregates = {
+        'orders_count': Count('id'),
+        'revenue': Sum('total'),
+    }
+    aggregates.update({
+        counter: Count('id', filter=Q(status=status))
+        for status, counter in STATUS_COUNTERS.items()
+    })
+
+    # Lecture par lots des commandes (base principale)
+    totals = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    for chunk in iter_chunks(paid_orders):
+        rows = (
+            chunk
+            .annotate(day=TruncDate('created_at'))
+            .values('day', 'country_id')
+            .annotate(**aggregates)
+        )
+        for row in rows:
+            total = totals[(row['day'], row['country_id'])]
+            for counter in COUNTERS:
+                total[counter] += row[counter]
+
+    with transaction.atomic(using=router.db_for_write(OrderDailyStats)):
+        OrderDailyStats.objects.all().delete()
+        OrderDailyStats.objects.bulk_create([
+            OrderDailyStats(date=day, country_id=country_id, **total)
+            for (day, country_id), total in totals.items()
+        ], batch_size=1000)
+
+    return len(totals)
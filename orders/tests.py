@@ -1,3 +1,645 @@
-from django.test import TestCase
+# ============================================
+# ORDERS - Tests
+# ============================================
 
-# Create your tests here.
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import Admin
+from books.models import Book, InventoryMovement
+from . import imports
+from .customers import rebuild_customer_summaries, record_paid_order
+from .imports import import_orders
+from .models import Country, CustomerSummary, IdempotencyKey, Order, OrderDailyStats, ShippingRate, StockReservation
+from .reaper import reap_unpaid_orders
+from .reservations import (
+    recount_reserved_quantities,
+    release_expired_reservations,
+    release_order_reservations,
+)
+from .serializers import OrderCreateSerializer
+from .shipping import calculate_shipping_cost
+from .stats import rebuild_order_stats, record_orders_paid, record_orders_removed, record_status_change
+
+
+class OrderAPITestCase(TestCase):
+    """Base des tests : un pays de livraison, un livre et un client API anonyme"""
+
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.country = Country.objects.create(name='France', code='FR', shipping_cost=500, is_active=True)
+        self.book = Book.objects.create(titre='Le Loup', nom='Auteur', description='Album', prix=1500, quantites=3)
+
+    def create_order(self, items, **headers):
+        """POST /api/v1/orders/ avec une adresse valide et les articles `items`"""
+        payload = {
+            'email': 'client@example.com',
+            'first_name': 'Jeanne',
+            'last_name': 'Martin',
+            'voie': 'rue des Lilas',
+            'numero_voie': '12',
+            'code_postal': '75011',
+            'ville': 'Paris',
+            'country': self.country.id,
+            'items': items,
+        }
+        return self.client.post('/api/v1/orders/', payload, format='json', **headers)
+
+    def available(self, book=None):
+        """Stock vendable du livre, relu en base"""
+        return Book.objects.with_stock().get(pk=(book or self.book).pk).available_quantity
+
+
+# --- 1. Réservation atomique du stock ---
+class StockReservationTests(OrderAPITestCase):
+
+    def race_after_validation(self, concurrent):
+        """
+        Exécute `concurrent` une seule fois, juste après la validation des
+        articles de la prochaine commande : le stock a été lu, l'UPDATE
+        conditionnel de create() n'a pas encore eu lieu.
+        """
+        validate_items = OrderCreateSerializer.validate_items
+        pending = [concurrent]
+
+        def validate_then_race(serializer, value):
+            value = validate_items(serializer, value)
+            if pending:
+                pending.pop()()
+            return value
+
+        return mock.patch.object(OrderCreateSerializer, 'validate_items', validate_then_race)
+
+    def test_order_reserves_stock(self):
+        response = self.create_order([{'book_id': self.book.id, 'quantity': 2}])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.reserved_quantity, 2)
+        self.assertEqual(self.book.quantites, 3)
+        self.assertEqual(self.available(), 1)
+
+    def test_insufficient_stock_is_rejected_at_validation(self):
+        response = self.create_order([{'book_id': self.book.id, 'quantity': 4}])
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.reserved_quantity, 0)
+        self.assertFalse(Order.objects.exists())
+
+    def test_conditional_update_rejects_insufficient_stock(self):
+        other = Book.objects.create(titre='Le Renard', nom='Auteur', description='Album', prix=1200, quantites=2)
+
+        def stock_sold_elsewhere():
+            Book.objects.filter(pk=other.pk).update(quantites=1)
+
+        with self.race_after_validation(stock_sold_elsewhere):
+            response = self.create_order([
+                {'book_id': self.book.id, 'quantity': 1},
+                {'book_id': other.id, 'quantity': 2},
+            ])
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+        # Aucune réservation partielle : le premier livre n'est pas réservé non plus
+        self.assertEqual(self.available(), 3)
+        self.assertEqual(self.available(other), 1)
+
+    def test_two_orders_cannot_take_the_last_unit(self):
+        Book.objects.filter(pk=self.book.pk).update(quantites=1)
+        responses = []
+
+        def first_order_completes():
+            responses.append(self.create_order([{'book_id': self.book.id, 'quantity': 1}]))
+
+        # La seconde commande a vu le dernier exemplaire disponible avant que
+        # la première ne le réserve
+        with self.race_after_validation(first_order_completes):
+            second = self.create_order([{'book_id': self.book.id, 'quantity': 1}])
+
+        self.assertEqual(responses[0].status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Order.objects.count(), 1)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.reserved_quantity, 1)
+        self.assertEqual(self.available(), 0)
+
+    def test_database_busy_returns_503(self):
+        with mock.patch('orders.reservations.create_reservations', side_effect=OperationalError('database is locked')):
+            response = self.create_order([{'book_id': self.book.id, 'quantity': 1}])
+
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertFalse(Order.objects.exists())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.reserved_quantity, 0)
+
+
+class ConcurrentCheckoutTests(SimpleTestCase):
+    """
+    Achats réellement simultanés : benchmarks/checkout_stress.py sur une base
+    SQLite jetable (la base de test en mémoire ne supporte pas plusieurs threads)
+    """
+
+    def test_concurrent_orders_never_oversell_nor_fail(self):
+        with tempfile.TemporaryDirectory() as workdir:
+            report_path = os.path.join(workdir, 'report.json')
+            subprocess.run(
+                [
+                    sys.executable, os.path.join('benchmarks', 'checkout_stress.py'),
+                    '--customers', '40', '--workers', '10', '--stock', '10', '--json', report_path,
+                ],
+                cwd=settings.BASE_DIR, capture_output=True, timeout=300
+            )
+            with open(report_path, encoding='utf-8') as report_file:
+                report = json.load(report_file)
+
+        self.assertEqual(report['orders_created'], 10)
+        self.assertEqual(report['database_locked_errors'], 0)
+        self.assertEqual(report['other_errors'], 0, report['sample_errors'])
+        self.assertEqual(set(report['statuses']) - {'201', '400', '409'}, set(), report['statuses'])
+        self.assertEqual(report['stock']['oversold_units'], 0)
+        self.assertEqual(report['stock']['reserved_counter_drift'], 0)
+
+
+# --- 2. Libération des réservations ---
+class ReservationReleaseTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        response = self.create_order([{'book_id': self.book.id, 'quantity': 2}])
+        self.order = Order.objects.get(pk=response.data['order']['id'])
+
+    def assertReleased(self):
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.reserved_quantity, 0)
+        self.assertEqual(self.available(), 3)
+        self.assertEqual(recount_reserved_quantities(), 0)
+
+    def test_release_order_reservations_restores_stock(self):
+        self.assertEqual(release_order_reservations(Order.objects.filter(pk=self.order.pk)), 1)
+
+        self.assertReleased()
+        self.assertEqual(StockReservation.objects.get().status, 'released')
+        # Déjà libérée : rien n'est rendu deux fois
+        self.assertEqual(release_order_reservations(Order.objects.filter(pk=self.order.pk)), 0)
+        self.assertReleased()
+
+    def test_expired_reservations_are_released(self):
+        self.assertEqual(release_expired_reservations(), 0)
+
+        released = release_expired_reservations(now=timezone.now() + timedelta(days=1))
+
+        self.assertEqual(released, 1)
+        self.assertReleased()
+
+    def test_reaper_releases_reservations_of_unpaid_orders(self):
+        Order.objects.filter(pk=self.order.pk).update(created_at=timezone.now() - timedelta(days=30))
+
+        report = reap_unpaid_orders()
+
+        self.assertEqual(report['orders'], 1)
+        self.assertEqual(report['units_released'], 2)
+        self.assertEqual(report['units_restocked'], 0)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertReleased()
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.quantites, 3)
+
+    def test_reaper_restocks_only_orders_flagged_as_decremented(self):
+        # Commande antérieure aux réservations, marquée à la main
+        release_order_reservations(Order.objects.filter(pk=self.order.pk))
+        Order.objects.filter(pk=self.order.pk).update(
+            stock_decremented=True, created_at=timezone.now() - timedelta(days=30)
+        )
+
+        report = reap_unpaid_orders()
+
+        self.assertEqual((report['orders'], report['units_restocked']), (1, 2))
+        movement = InventoryMovement.objects.get(reason='cancellation')
+        self.assertEqual((movement.book_id, movement.delta), (self.book.id, 2))
+
+
+# --- 3. Validation des articles ---
+class OrderItemsValidationTests(OrderAPITestCase):
+
+    def test_invalid_items_return_400(self):
+        invalid_items = [
+            [],
+            'livre',
+            [{'quantity': 1}],
+            [{'book_id': self.book.id}],
+            [{'book_id': 'abc', 'quantity': 1}],
+            [{'book_id': self.book.id, 'quantity': 'deux'}],
+            [{'book_id': self.book.id, 'quantity': 0}],
+            [{'book_id': self.book.id, 'quantity': -1}],
+            [{'book_id': 0, 'quantity': 1}],
+            [{'book_id': self.book.id + 100, 'quantity': 1}],
+            ['livre'],
+            [None],
+        ]
+        for items in invalid_items:
+            with self.subTest(items=items):
+                response = self.create_order(items)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('items', response.data['details'])
+
+        self.assertFalse(Order.objects.exists())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.reserved_quantity, 0)
+
+    def test_numeric_strings_are_accepted(self):
+        response = self.create_order([{'book_id': str(self.book.id), 'quantity': '2'}])
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(StockReservation.objects.get().quantity, 2)
+
+
+# --- 4. Idempotency-Key ---
+@override_settings(IDEMPOTENCY_WAIT_SECONDS=0)
+class IdempotentOrderCreationTests(OrderAPITestCase):
+
+    def test_replay_returns_the_stored_response(self):
+        items = [{'book_id': self.book.id, 'quantity': 1}]
+
+        first = self.create_order(items, HTTP_IDEMPOTENCY_KEY='commande-1')
+        replay = self.create_order(items, HTTP_IDEMPOTENCY_KEY='commande-1')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replay.data, first.data)
+        self.assertEqual(replay['Idempotent-Replayed'], 'true')
+        self.assertEqual(Order.objects.count(), 1)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.reserved_quantity, 1)
+
+    def test_same_key_with_another_body_is_rejected(self):
+        self.create_order([{'book_id': self.book.id, 'quantity': 1}], HTTP_IDEMPOTENCY_KEY='commande-1')
+
+        response = self.create_order([{'book_id': self.book.id, 'quantity': 2}], HTTP_IDEMPOTENCY_KEY='commande-1')
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_request_in_progress_is_not_executed_twice(self):
+        items = [{'book_id': self.book.id, 'quantity': 1}]
+        self.create_order(items, HTTP_IDEMPOTENCY_KEY='commande-1')
+        IdempotencyKey.objects.update(
+            status='processing', locked_until=timezone.now() + timedelta(minutes=1)
+        )
+
+        response = self.create_order(items, HTTP_IDEMPOTENCY_KEY='commande-1')
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_abandoned_request_is_taken_over(self):
+        items = [{'book_id': self.book.id, 'quantity': 1}]
+        self.create_order(items, HTTP_IDEMPOTENCY_KEY='commande-1')
+        # Worker tué avant d'enregistrer la réponse : bail expiré
+        Order.objects.all().delete()
+        IdempotencyKey.objects.update(
+            status='processing', locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+        response = self.create_order(items, HTTP_IDEMPOTENCY_KEY='commande-1')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get().status, 'completed')
+
+
+# --- 5. Import de commandes en masse ---
+class OrderImportTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def row(self, reference, items, **fields):
+        return {
+            'external_reference': reference,
+            'email': 'client@example.com',
+            'first_name': 'Jeanne',
+            'last_name': 'Martin',
+            'voie': 'rue des Lilas',
+            'numero_voie': '12',
+            'code_postal': '75011',
+            'ville': 'Paris',
+            'country': 'fr',
+            'shipping_cost': 0,
+            'items': items,
+            **fields,
+        }
+
+    def errors(self, report):
+        return [(error['row'], error['errors']) for error in report['errors']]
+
+    def test_import_creates_paid_orders_and_reports_rejected_rows(self):
+        inactive = Book.objects.create(
+            titre='Le Renard', nom='Auteur', description='Album', prix=1200, quantites=5, is_active=False
+        )
+        rows = [
+            self.row('MP-1', [{'book_id': self.book.id, 'quantity': 2}]),
+            self.row('MP-2', [{'book_id': inactive.id, 'quantity': 1}]),
+            self.row('MP-3', [{'book_id': self.book.id + 100, 'quantity': 1}]),
+            self.row('MP-4', [{'book_id': self.book.id, 'quantity': 2}]),
+            self.row('MP-1', [{'book_id': self.book.id, 'quantity': 1}]),
+            {'external_reference': 'MP-5'},
+        ]
+
+        report = import_orders(rows, 'marketplace')
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['duplicates'], [{'row': 4, 'external_reference': 'MP-1'}])
+        self.assertEqual([row for row, _ in self.errors(report)], [1, 2, 3, 5])
+        self.assertEqual(report['errors'][0]['errors'], {'items': ['Livre Le Renard indisponible']})
+        self.assertEqual(report['errors'][2]['errors'], {'items': ['Stock insuffisant pour Le Loup']})
+        order = Order.objects.get()
+        self.assertTrue(order.is_paid)
+        self.assertEqual(self.available(), 1)
+        self.assertEqual(self.available(inactive), 5)
+
+        # Fichier importé une seconde fois : rien n'est recréé
+        self.assertEqual(import_orders(rows[:1], 'marketplace')['duplicates'][0]['external_reference'], 'MP-1')
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_conflicting_chunk_is_replayed_row_by_row(self):
+        load_books = imports._load_books
+
+        def concurrent_import(rows):
+            # Un autre import crée MP-2 entre le contrôle des doublons et l'écriture
+            Order.objects.create(
+                channel='marketplace', external_reference='MP-2', is_paid=True, email='autre@example.com',
+                first_name='Paul', last_name='Durand', voie='rue Haute', numero_voie='1',
+                code_postal='69001', ville='Lyon', country=self.country
+            )
+            return load_books(rows)
+
+        rows = [
+            self.row('MP-1', [{'book_id': self.book.id, 'quantity': 1}]),
+            self.row('MP-2', [{'book_id': self.book.id, 'quantity': 1}]),
+            self.row('MP-3', [{'book_id': self.book.id, 'quantity': 5}]),
+        ]
+        with mock.patch.object(imports, '_load_books', concurrent_import):
+            report = import_orders(rows, 'marketplace')
+
+        self.assertEqual([order['external_reference'] for order in report['orders']], ['MP-1'])
+        # Chaque ligne rejetée n'apparaît qu'une fois
+        self.assertEqual(self.errors(report), [
+            (1, {'non_field_errors': ["Commande déjà importée ou conflit d'écriture, réessayer"]}),
+            (2, {'items': ['Stock insuffisant pour Le Loup']}),
+        ])
+        self.assertEqual(
+            list(InventoryMovement.objects.filter(reason='sale').values_list('delta', flat=True)), [-1]
+        )
+        self.assertEqual(self.available(), 2)
+
+
+# --- 6. Grille de frais de port ---
+class ShippingRateTests(TestCase):
+
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        self.france = Country.objects.create(name='France', code='FR', shipping_zone='france', shipping_cost=500)
+        self.belgium = Country.objects.create(name='Belgique', code='BE', shipping_cost=900)
+        ShippingRate.objects.bulk_create([
+            ShippingRate(country=self.france, metric='books', max_value=1, price=400),
+            ShippingRate(country=self.france, metric='books', max_value=3, price=600),
+            ShippingRate(country=self.france, metric='weight', max_value=1000, price=500),
+            ShippingRate(country=self.france, metric='weight', max_value=3000, price=900),
+        ])
+
+    def test_highest_matching_tier_is_charged(self):
+        self.assertEqual(calculate_shipping_cost(self.france.id, 1, 200), 500)
+        self.assertEqual(calculate_shipping_cost(self.france.id, 2, 200), 600)
+        self.assertEqual(calculate_shipping_cost(self.france.id, 2, 1001), 900)
+        # Au-delà du dernier palier : tarif du dernier palier
+        self.assertEqual(calculate_shipping_cost(self.france.id, 10, 5000), 900)
+
+    def test_country_without_grid_pays_the_flat_cost(self):
+        self.assertEqual(calculate_shipping_cost(self.belgium.id, 2, 200), 900)
+
+        # Enregistrer un tarif recharge la grille en mémoire
+        ShippingRate.objects.create(country=self.belgium, metric='books', max_value=5, price=1100)
+
+        self.assertEqual(calculate_shipping_cost(self.belgium.id, 2, 200), 1100)
+
+    def test_rate_for_both_a_country_and_a_zone_is_rejected(self):
+        with self.assertRaises(IntegrityError):
+            ShippingRate.objects.create(country=self.france, zone='france', metric='books', max_value=5, price=100)
+
+
+# --- 7. Devis de panier ---
+class CartQuoteTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def quote(self, items, country=None):
+        return self.client.post(
+            '/api/v1/orders/quote/', {'country': country or self.country.id, 'items': items}, format='json'
+        )
+
+    def test_quote_prices_the_cart_without_creating_anything(self):
+        response = self.quote([{'book_id': self.book.id, 'quantity': 2}, {'book_id': self.book.id, 'quantity': 2}])
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (response.data['subtotal'], response.data['shipping_cost'], response.data['book_count']),
+            (6000, 500, 4)
+        )
+        self.assertEqual(response.data['total'], 6500)
+        # 4 exemplaires demandés au total pour 3 en stock
+        self.assertFalse(response.data['available'])
+        self.assertFalse(Order.objects.exists())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.reserved_quantity, 0)
+
+    def test_unknown_book_or_inactive_country_returns_400(self):
+        inactive = Country.objects.create(name='Suisse', code='CH', shipping_cost=900, is_active=False)
+
+        for country, items in [
+            (inactive.id, [{'book_id': self.book.id, 'quantity': 1}]),
+            (None, [{'book_id': self.book.id + 100, 'quantity': 1}]),
+            (None, [{'book_id': self.book.id, 'quantity': 0}]),
+            (None, []),
+        ]:
+            with self.subTest(country=country, items=items):
+                self.assertEqual(self.quote(items, country).status_code, status.HTTP_400_BAD_REQUEST)
+
+
+# --- 8. Liste des commandes payées ---
+class OrderListTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        Book.objects.filter(pk=self.book.pk).update(quantites=100)
+        self.admin = Admin.objects.create_superuser('admin@example.com', 'motdepasse')
+
+    def paid_order(self, quantity=1):
+        self.client.force_authenticate(None)
+        response = self.create_order([{'book_id': self.book.id, 'quantity': quantity}])
+        Order.objects.filter(pk=response.data['order']['id']).update(is_paid=True, paid_at=timezone.now())
+        return response.data['order']['id']
+
+    def list_orders(self, **params):
+        self.client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/orders/', params)
+        return response, len(queries)
+
+    def test_list_shows_paid_orders_with_their_item_count(self):
+        paid = self.paid_order()
+        self.create_order([{'book_id': self.book.id, 'quantity': 1}])
+
+        response, _ = self.list_orders()
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(order['id'], order['items_count']) for order in response.data['results']], [(paid, 1)])
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self.paid_order()
+        _, one_order = self.list_orders()
+        for _ in range(4):
+            self.paid_order()
+
+        response, five_orders = self.list_orders()
+
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(five_orders, one_order)
+
+    def test_list_requires_authentication(self):
+        response = self.client.get('/api/v1/orders/')
+
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+
+# --- 9. Agrégat clients ---
+class CustomerSummaryTests(OrderAPITestCase):
+
+    def paid_order(self, email, total, days_ago):
+        order = Order.objects.create(
+            email=email, first_name='Jeanne', last_name='Martin', voie='rue des Lilas', numero_voie='12',
+            code_postal='75011', ville='Paris', country=self.country, subtotal=total, total=total, is_paid=True
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        order.refresh_from_db()
+        return order
+
+    def summaries(self):
+        return list(
+            CustomerSummary.objects.order_by('email')
+            .values_list('email', 'order_count', 'total_spent', 'first_order_at', 'last_order_at')
+        )
+
+    def test_paid_orders_are_aggregated_by_normalized_email(self):
+        orders = [
+            self.paid_order('Client@Example.com ', 2000, days_ago=1),
+            self.paid_order('client@example.com', 3000, days_ago=5),
+            self.paid_order('autre@example.com', 1000, days_ago=2),
+        ]
+        for order in orders:
+            record_paid_order(order)
+
+        incremental = self.summaries()
+        self.assertEqual(
+            [(email, count, total) for email, count, total, _, _ in incremental],
+            [('autre@example.com', 1, 1000), ('client@example.com', 2, 5000)]
+        )
+        self.assertEqual(incremental[1][3:], (orders[1].created_at, orders[0].created_at))
+
+        # La reconstruction complète donne le même agrégat
+        self.assertEqual(rebuild_customer_summaries(Order.objects.filter(is_paid=True), batch_size=2), 2)
+        self.assertEqual(self.summaries(), incremental)
+
+    def test_customer_list_filters_repeat_customers(self):
+        for order in [self.paid_order('a@example.com', 1000, 1), self.paid_order('a@example.com', 1000, 2),
+                      self.paid_order('b@example.com', 1000, 3)]:
+            record_paid_order(order)
+        self.client.force_authenticate(Admin.objects.create_superuser('admin@example.com', 'motdepasse'))
+
+        response = self.client.get('/api/v1/orders/customers/', {'repeat': 'true'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['email'] for row in response.data['results']], ['a@example.com'])
+        self.assertTrue(response.data['results'][0]['is_repeat'])
+
+
+# --- 10. Statistiques des commandes payées ---
+class OrderStatsTests(OrderAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(Admin.objects.create_superuser('admin@example.com', 'motdepasse'))
+        self.orders = [
+            Order.objects.create(
+                email='client@example.com', first_name='Jeanne', last_name='Martin', voie='rue des Lilas',
+                numero_voie='12', code_postal='75011', ville='Paris', country=self.country,
+                subtotal=total, total=total, is_paid=True
+            )
+            for total in (2000, 3500)
+        ]
+        record_orders_paid(self.orders)
+
+    def counters(self):
+        return list(OrderDailyStats.objects.values_list('orders_count', 'revenue', 'pending_count', 'delivered_count'))
+
+    def test_rollup_follows_payments_status_changes_and_removals(self):
+        self.assertEqual(self.counters(), [(2, 5500, 2, 0)])
+
+        Order.objects.filter(pk=self.orders[0].pk).update(status='delivered')
+        record_status_change(self.orders[:1], 'pending', 'delivered')
+        self.assertEqual(self.counters(), [(2, 5500, 1, 1)])
+
+        incremental = self.counters()
+        rebuild_order_stats(Order.objects.filter(is_paid=True))
+        self.assertEqual(self.counters(), incremental)
+
+        record_orders_removed([Order.objects.get(pk=self.orders[1].pk)])
+        self.assertEqual(self.counters(), [(1, 2000, 0, 1)])
+
+    def test_statistics_and_timeseries_read_the_rollup(self):
+        statistics = self.client.get('/api/v1/orders/statistics/')
+        self.assertEqual((statistics.data['total_orders'], statistics.data['total_revenue']), (2, 55.0))
+
+        response = self.client.get('/api/v1/orders/timeseries/', {'country': self.country.id})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(row['period'], row['orders'], row['revenue_euros']) for row in response.data['results']],
+            [(timezone.localdate(), 2, 55.0)]
+        )
+
+    def test_invalid_timeseries_parameters_return_400(self):
+        for params in [
+            {'granularity': 'year'},
+            {'from': '2024-02-30'},
+            {'from': '2024-03-02', 'to': '2024-03-01'},
+            {'country': 'FR'},
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get('/api/v1/orders/timeseries/', params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
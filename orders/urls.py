@@ -2,10 +2,11 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OrderViewSet, CountryViewSet
+from .views import OrderViewSet, CountryViewSet, CustomerSummaryViewSet
 
 router = DefaultRouter()
 router.register(r'countries', CountryViewSet, basename='country')
+router.register(r'customers', CustomerSummaryViewSet, basename='customer')
 router.register(r'', OrderViewSet, basename='order')
 
 urlpatterns = [
@@ -9,18 +9,28 @@ from django.core.mail import EmailMultiAlternatives, send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils import timezone
-from django.db.models import Q, Count, Sum, Exists, OuterRef
+from django.db.models import Q, F, Count, Sum
+from django.db.models.functions import TruncWeek, TruncMonth
+from django.utils.dateparse import parse_date
 from datetime import datetime, timedelta
 
-from .models import Order, OrderItem, Country
+from .models import Order, OrderItem, Country, CustomerSummary, OrderDailyStats
 from .serializers import (
     OrderListSerializer,
     OrderDetailSerializer,
     OrderCreateSerializer,
+    OrderQuoteSerializer,
+    OrderImportSerializer,
     OrderUpdateStatusSerializer,
-    CountrySerializer
+    CountrySerializer,
+    CustomerSummarySerializer
 )
 from .utils import generate_invoice_pdf
+from .stats import is_paid, paid_condition, record_status_change, record_orders_removed
+from .reservations import release_order_reservations
+from .idempotency import idempotent
+from .imports import import_orders
+from payments.funnel import record_funnel_step
 
 
 class CountryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -32,19 +42,49 @@ class CountryViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [AllowAny]
 
 
+class CustomerSummaryViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet pour la liste des clients (admin uniquement)
+    Lit l'agrégat CustomerSummary, jamais la table des commandes
+    """
+    queryset = CustomerSummary.objects.prefetch_related('country')
+    serializer_class = CustomerSummarySerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['country']
+    search_fields = ['^email']
+    ordering_fields = ['last_order_at', 'first_order_at', 'total_spent', 'order_count']
+    ordering = ['-last_order_at']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        
+        repeat = self.request.query_params.get('repeat')
+        if repeat and repeat.lower() == 'true':
+            queryset = queryset.filter(order_count__gt=1)
+        
+        return queryset
+
+
 class OrderViewSet(viewsets.ModelViewSet):
     """
     ViewSet pour la gestion des commandes
     """
     queryset = Order.objects.all()
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['status', 'country']
-    search_fields = ['email', 'first_name', 'last_name', 'tracking_number']
+    filterset_fields = ['status', 'country', 'channel', 'email']
+    search_fields = ['email', 'first_name', 'last_name', 'tracking_number', 'external_reference']
     ordering_fields = ['created_at', 'total']
     ordering = ['-created_at']
     
+    # Colonnes lues par OrderListSerializer (propriétés full_name et total_euros comprises)
+    list_columns = [
+        'id', 'email', 'first_name', 'last_name', 'country__name',
+        'total', 'status', 'channel', 'tracking_number', 'created_at'
+    ]
+    
     def get_permissions(self):
-        if self.action in ['create', 'invoice']:
+        if self.action in ['create', 'invoice', 'quote']:
             permission_classes = [AllowAny]
         else:
             permission_classes = [IsAuthenticated]
@@ -57,17 +97,24 @@ class OrderViewSet(viewsets.ModelViewSet):
             return OrderListSerializer
         elif self.action == 'update_status':
             return OrderUpdateStatusSerializer
+        elif self.action == 'quote':
+            return OrderQuoteSerializer
+        elif self.action == 'import_orders':
+            return OrderImportSerializer
         return OrderDetailSerializer
     
     def get_queryset(self):
-        queryset = Order.objects.all().select_related('country').prefetch_related('items__book')
+        queryset = Order.objects.all().select_related('country')
         
-        # Filtrer uniquement les commandes avec un paiement "succeeded"
-        from payments.models import StripePayment
-        has_payment_succeeded = Exists(
-            StripePayment.objects.filter(order=OuterRef('pk'), status='succeeded')
-        )
-        queryset = queryset.annotate(has_payment_succeeded=has_payment_succeeded).filter(has_payment_succeeded=True)
+        if self.action == 'list':
+            # Liste : colonnes affichées seulement, nombre d'articles compté
+            # dans la même requête, aucun article ni livre chargé
+            queryset = queryset.only(*self.list_columns).annotate(items_count=Count('items'))
+        else:
+            queryset = queryset.prefetch_related('items__book')
+        
+        # Filtrer uniquement les commandes payées (paiement "succeeded" ou import partenaire)
+        queryset = queryset.filter(paid_condition())
         
         # Filtres de date
         start_date = self.request.query_params.get('start_date')
@@ -80,14 +127,21 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    @idempotent('orders.create')
     def create(self, request, *args, **kwargs):
         """
         Créer une commande et envoyer les emails
+        Une répétition avec le même en-tête Idempotency-Key rejoue la réponse
         """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
         
+        record_funnel_step(
+            order, 'orders_created',
+            book_count=sum(item['quantity'] for item in serializer.validated_data['items'])
+        )
+        
         # Envoyer les emails
         try:
             self._send_order_emails(order)
@@ -99,6 +153,46 @@ class OrderViewSet(viewsets.ModelViewSet):
             'order': OrderDetailSerializer(order, context={'request': request}).data
         }, status=status.HTTP_201_CREATED)
     
+    @action(detail=False, methods=['post'])
+    def quote(self, request):
+        """
+        Devis du panier : sous-total, frais de port, total et disponibilité
+        du stock. Ne crée rien, appelable à chaque modification du panier.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.quote())
+    
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_orders(self, request):
+        """
+        Import en masse de commandes marketplace / B2B déjà payées.
+        Les lignes invalides, sans stock ou déjà importées sont rapportées
+        sans interrompre le lot. Aucun email n'est envoyé.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = import_orders(
+            serializer.validated_data['orders'],
+            serializer.validated_data['channel']
+        )
+        return Response(
+            report,
+            status=status.HTTP_201_CREATED if report['created'] else status.HTTP_200_OK
+        )
+    
+    def perform_update(self, serializer):
+        old_status = serializer.instance.status
+        order = serializer.save()
+        if old_status != order.status and is_paid(order):
+            record_status_change([order], old_status, order.status)
+    
+    def perform_destroy(self, instance):
+        if is_paid(instance):
+            record_orders_removed([instance])
+        release_order_reservations([instance])
+        instance.delete()
+    
     def _send_order_emails(self, order):
         """
         Envoyer les emails de confirmation de commande
@@ -221,6 +315,9 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         order = serializer.save()
         
+        if old_status != order.status and is_paid(order):
+            record_status_change([order], old_status, order.status)
+        
         # Envoyer un email si le statut change ou si un tracking est ajouté
         if old_status != order.status or ('tracking_number' in request.data and request.data['tracking_number']):
             try:
@@ -278,44 +375,113 @@ class OrderViewSet(viewsets.ModelViewSet):
     def statistics(self, request):
         """
         Statistiques des commandes avec paiement "succeeded" (admin uniquement)
+        Lues dans l'agrégat journalier OrderDailyStats
         """
-        from payments.models import StripePayment
-        
-        # Filtre uniquement les commandes avec un paiement "succeeded"
-        has_payment_succeeded = Exists(
-            StripePayment.objects.filter(order=OuterRef('pk'), status='succeeded')
+        daily_stats = OrderDailyStats.objects.all()
+        totals = daily_stats.aggregate(
+            orders=Sum('orders_count'),
+            revenue=Sum('revenue'),
+            pending=Sum('pending_count'),
+            delivered=Sum('delivered_count')
         )
-        orders_with_payment = Order.objects.annotate(has_payment_succeeded=has_payment_succeeded).filter(has_payment_succeeded=True)
-        
-        # Total des commandes payées (succeeded)
-        total_orders = orders_with_payment.count()
-        
-        # Revenus totaux (commandes "succeeded" uniquement)
-        total_revenue = orders_with_payment.aggregate(
-            total=Sum('total')
-        )['total'] or 0
         
         # Commandes payées par statut
-        orders_by_status = orders_with_payment.values('status').annotate(
-            count=Count('id')
+        orders_by_status = [
+            {'status': status_code, 'count': totals[status_code]}
+            for status_code in ['pending', 'delivered']
+            if totals[status_code]
+        ]
+        
+        # Commandes payées par pays
+        orders_by_country = list(
+            daily_stats.values('country').annotate(
+                count=Sum('orders_count'),
+                revenue=Sum('revenue')
+            ).order_by('-count')
         )
+        names = dict(Country.objects.values_list('id', 'name'))
+        for row in orders_by_country:
+            row['country_name'] = names.get(row['country'])
+            row['revenue'] = row['revenue'] / 100
         
         # Commandes payées du mois
-        current_month = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        monthly_orders = orders_with_payment.filter(
-            created_at__gte=current_month
-        ).count()
+        current_month = timezone.localdate().replace(day=1)
+        monthly = daily_stats.filter(date__gte=current_month).aggregate(
+            orders=Sum('orders_count'),
+            revenue=Sum('revenue')
+        )
         
-        monthly_revenue = orders_with_payment.filter(
-            created_at__gte=current_month
-        ).aggregate(total=Sum('total'))['total'] or 0
+        return Response({
+            'total_orders': totals['orders'] or 0,
+            'total_revenue': (totals['revenue'] or 0) / 100,
+            'orders_by_status': orders_by_status,
+            'orders_by_country': orders_by_country,
+            'monthly_orders': monthly['orders'] or 0,
+            'monthly_revenue': (monthly['revenue'] or 0) / 100,
+        })
+    
+    @action(detail=False, methods=['get'])
+    def timeseries(self, request):
+        """
+        Série temporelle des commandes payées (admin uniquement)
+        ?granularity=day|week|month&from=AAAA-MM-JJ&to=AAAA-MM-JJ&country=<id>
+        """
+        truncs = {
+            'day': None,
+            'week': TruncWeek,
+            'month': TruncMonth,
+        }
+        granularity = request.query_params.get('granularity', 'day')
+        if granularity not in truncs:
+            return Response({
+                'error': 'granularity invalide, valeurs possibles: day, week, month'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        date_from = request.query_params.get('from')
+        date_to = request.query_params.get('to')
+        try:
+            date_to = parse_date(date_to) if date_to else timezone.localdate()
+            if date_from:
+                date_from = parse_date(date_from)
+            elif date_to:
+                date_from = date_to - timedelta(days=29)
+        except ValueError:
+            date_from = date_to = None
+        
+        if not date_from or not date_to or date_from > date_to:
+            return Response({
+                'error': 'Intervalle de dates invalide, format attendu: AAAA-MM-JJ'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        daily_stats = OrderDailyStats.objects.filter(date__gte=date_from, date__lte=date_to)
+        
+        country = request.query_params.get('country')
+        if country:
+            try:
+                country = int(country)
+            except ValueError:
+                return Response({
+                    'error': 'country invalide, identifiant numérique attendu'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            daily_stats = daily_stats.filter(country_id=country)
+        
+        trunc = truncs[granularity]
+        period = trunc('date') if trunc else F('date')
+        rows = daily_stats.annotate(period=period).values('period').annotate(
+            orders=Sum('orders_count'),
+            revenue=Sum('revenue'),
+            pending=Sum('pending_count'),
+            delivered=Sum('delivered_count')
+        ).order_by('period')
         
         return Response({
-            'total_orders': total_orders,
-            'total_revenue': total_revenue / 100,
-            'orders_by_status': list(orders_by_status),
-            'monthly_orders': monthly_orders,
-            'monthly_revenue': monthly_revenue / 100,
+            'granularity': granularity,
+            'from': date_from,
+            'to': date_to,
+            'results': [
+                dict(row, revenue_euros=row['revenue'] / 100)
+                for row in rows
+            ]
         })
     
     @action(detail=True, methods=['get'])
@@ -0,0 +1,108 @@
+# ============================================
+# PAYMENTS - Compteurs du tunnel de commande
+# ============================================
+
+import logging
+from collections import defaultdict
+
+from django.db import router, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from zoonova.utils import iter_chunks, upsert_counters
+
+logger = logging.getLogger(__name__)
+
+# Au-delà, les paniers sont regroupés (même palier que les frais de port)
+MAX_BASKET_SIZE = 8
+
+FUNNEL_STEPS = ['orders_created', 'checkout_started', 'paid', 'failed']
+
+
+def basket_size(book_count):
+    """Taille de panier agrégée : 1 à 8, 8 signifiant 8 livres et plus"""
+    return max(1, min(book_count or 0, MAX_BASKET_SIZE))
+
+
+def order_basket_size(order):
+    """Taille de panier d'une commande enregistrée"""
+    total = order.items.aggregate(total=Sum('quantity'))['total']
+    return basket_size(total)
+
+
+def _hour(at=None):
+    return (at or timezone.now()).replace(minute=0, second=0, microsecond=0)
+
+
+def record_funnel_step(order, step, book_count=None, revenue=0):
+    """
+    Incrémente le compteur `step` de l'heure en cours pour le pays et la
+    taille de panier de la commande (une seule requête). Une erreur est
+    journalisée sans interrompre le tunnel de commande.
+    
+    Args:
+        order: commande concernée
+        step (str): une des valeurs de FUNNEL_STEPS
+        book_count (int): nombre de livres, recalculé depuis la base si absent
+        revenue (int): montant payé en centimes (étape `paid`)
+    """
+    from .models import CheckoutFunnelStats
+
+    try:
+        size = basket_size(book_count) if book_count is not None else order_basket_size(order)
+        row = {
+            'hour': _hour(),
+            'country': order.country_id,
+            'basket_size': size,
+            'revenue': revenue,
+        }
+        row.update({name: int(name == step) for name in FUNNEL_STEPS})
+        upsert_counters(CheckoutFunnelStats, ['hour', 'country', 'basket_size'], [row])
+    except Exception as e:
+        logger.error(f"Erreur compteur tunnel '{step}' pour order {order.id}: {str(e)}", exc_info=True)
+
+
+def rebuild_funnel(orders):
+    """
+    Reconstruit CheckoutFunnelStats à partir des commandes et des paiements
+    existants. Faute d'horodatage par étape, toutes les étapes d'une
+    commande sont rattachées à son heure de création.
+    
+    Returns:
+        int: nombre de lignes écrites
+    """
+    from .models import CheckoutFunnelStats, StripePayment
+
+    paid = set(
+        StripePayment.objects.filter(status='succeeded').values_list('order_id', flat=True)
+    )
+    failed = set(
+        StripePayment.objects.filter(status='failed').values_list('order_id', flat=True)
+    )
+
+    counters = defaultdict(lambda: dict.fromkeys(FUNNEL_STEPS + ['revenue'], 0))
+    # Lecture par lots des commandes (base principale)
+    for chunk in iter_chunks(orders):
+        rows = (
+            chunk
+            .annotate(book_count=Sum('items__quantity'))
+            .values_list('id', 'created_at', 'country_id', 'book_count', 'stripe_checkout_session_id', 'total')
+        )
+        for order_id, created_at, country_id, book_count, session_id, total in rows:
+            row = counters[(_hour(created_at), country_id, basket_size(book_count))]
+            row['orders_created'] += 1
+            if session_id or order_id in paid or order_id in failed:
+                row['checkout_started'] += 1
+            if order_id in paid:
+                row['paid'] += 1
+                row['revenue'] += total
+            elif order_id in failed:
+                row['failed'] += 1
+
+    with transaction.atomic(using=router.db_for_write(CheckoutFunnelStats)):
+        CheckoutFunnelStats.objects.all().delete()
+        upsert_counters(CheckoutFunnelStats, ['hour', 'country', 'basket_size'], [
+            dict(row, hour=hour, country=country_id, basket_size=size)
+            for (hour, country_id, size), row in counters.items()
+        ], increment=False)
+    return len(counters)
@@ -0,0 +1,17 @@
+# payments/management/commands/rebuild_checkout_funnel.py
+
+from django.core.management.base import BaseCommand
+
+from orders.models import Order
+from payments.funnel import rebuild_funnel
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruit les compteurs horaires du tunnel de commande à partir des "
+        "commandes et paiements existants (étapes rattachées à l'heure de création)"
+    )
+
+    def handle(self, *args, **options):
+        rows = rebuild_funnel(Order.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'{rows} ligne(s) de compteurs reconstruite(s)'))
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0004_customersummary"),
+        ("payments", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CheckoutFunnelStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField(verbose_name="Heure")),
+                (
+                    "basket_size",
+                    models.PositiveSmallIntegerField(
+                        help_text="Nombre de livres du panier (8 = 8 et plus)",
+                        verbose_name="Taille du panier",
+                    ),
+                ),
+                (
+                    "orders_created",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Commandes créées"
+                    ),
+                ),
+                (
+                    "checkout_started",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Paiements initiés"
+                    ),
+                ),
+                ("paid", models.PositiveIntegerField(default=0, verbose_name="Payées")),
+                (
+                    "failed",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Échecs de paiement"
+                    ),
+                ),
+                (
+                    "revenue",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Montant payé en centimes",
+                        verbose_name="Chiffre d'affaires",
+                    ),
+                ),
+                (
+                    "country",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="orders.country",
+                        verbose_name="Pays",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Statistique du tunnel de commande",
+                "verbose_name_plural": "Statistiques du tunnel de commande",
+                "db_table": "checkout_funnel_stats",
+                "ordering": ["-hour"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("hour", "country", "basket_size"),
+                        name="unique_checkout_funnel_stats",
+                    )
+                ],
+            },
+        ),
+    ]
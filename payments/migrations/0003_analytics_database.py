@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0006_analytics_database"),
+        ("payments", "0002_checkoutfunnelstats"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="checkoutfunnelstats",
+            name="country",
+            field=models.ForeignKey(
+                db_constraint=False,
+                on_delete=django.db.models.deletion.DO_NOTHING,
+                related_name="+",
+                to="orders.country",
+                verbose_name="Pays",
+            ),
+        ),
+    ]
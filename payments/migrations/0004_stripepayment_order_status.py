@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0011_order_channel"),
+        ("payments", "0003_analytics_database"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="stripepayment",
+            index=models.Index(
+                fields=["order", "status"], name="stripe_payment_order_idx"
+            ),
+        ),
+    ]
@@ -48,6 +48,9 @@ class StripePayment(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Paiement Stripe'
         verbose_name_plural = 'Paiements Stripe'
+        indexes = [
+            models.Index(fields=['order', 'status'], name='stripe_payment_order_idx'),
+        ]
     
     def __str__(self):
         return f"Paiement {self.payment_intent_id} - {self.amount/100}€"
@@ -56,3 +59,47 @@ class StripePayment(models.Model):
     def amount_euros(self):
         return self.amount / 100
 
+
+
+class CheckoutFunnelStats(models.Model):
+    """Compteurs horaires du tunnel de commande, par pays et taille de panier"""
+    
+    hour = models.DateTimeField(verbose_name="Heure")
+    country = models.ForeignKey(
+        'orders.Country',
+        # Table de la base analytics : pas de contrainte SQL ni de cascade
+        # vers la base principale (voir zoonova/db_routers.py)
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name="Pays"
+    )
+    basket_size = models.PositiveSmallIntegerField(
+        help_text="Nombre de livres du panier (8 = 8 et plus)",
+        verbose_name="Taille du panier"
+    )
+    
+    orders_created = models.PositiveIntegerField(default=0, verbose_name="Commandes créées")
+    checkout_started = models.PositiveIntegerField(default=0, verbose_name="Paiements initiés")
+    paid = models.PositiveIntegerField(default=0, verbose_name="Payées")
+    failed = models.PositiveIntegerField(default=0, verbose_name="Échecs de paiement")
+    revenue = models.PositiveIntegerField(
+        default=0,
+        help_text="Montant payé en centimes",
+        verbose_name="Chiffre d'affaires"
+    )
+    
+    class Meta:
+        db_table = 'checkout_funnel_stats'
+        ordering = ['-hour']
+        verbose_name = 'Statistique du tunnel de commande'
+        verbose_name_plural = 'Statistiques du tunnel de commande'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hour', 'country', 'basket_size'],
+                name='unique_checkout_funnel_stats'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H}h - {self.country_id} - {self.basket_size} livre(s)"
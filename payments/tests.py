@@ -1,3 +1,165 @@
+# ============================================
+# PAYMENTS - Tests
+# ============================================
+
+from datetime import timedelta
+from unittest import mock
+
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from accounts.models import Admin
+from books.models import Book, InventoryMovement
+from orders.models import Country, Order, StockReservation
+from orders.reservations import release_expired_reservations, release_order_reservations
+from .models import StripePayment
+from .views import handle_checkout_session_completed, handle_payment_intent_succeeded
+
+
+def create_order(book, country, quantity=2):
+    """Commande du site (non payée, stock réservé) créée par l'API"""
+    response = APIClient().post('/api/v1/orders/', {
+        'email': 'client@example.com',
+        'first_name': 'Jeanne',
+        'last_name': 'Martin',
+        'voie': 'rue des Lilas',
+        'numero_voie': '12',
+        'code_postal': '75011',
+        'ville': 'Paris',
+        'country': country.id,
+        'items': [{'book_id': book.id, 'quantity': quantity}],
+    }, format='json')
+    return Order.objects.get(pk=response.data['order']['id'])
+
+
+def payment_intent(order):
+    return {
+        'id': f'pi_{order.id}',
+        'metadata': {'order_id': str(order.id)},
+        'amount': order.total,
+        'currency': 'eur',
+    }
+
+
+class PaidWebhookTests(TestCase):
+    """Webhooks de paiement : passage à l'état payé et conversion des réservations"""
+
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        country = Country.objects.create(name='France', code='FR', shipping_cost=500, is_active=True)
+        self.book = Book.objects.create(titre='Le Loup', nom='Auteur', description='Album', prix=1500, quantites=3)
+        self.order = create_order(self.book, country)
+
+    def payment_intent(self):
+        return payment_intent(self.order)
+
+    def session(self):
+        return {
+            'id': 'cs_test',
+            'payment_intent': f'pi_{self.order.id}',
+            'metadata': {'order_id': str(self.order.id)},
+            'amount_total': self.order.total,
+            'currency': 'eur',
+        }
+
+    def assertConverted(self):
+        self.order.refresh_from_db()
+        self.book.refresh_from_db()
+        self.assertTrue(self.order.is_paid)
+        self.assertEqual(StockReservation.objects.get().status, 'converted')
+        self.assertEqual(self.book.reserved_quantity, 0)
+        self.assertEqual(
+            list(InventoryMovement.objects.filter(reason='sale').values_list('order_id', 'delta')),
+            [(self.order.id, -2)]
+        )
+
+    def test_payment_converts_reservations(self):
+        handle_payment_intent_succeeded(self.payment_intent())
+
+        self.assertConverted()
+        # Webhook renvoyé : rien n'est converti deux fois
+        handle_checkout_session_completed(self.session())
+        self.assertEqual(InventoryMovement.objects.filter(reason='sale').count(), 1)
+
+    def test_failed_conversion_leaves_the_order_unpaid_for_the_retry(self):
+        with mock.patch('payments.views.convert_reservations', side_effect=RuntimeError('worker interrompu')):
+            with self.assertRaises(RuntimeError):
+                handle_checkout_session_completed(self.session())
+
+        self.order.refresh_from_db()
+        self.assertFalse(self.order.is_paid)
+        self.assertFalse(StripePayment.objects.exists())
+        self.assertEqual(StockReservation.objects.get().status, 'active')
+
+        # Stripe renvoie le webhook
+        handle_checkout_session_completed(self.session())
+
+        self.assertConverted()
+        self.assertEqual(StripePayment.objects.count(), 1)
+
+    def test_expiry_sweep_skips_paid_orders(self):
+        Order.objects.filter(pk=self.order.pk).update(is_paid=True, paid_at=timezone.now())
+
+        released = release_expired_reservations(now=timezone.now() + timedelta(days=1))
+
+        self.assertEqual(released, 0)
+        self.assertEqual(StockReservation.objects.get().status, 'active')
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.reserved_quantity, 2)
+
+    def test_payment_after_stock_resold_marks_the_order_paid(self):
+        release_order_reservations(Order.objects.filter(pk=self.order.pk))
+        Book.objects.filter(pk=self.book.pk).update(quantites=1)
+
+        with self.assertLogs('payments.views', level='ERROR'):
+            handle_payment_intent_succeeded(self.payment_intent())
+
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.is_paid)
+        self.assertEqual(StockReservation.objects.get().status, 'released')
+        self.assertFalse(InventoryMovement.objects.filter(reason='sale').exists())
+
+
+class CheckoutFunnelTests(TestCase):
+
+    databases = {'default', 'analytics'}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(Admin.objects.create_superuser('admin@example.com', 'motdepasse'))
+
+    def test_order_and_payment_steps_are_counted(self):
+        country = Country.objects.create(name='France', code='FR', shipping_cost=500, is_active=True)
+        book = Book.objects.create(titre='Le Loup', nom='Auteur', description='Album', prix=1500, quantites=5)
+        paid = create_order(book, country, quantity=2)
+        create_order(book, country, quantity=1)
+        handle_payment_intent_succeeded(payment_intent(paid))
+
+        response = self.client.get('/api/v1/payments/funnel/', {'group_by': 'basket_size'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        totals = response.data['totals']
+        self.assertEqual((totals['orders_created'], totals['paid'], totals['revenue']), (2, 1, paid.total))
+        self.assertEqual(
+            [(group['group'], group['orders_created'], group['paid']) for group in response.data['groups']],
+            [(1, 1, 0), (2, 1, 1)]
+        )
+
+    def test_invalid_grouping_returns_400(self):
+        response = self.client.get('/api/v1/payments/funnel/', {'group_by': 'email'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_impossible_date_returns_400(self):
+        for params in [{'from': '2024-02-30'}, {'to': '2024-13-01'}]:
+            with self.subTest(params=params):
+                response = self.client.get('/api/v1/payments/funnel/', params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_valid_range_is_accepted(self):
+        response = self.client.get('/api/v1/payments/funnel/', {'from': '2024-02-29', 'to': '2024-03-01'})
 
-# Create your tests here.
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -6,7 +6,8 @@ from .views import (
     StripePaymentViewSet,
     create_checkout_session,
     stripe_webhook,
-    verify_payment
+    verify_payment,
+    checkout_funnel
 )
 
 router = DefaultRouter()
@@ -16,5 +17,6 @@ urlpatterns = [
     path('create-checkout/', create_checkout_session, name='create_checkout'),
     path('webhook/', stripe_webhook, name='stripe_webhook'),
     path('verify/', verify_payment, name='verify_payment'),
+    path('funnel/', checkout_funnel, name='checkout_funnel'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
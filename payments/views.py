@@ -9,14 +9,25 @@ from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
+from django.db.models import Sum, F
+from django.db.models.functions import TruncDate
+from django.utils.dateparse import parse_date
+from datetime import timedelta
 import stripe
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
-from .models import StripePayment
-from orders.models import Order
+from .models import StripePayment, CheckoutFunnelStats
+from orders.models import Order, Country
+from orders.customers import record_paid_order
+from orders.stats import mark_paid, record_order_paid
+from orders.reservations import convert_reservations, renew_reservations, release_order_reservations
+from orders.exceptions import StockConflict
+from orders.idempotency import idempotent
+from .funnel import record_funnel_step
 from .serializers import StripePaymentSerializer, StripeWebhookSerializer
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -33,9 +44,11 @@ class StripePaymentViewSet(viewsets.ReadOnlyModelViewSet):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@idempotent('payments.checkout')
 def create_checkout_session(request):
     """
     Créer une session Stripe Checkout pour une commande
+    Une répétition avec le même en-tête Idempotency-Key rejoue la réponse
     """
     try:
         order_id = request.data.get('order_id')
@@ -60,7 +73,9 @@ def create_checkout_session(request):
         
         # Préparer les line items pour Stripe
         line_items = []
+        book_count = 0
         for item in order.items.all():
+            book_count += item.quantity
             line_items.append({
                 'price_data': {
                     'currency': 'eur',
@@ -85,9 +100,17 @@ def create_checkout_session(request):
                 'quantity': 1,
             })
         
+        # Prolonger la réservation du stock pendant toute la durée de la
+        # session (Stripe impose au moins 30 minutes)
+        expires_at = renew_reservations(
+            order,
+            timezone.now() + timedelta(minutes=max(settings.STOCK_RESERVATION_TTL_MINUTES, 31))
+        )
+        
         # Créer la session Checkout
         checkout_session = stripe.checkout.Session.create(
             payment_method_types=['card'],
+            expires_at=int(expires_at.timestamp()),
             line_items=line_items,
             mode='payment',
             success_url=settings.STRIPE_SUCCESS_URL + f'?order_id={order.id}',
@@ -107,11 +130,17 @@ def create_checkout_session(request):
         order.stripe_checkout_session_id = checkout_session.id
         order.save()
         
+        record_funnel_step(order, 'checkout_started', book_count=book_count)
+        
         return Response({
             'checkout_url': checkout_session.url,
             'session_id': checkout_session.id,
         }, status=status.HTTP_200_OK)
         
+    except StockConflict as e:
+        return Response({
+            'error': str(e.detail)
+        }, status=status.HTTP_409_CONFLICT)
     except stripe.error.StripeError as e:
         return Response({
             'error': str(e)
@@ -152,6 +181,9 @@ def stripe_webhook(request):
     elif event['type'] == 'payment_intent.payment_failed':
         handle_payment_intent_failed(event['data']['object'])
     
+    elif event['type'] == 'checkout.session.expired':
+        handle_checkout_session_expired(event['data']['object'])
+    
     return HttpResponse(status=200)
 
 
@@ -168,26 +200,34 @@ def handle_checkout_session_completed(session):
     try:
         order = Order.objects.get(id=order_id)
         
-        # Mettre à jour la commande
-        order.stripe_payment_intent_id = session['payment_intent']
-        order.stripe_checkout_session_id = session['id']
-        order.save()
-        
-        # Créer l'enregistrement du paiement
-        StripePayment.objects.create(
-            order=order,
-            payment_intent_id=session['payment_intent'],
-            checkout_session_id=session['id'],
-            amount=session['amount_total'],
-            currency=session['currency'],
-            status='succeeded',
-            metadata=session.get('metadata', {}),
-            webhook_received=True,
-            webhook_data=dict(session),
-            webhook_received_at=timezone.now()
-        )
+        with transaction.atomic():
+            # Mettre à jour la commande
+            order.stripe_payment_intent_id = session['payment_intent']
+            order.stripe_checkout_session_id = session['id']
+            order.save(update_fields=['stripe_payment_intent_id', 'stripe_checkout_session_id', 'updated_at'])
+            
+            # Créer ou compléter l'enregistrement du paiement (payment_intent.succeeded
+            # peut arriver en premier, un webhook renvoyé le retrouve)
+            StripePayment.objects.update_or_create(
+                payment_intent_id=session['payment_intent'],
+                defaults={
+                    'order': order,
+                    'checkout_session_id': session['id'],
+                    'amount': session['amount_total'],
+                    'currency': session['currency'],
+                    'status': 'succeeded',
+                    'metadata': session.get('metadata', {}),
+                    'webhook_received': True,
+                    'webhook_data': dict(session),
+                    'webhook_received_at': timezone.now()
+                }
+            )
+            paid = _mark_paid(order)
         logger.info(f"StripePayment créé pour order {order_id}")
         
+        if paid:
+            _on_order_paid(order)
+        
         # Envoyer la facture par email
         try:
             _send_invoice_email(order)
@@ -197,7 +237,34 @@ def handle_checkout_session_completed(session):
     except Order.DoesNotExist:
         logger.error(f"Commande {order_id} introuvable pour webhook")
     except Exception as e:
+        # Rien n'a été enregistré : webhook en erreur, Stripe le renverra
         logger.error(f"Erreur création StripePayment pour order {order_id}: {str(e)}", exc_info=True)
+        raise
+
+
+def handle_checkout_session_expired(session):
+    """
+    Gérer l'expiration d'une session checkout : le stock réservé par la
+    commande est rendu à la vente sans attendre le balayage périodique
+    """
+    order_id = session['metadata'].get('order_id')
+    
+    if not order_id:
+        logger.warning("Pas d'order_id dans la session checkout expirée")
+        return
+    
+    try:
+        order = Order.objects.get(id=order_id)
+        if order.is_paid:
+            return
+        
+        released = release_order_reservations([order])
+        logger.info(f"Session {session['id']} expirée : {released} réservation(s) libérée(s) pour order {order_id}")
+        
+    except Order.DoesNotExist:
+        logger.error(f"Commande {order_id} introuvable pour webhook")
+    except Exception as e:
+        logger.error(f"Erreur libération des réservations pour order {order_id}: {str(e)}", exc_info=True)
 
 
 def handle_payment_intent_succeeded(payment_intent):
@@ -213,34 +280,78 @@ def handle_payment_intent_succeeded(payment_intent):
     try:
         order = Order.objects.get(id=order_id)
         
-        # Mettre à jour ou créer le paiement
-        payment, created = StripePayment.objects.get_or_create(
-            payment_intent_id=payment_intent['id'],
-            defaults={
-                'order': order,
-                'amount': payment_intent['amount'],
-                'currency': payment_intent['currency'],
-                'status': 'succeeded',
-                'metadata': payment_intent.get('metadata', {}),
-                'webhook_received': True,
-                'webhook_data': dict(payment_intent),
-                'webhook_received_at': timezone.now()
-            }
-        )
-        
-        if not created:
-            payment.status = 'succeeded'
-            payment.webhook_received = True
-            payment.webhook_data = dict(payment_intent)
-            payment.webhook_received_at = timezone.now()
-            payment.save()
+        with transaction.atomic():
+            # Mettre à jour ou créer le paiement
+            payment, created = StripePayment.objects.get_or_create(
+                payment_intent_id=payment_intent['id'],
+                defaults={
+                    'order': order,
+                    'amount': payment_intent['amount'],
+                    'currency': payment_intent['currency'],
+                    'status': 'succeeded',
+                    'metadata': payment_intent.get('metadata', {}),
+                    'webhook_received': True,
+                    'webhook_data': dict(payment_intent),
+                    'webhook_received_at': timezone.now()
+                }
+            )
+            
+            if not created:
+                payment.status = 'succeeded'
+                payment.webhook_received = True
+                payment.webhook_data = dict(payment_intent)
+                payment.webhook_received_at = timezone.now()
+                payment.save()
+            
+            paid = _mark_paid(order)
         
         logger.info(f"Payment intent {payment_intent['id']} traité pour order {order_id}")
         
+        if paid:
+            _on_order_paid(order)
+        
     except Order.DoesNotExist:
         logger.error(f"Commande {order_id} introuvable pour webhook")
     except Exception as e:
+        # Rien n'a été enregistré : webhook en erreur, Stripe le renverra
         logger.error(f"Erreur traitement payment_intent pour order {order_id}: {str(e)}", exc_info=True)
+        raise
+
+
+def _mark_paid(order):
+    """
+    Passe la commande à l'état payé et convertit ses réservations en sortie
+    de stock, dans la transaction de l'appelant : si la conversion échoue,
+    la commande reste impayée et l'exception remonte (Stripe renvoie le
+    webhook). Stock revendu après expiration de la réservation
+    (StockConflict) : le paiement est acquis, la commande est payée et
+    signalée pour un traitement à la main (réassort ou remboursement).
+    
+    Returns:
+        bool: True si la commande vient de passer à l'état payé
+    """
+    if not mark_paid(order):
+        return False
+    try:
+        with transaction.atomic():
+            convert_reservations(order)
+    except StockConflict as e:
+        logger.error(f"Commande {order.id} payée sans stock réservé: {str(e)}")
+    return True
+
+
+def _on_order_paid(order):
+    """
+    Traitements à effectuer une seule fois, après le commit du passage de la
+    commande à l'état payé
+    """
+    try:
+        record_paid_order(order)
+    except Exception as e:
+        logger.error(f"Erreur mise à jour du client pour order {order.id}: {str(e)}", exc_info=True)
+    
+    record_order_paid(order)
+    record_funnel_step(order, 'paid', revenue=order.total)
 
 
 def _send_invoice_email(order):
@@ -291,6 +402,8 @@ def handle_payment_intent_failed(payment_intent):
             }
         )
         
+        newly_failed = created or payment.status != 'failed'
+        
         if not created:
             payment.status = 'failed'
             payment.webhook_received = True
@@ -298,6 +411,9 @@ def handle_payment_intent_failed(payment_intent):
             payment.webhook_received_at = timezone.now()
             payment.save()
         
+        if newly_failed:
+            record_funnel_step(order, 'failed')
+        
         # TODO: Notifier l'admin et le client
         
     except Order.DoesNotExist:
@@ -348,4 +464,83 @@ def verify_payment(request):
     except stripe.error.StripeError as e:
         return Response({
             'error': str(e)
-        }, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _funnel_rates(row):
+    """
+    Ajoute les taux de conversion à une ligne de compteurs du tunnel
+    """
+    started = row['checkout_started']
+    row['checkout_rate'] = round(started / row['orders_created'], 4) if row['orders_created'] else None
+    row['conversion_rate'] = round(row['paid'] / started, 4) if started else None
+    row['failure_rate'] = round(row['failed'] / started, 4) if started else None
+    row['revenue_euros'] = row['revenue'] / 100
+    return row
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def checkout_funnel(request):
+    """
+    Tunnel de commande : commandes créées, paiements initiés, payés, échoués
+    Lit uniquement la table d'agrégats horaires (admin uniquement)
+    """
+    group_by = request.query_params.get('group_by')
+    groupings = {
+        'country': F('country'),
+        'basket_size': F('basket_size'),
+        'day': TruncDate('hour'),
+        'hour': F('hour'),
+    }
+    if group_by and group_by not in groupings:
+        return Response({
+            'error': f'group_by invalide, valeurs possibles: {", ".join(groupings)}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    queryset = CheckoutFunnelStats.objects.all()
+    
+    try:
+        date_from = parse_date(request.query_params.get('from', ''))
+        date_to = parse_date(request.query_params.get('to', ''))
+    except ValueError:
+        # Date bien formée mais inexistante (ex: 2024-02-30)
+        return Response({
+            'error': 'Intervalle de dates invalide, format attendu: AAAA-MM-JJ'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    if date_from:
+        queryset = queryset.filter(hour__date__gte=date_from)
+    
+    if date_to:
+        queryset = queryset.filter(hour__date__lte=date_to)
+    
+    counters = {
+        name: Sum(name)
+        for name in ['orders_created', 'checkout_started', 'paid', 'failed', 'revenue']
+    }
+    totals = {name: value or 0 for name, value in queryset.aggregate(**counters).items()}
+    
+    response = {
+        'from': date_from,
+        'to': date_to,
+        'totals': _funnel_rates(totals),
+    }
+    
+    if group_by:
+        rows = list(
+            queryset.annotate(group=groupings[group_by])
+            .values('group')
+            .annotate(**counters)
+            .order_by('group')
+        )
+        if group_by == 'country':
+            names = dict(Country.objects.filter(
+                id__in=[row['group'] for row in rows]
+            ).values_list('id', 'name'))
+            for row in rows:
+                row['country_name'] = names.get(row['group'])
+        response['group_by'] = group_by
+        response['groups'] = [_funnel_rates(row) for row in rows]
+    
+    return Response(response)
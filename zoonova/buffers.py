@@ -0,0 +1,76 @@
+# zoonova/buffers.py
+
+import atexit
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFull(Exception):
+    """Le tampon a atteint sa capacité maximale"""
+
+
+class BatchBuffer:
+    """
+    Tampon d'écriture en mémoire, propre à chaque processus worker.
+
+    Les éléments sont accumulés puis transmis par lots à `flush_func` dès que
+    le lot atteint `max_size` éléments ou que le plus ancien a plus de
+    `max_age` secondes (vérifié à chaque ajout), ainsi qu'à l'arrêt du
+    processus. En cas d'échec de l'écriture, le lot est remis en tête du
+    tampon ; `max_pending` borne alors la mémoire utilisée.
+    """
+
+    def __init__(self, flush_func, max_size=100, max_age=30, max_pending=None):
+        self.flush_func = flush_func
+        self.max_size = max_size
+        self.max_age = max_age
+        self.max_pending = max_pending
+        self._items = []
+        self._oldest_at = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, *items):
+        """
+        Ajoute des éléments au tampon et déclenche l'écriture si nécessaire.
+        Lève BufferFull si `max_pending` serait dépassé.
+        """
+        with self._lock:
+            if self.max_pending is not None and len(self._items) + len(items) > self.max_pending:
+                raise BufferFull(f'{len(self._items)} éléments en attente')
+            if not self._items:
+                self._oldest_at = time.monotonic()
+            self._items.extend(items)
+            due = (
+                len(self._items) >= self.max_size
+                or time.monotonic() - self._oldest_at >= self.max_age
+            )
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        """
+        Écrit tout le contenu du tampon. Retourne le nombre d'éléments écrits.
+        """
+        with self._lock:
+            items, self._items = self._items, []
+        if not items:
+            return 0
+
+        try:
+            self.flush_func(items)
+        except Exception as e:
+            logger.error(f"Échec d'écriture d'un lot de {len(items)} éléments: {str(e)}", exc_info=True)
+            with self._lock:
+                self._items[:0] = items
+                self._oldest_at = time.monotonic()
+            return 0
+
+        return len(items)
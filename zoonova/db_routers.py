@@ -0,0 +1,52 @@
+# ============================================
+# ZOONOVA - Routage multi-bases
+# ============================================
+
+from django.conf import settings
+
+
+class AnalyticsRouter:
+    """
+    Envoie les tables de statistiques (agrégats, compteurs, événements) vers
+    la base `analytics`, et tout le reste vers `default`.
+
+    Sur SQLite chaque écriture verrouille toute la base : en séparant les
+    écritures de reporting, elles ne bloquent plus la création des commandes.
+    Sans alias `analytics` configuré, tout reste sur `default`.
+    """
+
+    ANALYTICS_APPS = {'analytics'}
+    ANALYTICS_MODELS = {
+        'books.bookdailystats',
+        'books.restocksuggestion',
+        'orders.customersummary',
+        'orders.orderdailystats',
+        'payments.checkoutfunnelstats',
+    }
+
+    def _db(self, app_label, model_name):
+        if 'analytics' in settings.DATABASES and (
+            app_label in self.ANALYTICS_APPS
+            or f'{app_label}.{model_name}' in self.ANALYTICS_MODELS
+        ):
+            return 'analytics'
+        # Toujours un alias explicite : sans cela Django réutiliserait la base
+        # de l'instance d'origine pour suivre une relation (ex: stats.book)
+        return 'default'
+
+    def db_for_read(self, model, **hints):
+        return self._db(model._meta.app_label, model._meta.model_name)
+
+    def db_for_write(self, model, **hints):
+        return self._db(model._meta.app_label, model._meta.model_name)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Les agrégats référencent des livres / pays de la base principale
+        # (clés étrangères sans contrainte en base, voir db_constraint=False)
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if model_name is None:
+            # Opérations sans modèle (RunPython, RunSQL) : base principale uniquement
+            return db == 'default'
+        return db == self._db(app_label, model_name)
@@ -14,6 +14,7 @@ import os
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -57,6 +58,7 @@ INSTALLED_APPS = [
     'orders',
     'payments',
     'contact',
+    'analytics',
 ]
 
 MIDDLEWARE = [
@@ -88,6 +90,11 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'EXCEPTION_HANDLER': 'zoonova.utils.custom_exception_handler',
+    # Limites par IP (analytics.views.EventIngestThrottle), comptées dans le cache par défaut
+    # (local au processus sans CACHES configuré)
+    'DEFAULT_THROTTLE_RATES': {
+        'event_ingest': os.getenv('EVENTS_THROTTLE_RATE', '120/min'),
+    },
 }
 
 # JWT CONFIGURATION
@@ -123,6 +130,9 @@ CORS_ALLOWED_ORIGINS = [
     'http://127.0.0.1:5173',
 ]
 
+# En-tête envoyé par les clients pour rejouer une requête sans la dupliquer
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')
+
 USE_X_FORWARDED_HOST = True
 
 
@@ -134,6 +144,85 @@ STRIPE_SUCCESS_URL = os.getenv('STRIPE_SUCCESS_URL')
 STRIPE_CANCEL_URL = os.getenv('STRIPE_CANCEL_URL')
 
 
+# RÉSERVATIONS DE STOCK (commandes en attente de paiement)
+# Stripe impose au moins 30 minutes de validité pour une session Checkout
+STOCK_RESERVATION_TTL_MINUTES = int(os.getenv('STOCK_RESERVATION_TTL_MINUTES', 60))
+STOCK_RESERVATION_SWEEP_BATCH_SIZE = int(os.getenv('STOCK_RESERVATION_SWEEP_BATCH_SIZE', 500))
+
+# Commandes jamais payées supprimées par reap_unpaid_orders (une session Stripe
+# Checkout dure au plus 24 heures)
+UNPAID_ORDER_MAX_AGE_HOURS = int(os.getenv('UNPAID_ORDER_MAX_AGE_HOURS', 72))
+UNPAID_ORDER_REAP_BATCH_SIZE = int(os.getenv('UNPAID_ORDER_REAP_BATCH_SIZE', 500))
+
+# Import de commandes marketplace / B2B : commandes créées par transaction
+ORDER_IMPORT_CHUNK_SIZE = int(os.getenv('ORDER_IMPORT_CHUNK_SIZE', 200))
+
+
+# IDEMPOTENCE (en-tête Idempotency-Key sur la création de commande et de session de paiement)
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+# Attente maximale d'une requête répétée pendant que la première est en cours
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv('IDEMPOTENCY_WAIT_SECONDS', 10))
+# Bail d'une requête en cours : au-delà (worker tué, timeout gunicorn de 120 s),
+# une répétition reprend la clé et réexécute la requête
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv('IDEMPOTENCY_LEASE_SECONDS', 120))
+
+
+# DONNÉES DE RÉFÉRENCE (pays de livraison) mises en cache pour les devis de panier
+# Cache local au processus (pas de CACHES configuré) : invalidé à l'enregistrement
+# d'un pays dans ce processus, expiré après ce délai dans les autres
+REFERENCE_DATA_CACHE_SECONDS = int(os.getenv('REFERENCE_DATA_CACHE_SECONDS', 300))
+# Grille des frais de port (ShippingRate) chargée en mémoire par chaque processus
+SHIPPING_RATES_TTL_SECONDS = int(os.getenv('SHIPPING_RATES_TTL_SECONDS', 300))
+
+
+# JOURNAL D'INVENTAIRE (mouvements reportés dans Book.quantites par compact_inventory)
+INVENTORY_COMPACT_BATCH_SIZE = int(os.getenv('INVENTORY_COMPACT_BATCH_SIZE', 1000))
+# Flux de stock fournisseur (sync_stock_feed) : livres modifiés par transaction
+STOCK_FEED_BATCH_SIZE = int(os.getenv('STOCK_FEED_BATCH_SIZE', 500))
+# Import ONIX (import_onix) : notices écrites par transaction
+ONIX_IMPORT_BATCH_SIZE = int(os.getenv('ONIX_IMPORT_BATCH_SIZE', 500))
+# Alertes de retour en stock (send_stock_notifications) : demandes traitées par lot
+STOCK_NOTIFICATION_BATCH_SIZE = int(os.getenv('STOCK_NOTIFICATION_BATCH_SIZE', 200))
+# Envois échoués au-delà desquels une demande passe à l'état `failed`
+STOCK_NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('STOCK_NOTIFICATION_MAX_ATTEMPTS', 5))
+
+
+# TRENDING (score de tendance des livres)
+# Un changement de demi-vie s'applique au prochain `manage.py rebase_trending_scores`
+TRENDING_HALF_LIFE_HOURS = float(os.getenv('TRENDING_HALF_LIFE_HOURS', 168))
+TRENDING_VIEW_WEIGHT = float(os.getenv('TRENDING_VIEW_WEIGHT', 1))
+TRENDING_SALE_WEIGHT = float(os.getenv('TRENDING_SALE_WEIGHT', 10))
+# Échelle (origine, demi-vie) gardée en mémoire par chaque processus : un rebase
+# lancé par le cron est vu par les workers au plus tard après ce délai
+TRENDING_SCALE_TTL_SECONDS = int(os.getenv('TRENDING_SCALE_TTL_SECONDS', 300))
+
+
+# STATISTIQUES JOURNALIÈRES DES LIVRES (écriture par lots, par worker)
+BOOK_STATS_FLUSH_SIZE = int(os.getenv('BOOK_STATS_FLUSH_SIZE', 100))
+BOOK_STATS_FLUSH_INTERVAL = int(os.getenv('BOOK_STATS_FLUSH_INTERVAL', 30))
+BOOK_STATS_MAX_PENDING = int(os.getenv('BOOK_STATS_MAX_PENDING', 10000))
+
+
+# PRÉVISION DES VENTES ET RÉASSORT
+RESTOCK_FORECAST_METHOD = os.getenv('RESTOCK_FORECAST_METHOD', 'ses')
+RESTOCK_HISTORY_DAYS = int(os.getenv('RESTOCK_HISTORY_DAYS', 90))
+RESTOCK_SMA_WINDOW = int(os.getenv('RESTOCK_SMA_WINDOW', 28))
+RESTOCK_SES_ALPHA = float(os.getenv('RESTOCK_SES_ALPHA', 0.2))
+RESTOCK_LEAD_TIME_DAYS = int(os.getenv('RESTOCK_LEAD_TIME_DAYS', 7))
+RESTOCK_COVER_DAYS = int(os.getenv('RESTOCK_COVER_DAYS', 30))
+
+
+# ÉVÉNEMENTS DE LA BOUTIQUE (tampon par worker)
+EVENTS_MAX_BATCH_SIZE = int(os.getenv('EVENTS_MAX_BATCH_SIZE', 100))
+# Métadonnées d'un événement : nombre de clés et taille JSON maximum (octets)
+EVENTS_METADATA_MAX_KEYS = int(os.getenv('EVENTS_METADATA_MAX_KEYS', 20))
+EVENTS_METADATA_MAX_BYTES = int(os.getenv('EVENTS_METADATA_MAX_BYTES', 2048))
+EVENTS_FLUSH_SIZE = int(os.getenv('EVENTS_FLUSH_SIZE', 500))
+EVENTS_FLUSH_INTERVAL = int(os.getenv('EVENTS_FLUSH_INTERVAL', 10))
+EVENTS_MAX_PENDING = int(os.getenv('EVENTS_MAX_PENDING', 10000))
+EVENTS_RAW_RETENTION_DAYS = int(os.getenv('EVENTS_RAW_RETENTION_DAYS', 0))
+
+
 # CONFIGURATION FOR EMAILS
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
@@ -180,13 +269,43 @@ AUTH_USER_MODEL = 'accounts.Admin'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite ignore select_for_update() : une transaction qui lit avant d'écrire
+# échouerait aussitôt en « database is locked » au moment d'écrire. En mode
+# IMMEDIATE, chaque transaction prend le verrou d'écriture dès son ouverture
+# et attend son tour jusqu'à SQLITE_TIMEOUT secondes.
+SQLITE_OPTIONS = {
+    'transaction_mode': 'IMMEDIATE',
+    'timeout': int(os.getenv('SQLITE_TIMEOUT', 20)),
+}
+
+
+def database_options(engine):
+    return SQLITE_OPTIONS if engine == 'django.db.backends.sqlite3' else {}
+
+
+DATABASE_ENGINE = os.getenv('DATABASE_ENGINE', 'django.db.backends.sqlite3')
+ANALYTICS_DATABASE_ENGINE = os.getenv('ANALYTICS_DATABASE_ENGINE', 'django.db.backends.sqlite3')
+
 DATABASES = {
     'default': {
-        'ENGINE': os.getenv('DATABASE_ENGINE', 'django.db.backends.sqlite3'),
+        'ENGINE': DATABASE_ENGINE,
         'NAME': BASE_DIR / os.getenv('DATABASE_NAME', 'db.sqlite3'),
+        'OPTIONS': database_options(DATABASE_ENGINE),
+    },
+    # Statistiques, agrégats et événements : base séparée pour que les
+    # écritures de reporting ne prennent pas le verrou de la base principale
+    'analytics': {
+        'ENGINE': ANALYTICS_DATABASE_ENGINE,
+        'NAME': BASE_DIR / os.getenv('ANALYTICS_DATABASE_NAME', 'analytics.sqlite3'),
+        'OPTIONS': database_options(ANALYTICS_DATABASE_ENGINE),
     }
 }
 
+DATABASE_ROUTERS = ['zoonova.db_routers.AnalyticsRouter']
+
+# Taille des lots lus dans les tables transactionnelles par les jobs de reporting
+REPORTING_READ_CHUNK_SIZE = int(os.getenv('REPORTING_READ_CHUNK_SIZE', 2000))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -258,4 +377,6 @@ LOGGING = {
 (BASE_DIR / 'logs').mkdir(exist_ok=True)
 
 # FRONTEND URL
-FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5173')
\ No newline at end of file
+FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:5173')
+# Page d'un livre sur le site (liens des alertes de retour en stock)
+BOOK_PAGE_URL = os.getenv('BOOK_PAGE_URL', FRONTEND_URL + '/books/{slug}')
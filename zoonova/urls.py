@@ -35,6 +35,7 @@ urlpatterns = [
         path('orders/', include('orders.urls')),
         path('payments/', include('payments.urls')),
         path('contact/', include('contact.urls')),
+        path('events/', include('analytics.urls')),
         path('', include(router.urls)),
     ])),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework'))
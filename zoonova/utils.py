@@ -1,12 +1,31 @@
-from rest_framework.views import exception_handler
+import logging
+
+from django.conf import settings
+from django.db import OperationalError, connections, router
+from rest_framework.views import exception_handler, set_rollback
 from rest_framework.response import Response
 from rest_framework import status
 
+logger = logging.getLogger(__name__)
+
 
 def custom_exception_handler(exc, context):
     """
-    Handler d'exceptions personnalisé pour des messages d'erreur uniformes
+    Handler d'exceptions personnalisé pour des messages d'erreur uniformes.
+    Une base momentanément indisponible (verrou non obtenu à temps, interblocage)
+    renvoie 503 avec Retry-After plutôt qu'une erreur 500.
     """
+    if isinstance(exc, OperationalError):
+        logger.warning(f"Base de données indisponible: {str(exc)}")
+        set_rollback()
+        response = Response({
+            'error': True,
+            'message': 'Service temporairement saturé, réessayez plus tard',
+            'details': {}
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Retry-After'] = '1'
+        return response
+    
     response = exception_handler(exc, context)
     
     if response is not None:
@@ -19,3 +38,79 @@ def custom_exception_handler(exc, context):
         response.data = custom_response_data
     
     return response
+
+
+def upsert_counters(model, key_fields, rows, increment=True, update_fields=None):
+    """
+    Insère ou met à jour un lot de lignes de compteurs en une seule requête
+    (INSERT ... ON CONFLICT DO UPDATE, SQLite >= 3.24 et PostgreSQL).
+
+    bulk_create(update_conflicts=True) ne sait que remplacer les valeurs :
+    ici, avec increment=True, les compteurs existants sont additionnés côté
+    base, ce qui reste correct même si plusieurs workers écrivent en même temps.
+
+    Args:
+        model: modèle cible, avec une contrainte d'unicité sur key_fields
+        key_fields (list): champs identifiant une ligne (ex: ['book', 'date'])
+        rows (list): dicts contenant key_fields et les mêmes champs compteurs
+        increment (bool): additionner (True) ou remplacer (False) les compteurs
+        update_fields (list): compteurs à mettre à jour en cas de conflit
+            (par défaut tous ; les autres ne servent qu'à l'insertion)
+    """
+    if not rows:
+        return
+
+    db = router.db_for_write(model)
+    connection = connections[db]
+    qn = connection.ops.quote_name
+    meta = model._meta
+
+    value_fields = [name for name in rows[0] if name not in key_fields]
+    fields = [meta.get_field(name) for name in list(key_fields) + value_fields]
+    table = qn(meta.db_table)
+    columns = ', '.join(qn(field.column) for field in fields)
+    placeholders = ', '.join(['%s'] * len(fields))
+    conflict = ', '.join(qn(meta.get_field(name).column) for name in key_fields)
+
+    assignments = []
+    for name in update_fields or value_fields:
+        column = qn(meta.get_field(name).column)
+        if increment:
+            assignments.append(f'{column} = {table}.{column} + excluded.{column}')
+        else:
+            assignments.append(f'{column} = excluded.{column}')
+
+    sql = (
+        f'INSERT INTO {table} ({columns}) VALUES ({placeholders}) '
+        f'ON CONFLICT ({conflict}) DO UPDATE SET {", ".join(assignments)}'
+    )
+    params = [
+        [field.get_db_prep_value(row[field.name], connection) for field in fields]
+        for row in rows
+    ]
+
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def iter_chunks(queryset, chunk_size=None):
+    """
+    Découpe un queryset en sous-querysets de `chunk_size` lignes consécutives
+    (par clé primaire croissante).
+
+    Chaque lot est lu par une requête courte et indépendante : un job de
+    reporting ne garde donc jamais de curseur ouvert sur les tables
+    transactionnelles pendant qu'il écrit dans la base analytics. Les lots
+    peuvent être agrégés (values/annotate) comme le queryset d'origine.
+    """
+    chunk_size = chunk_size or settings.REPORTING_READ_CHUNK_SIZE
+    queryset = queryset.order_by()
+    last_pk = None
+
+    while True:
+        pks = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        pks = list(pks.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return
+        yield queryset.filter(pk__gte=pks[0], pk__lte=pks[-1])
+        last_pk = pks[-1]